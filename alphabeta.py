@@ -1,87 +1,453 @@
+import os
+import tempfile
+import time
 import unittest
-from typing import Dict
-
-import math
+from typing import List, Tuple
 
 from checkers import Board, Move, WHITE, BLACK
+from evaluation import Evaluator, MaterialEvaluator, WeightedEvaluator, material_value
+from ordering import MoveOrdering, NoOrdering
+import tablebase
+from tablebase import Tablebase
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, NO_MOVE, move_id, find_move
 
-MAX = True
-MIN = False
 INF = 999999
+MAX_DEPTH = 64
+DRAW_VALUE = 0
+# value of positions drawn by the rules, see Board.draw_reason
 
 
-def alpha_beta_search(board: Board, max_depth: int) -> Move:
+def alpha_beta_search(board: Board, max_depth: int, table: TranspositionTable = None,
+                      ordering: MoveOrdering = None, stats: 'SearchStats' = None,
+                      evaluator: Evaluator = None, batch_leaves: bool = False,
+                      tablebase: Tablebase = None, book: 'OpeningBook' = None) -> List[Move]:
     """
-    Returns best Move for given Board, found by performing minimax algorithm with alpha-beta pruning.
+    Returns best Move for given Board, found by principal variation search (negamax form of minimax algorithm with
+    alpha-beta pruning, where all moves but the first one are searched with a null window first).
     :param board: Board to start search from
     :param max_depth: Maximum tree depth to search
+    :param table: TranspositionTable shared by the whole search, pass the same table for all moves of a game to reuse
+    results of previous searches. A new table is used if None.
+    :param ordering: MoveOrdering used to order moves, a new MoveOrdering is used if None
+    :param stats: SearchStats to which counters and principal variation of this search are added, or None
+    :param evaluator: Evaluator used to score positions at the leaves, MaterialEvaluator if None
+    :param batch_leaves: if True, all children of nodes just above the leaves are scored with one
+    Evaluator.evaluate_children call, instead of being searched one by one
+    :param tablebase: endgame Tablebase, positions found in it get their exact value instead of being searched, or
+    None
+    :param book: book.OpeningBook, if the board is in it the book move is returned without searching, or None
     :return: best found Move
     """
+    move = _book_move(board, book, stats)
+    if move is not None:
+        return move
+    s = _Search(board, table, ordering, stats, evaluator=evaluator, batch_leaves=batch_leaves, tablebase=tablebase)
+    best_move, best_value = _search_root(board, s, max_depth)
+    s.stats.finish(board, s.table, max_depth, best_value)
+    return best_move
+
+
+def search(board: Board, time_ms: int = 1000, max_depth: int = MAX_DEPTH, table: TranspositionTable = None,
+           ordering: MoveOrdering = None, stats: 'SearchStats' = None, evaluator: Evaluator = None,
+           batch_leaves: bool = False, tablebase: Tablebase = None, book: 'OpeningBook' = None) -> List[Move]:
+    """
+    Returns best Move for given Board, found by iterative deepening: principal variation search is repeated with
+    increasing depth (each time starting with the principal variation of the previous one, and with an aspiration
+    window around its value) until max_depth is reached or time runs out. When time runs out, best move found so far
+    is returned.
+    :param board: Board to start search from
+    :param time_ms: time budget for the search in milliseconds, or None for no time limit
+    :param max_depth: Maximum tree depth to search, with the same meaning as in alpha_beta_search
+    :param table: TranspositionTable shared by the whole search, see alpha_beta_search
+    :param ordering: MoveOrdering used to order moves, see alpha_beta_search
+    :param stats: SearchStats to which counters and principal variation of the deepest finished iteration are added,
+    or None
+    :param evaluator: Evaluator used to score positions at the leaves, see alpha_beta_search
+    :param batch_leaves: score leaves in batches, see alpha_beta_search
+    :param tablebase: endgame Tablebase, see alpha_beta_search
+    :param book: book.OpeningBook consulted before searching, see alpha_beta_search
+    :return: best found Move, or None if there are no legal moves
+    """
+    start = time.perf_counter()
+    deadline = None if time_ms is None else start + time_ms / 1000
+
+    moves = board.legal_moves()
+    if len(moves) <= 1:
+        # nothing to search for
+        return moves[0] if moves else None
+    move = _book_move(board, book, stats)
+    if move is not None:
+        return move
+
+    s = _Search(board, table, ordering, stats, deadline, evaluator, batch_leaves, tablebase)
+    best_move, best_value, pv = moves[0], None, []
+    values = {}
+    # values of finished iterations, by depth
+    for depth in range(0, max_depth + 1):
+        try:
+            guess = values.get(depth - 2)
+            if guess is None:
+                best_move, best_value = _search_root(board, s, depth, pv)
+            else:
+                # search with a narrow window around value of the previous iteration of the same parity first (values
+                # of odd and even depths differ, as leaves are after own or after opponent's move), and widen the
+                # window 4 times on the side of the value while the value falls outside of it
+                delta = s.evaluator.aspiration_window
+                alpha, beta = guess - delta, guess + delta
+                while True:
+                    move, value = _search_root(board, s, depth, pv, alpha, beta)
+                    delta *= 4
+                    if value <= alpha > -INF:
+                        alpha = max(value - delta, -INF)
+                    elif value >= beta < INF:
+                        beta = min(value + delta, INF)
+                    else:
+                        break
+                    s.stats.aspiration_researches += 1
+                best_move, best_value = move, value
+            values[depth] = best_value
+        except SearchTimeout as timeout:
+            if timeout.best_move is not None:
+                best_move = timeout.best_move
+            break
+        pv = principal_variation(board, s.table, depth + 1)
+        s.stats.finish(board, s.table, depth, best_value)
+
+        if deadline is not None and time.perf_counter() - start > (deadline - start) / 2:
+            # next iteration would most likely not finish in the remaining time
+            break
+
+    return best_move
+
+
+def _book_move(board: Board, book: 'OpeningBook', stats: 'SearchStats') -> List[Move]:
+    """
+    :return: move of the opening book for board, or None if there is no book or the board is not in it
+    """
+    if book is None:
+        return None
+    move = book.choose(board)
+    if move is not None and stats is not None:
+        stats.book_hits += 1
+        stats.pv = [move]
+    return move
+
+
+def principal_variation(board: Board, table: TranspositionTable, max_length: int) -> List[List[Move]]:
+    """
+    Returns principal variation (sequence of best moves for both players) from given Board, as stored in
+    transposition table by the last search.
+    :param board:
+    :param table:
+    :param max_length: maximum number of moves to return
+    :return:
+    """
+    pv = []
+    seen = set()
+    while len(pv) < max_length and hash(board) not in seen:
+        seen.add(hash(board))
+        entry = table.probe(hash(board))
+        move = find_move(board.legal_moves(), entry[3]) if entry is not None else None
+        if move is None:
+            break
+        pv.append(move)
+        board.push(move)
+
+    for _ in pv:
+        board.pop()
+    return pv
+
+
+def ordering_savings(board: Board, max_depth: int, ordering: MoveOrdering = None) -> Tuple[int, int]:
+    """
+    Measures how many nodes move ordering saves, by searching the board with moves in the order of legal_moves and
+    with given ordering. Both searches use a new transposition table.
+    :param board: Board to start search from
+    :param max_depth: Maximum tree depth to search
+    :param ordering: MoveOrdering to measure, a new MoveOrdering if None
+    :return: tuple (nodes visited without ordering, nodes visited with ordering)
+    """
+    unordered, ordered = SearchStats(), SearchStats()
+    alpha_beta_search(board, max_depth, TranspositionTable(), NoOrdering(), unordered)
+    alpha_beta_search(board, max_depth, TranspositionTable(), ordering, ordered)
+    return unordered.nodes, ordered.nodes
+
+
+class SearchStats:
+    """
+    Counters collected during a search. Pass the same object to several searches to sum them up.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        # number of visited nodes (positions), without the root
+        self.cutoffs = 0
+        # number of nodes where the search was pruned
+        self.table_cutoffs = 0
+        # number of nodes where value from transposition table was used
+        self.researches = 0
+        # number of null window searches that had to be repeated with full window
+        self.aspiration_researches = 0
+        # number of root searches of search() that had to be repeated with a wider aspiration window
+        self.tablebase_hits = 0
+        # number of nodes whose value was found in the endgame tablebase
+        self.book_hits = 0
+        # number of searches that returned a move of the opening book instead of searching
+        self.depth = None
+        self.value = None
+        self.pv: List[List[Move]] = []
+        # depth, value (for the player on the turn) and principal variation of the last finished search
+
+    def finish(self, board: Board, table: TranspositionTable, depth: int, value: int):
+        """
+        Stores result of a finished search of given depth.
+        """
+        self.depth = depth
+        self.value = value
+        self.pv = principal_variation(board, table, depth + 1)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised when search runs out of time.
+    """
+
+    def __init__(self, best_move: List[Move] = None):
+        """
+        :param best_move: best move found by the interrupted search, or None
+        """
+        super().__init__()
+        self.best_move = best_move
 
+
+class _Search:
+    """
+    State shared by all nodes of one search.
+    """
+
+    def __init__(self, board: Board, table: TranspositionTable = None, ordering: MoveOrdering = None,
+                 stats: SearchStats = None, deadline: float = None, evaluator: Evaluator = None,
+                 batch_leaves: bool = False, tablebase: Tablebase = None, new_search: bool = True):
+        """
+        :param board: root of the search
+        :param deadline: time.perf_counter() value at which search is interrupted by raising SearchTimeout, or None
+        :param new_search: whether to mark a new search in the table, False if this search is a part of a search that
+        already did (as a root move searched by a worker of parallel_alpha_beta_search)
+        """
+        self.table = table if table is not None else TranspositionTable()
+        if new_search:
+            self.table.new_search()
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.stats = stats if stats is not None else SearchStats()
+        self.deadline = deadline
+        self.evaluator = evaluator if evaluator is not None else MaterialEvaluator()
+        self.batch_leaves = batch_leaves
+        self.tablebase = tablebase
+
+
+def _search_root(board: Board, s: _Search, max_depth: int, pv: List[List[Move]] = (), alpha: int = -INF,
+                 beta: int = +INF) -> Tuple[List[Move], int]:
+    """
+    Performs the first step of the search explicitly, returning best move and it's value for the player on the turn.
+    If the value is outside of (alpha, beta) window, it is only a bound and the move can't be trusted.
+    :param pv: principal variation of the previous search, searched first
+    :return:
+    """
     # By international checker rules and for given board_value function, board_value has a range of [-20, 20]
     best_move, best_value = None, -INF
+    alpha_orig = alpha
 
-    # Perform MAX step explicitly, storing best move and it's value
-    player_color = True
-    for move in board.legal_moves():
+    stack_size = len(board.move_stack)
+    key = hash(board)
+    hint = _hint(s.table.probe(key), pv)
+    for i, move in enumerate(s.ordering.order(board, board.legal_moves(), 0, hint)):
         board.push(move)
-        value = _alpha_beta(board, {}, player_color, max_depth, -INF, +INF, MAX)
+        try:
+            value = _pvs_child(board, s, max_depth, alpha, beta, 1, i == 0,
+                               pv[1:] if pv and move_id(move) == move_id(pv[0]) else ())
+        except SearchTimeout:
+            # restore the board, search was interrupted somewhere deep in the tree
+            while len(board.move_stack) > stack_size:
+                board.pop()
+            raise SearchTimeout(best_move if best_value > alpha_orig else None)
         board.pop()
 
         if value > best_value:
-            best_move = move
+            best_move, best_value = move, value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
 
-    return best_move
+    if best_move is not None:
+        s.table.store(key, max_depth + 1, _bound(best_value, alpha_orig, beta), best_value, move_id(best_move))
+    return best_move, best_value
 
 
-def _alpha_beta(board: Board, transpositions: Dict[int, int], color: bool, depth: int, alpha: int, beta: int, opt: bool):
+def _pvs(board: Board, s: _Search, depth: int, alpha: int, beta: int, ply: int, pv: List[List[Move]] = ()) -> int:
     """
-    Implementation of minimax with alpha-beta pruning follows the pseudo-code on Wikipedia:
-    https://en.wikipedia.org/wiki/Alpha%E2%80%93beta_pruning#Pseudocode
+    Principal variation search in negamax form, see https://www.chessprogramming.org/Principal_Variation_Search
 
     :param board:
+    :param s: state of the search
     :param depth: Maximum tree depth to search. Decreases with recursive calls.
     :param alpha:
     :param beta:
-    :param opt:
-    :return:
+    :param ply: distance from the root of the search
+    :param pv: remaining principal variation of the previous search if this node is on it, searched first
+    :return: value of the board for the player on the turn
     """
+    s.stats.nodes += 1
+    if s.deadline is not None and time.perf_counter() > s.deadline:
+        raise SearchTimeout()
+
+    # a position that already occurred is a draw, playing on from it would only go around in circles
+    if board.draw_reason(repetitions=1) is not None:
+        return DRAW_VALUE
+    if s.tablebase is not None:
+        value = s.tablebase.value(board)
+        if value is not None:
+            s.stats.tablebase_hits += 1
+            return _from_root(value, ply)
+    # player who can't move has lost, like a position lost in 0 moves in the tablebase
+    if not board.has_legal_moves():
+        return _from_root(-tablebase.WIN_VALUE, ply)
+    # if reached max depth, return board value
+    if depth == 0:
+        return s.evaluator.evaluate(board)
 
-    if hash(board) in transpositions:
-        return transpositions[hash(board)]
+    key = hash(board)
+    entry = s.table.probe(key)
+    if entry is not None:
+        entry_depth, flag, value, mid = entry
+        if entry_depth >= depth:
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                s.stats.table_cutoffs += 1
+                return value
+            # bound from the table narrows the window
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
 
-    # if reached max depth or there's no legal moves left, return board value
-    if depth == 0 or len(board.legal_moves()) <= 0:
-        return _board_value(board, color)
+    if depth == 1 and s.batch_leaves:
+        return _pvs_frontier(board, s, key, alpha, beta, ply)
 
-    # if searching for optimal move when it's player's turn, look for MAX value
-    if opt == MAX:
-        value = -INF
-        for move in board.legal_moves():
-            board.push(move)
-            value = max(value, _alpha_beta(board, transpositions, color, depth - 1, alpha, beta, MIN))
-            transpositions[hash(board)] = value
-            board.pop()
+    alpha_orig = alpha
+    best_move, best_value = None, -INF
+    # moves are generated in stages, the rest of them are not generated at all after a cutoff
+    for i, move in enumerate(s.ordering.iter_ordered(board, ply, _hint(entry, pv))):
+        board.push(move)
+        value = _pvs_child(board, s, depth - 1, alpha, beta, ply + 1, i == 0,
+                           pv[1:] if pv and move_id(move) == move_id(pv[0]) else ())
+        board.pop()
 
+        if value > best_value:
+            best_move, best_value = move, value
             alpha = max(alpha, value)
             if alpha >= beta:
-                break  # beta-prune
-
-        return value
-
-    # else (it's other player's turn), look for MIN value (that'd be MAX from other player's perspective)
-    else:  # opt == MIN
-        value = +INF
-        for move in board.legal_moves():
-            board.push(move)
-            value = min(value, _alpha_beta(board, transpositions, color, depth - 1, alpha, beta, MAX))
-            transpositions[hash(board)] = value
-            board.pop()
-            beta = min(beta, value)
-            if alpha >= beta:
-                break  # alpha-prune
+                s.stats.cutoffs += 1
+                s.ordering.cutoff(board, move, ply, depth)
+                break
+
+    s.table.store(key, depth, _bound(best_value, alpha_orig, beta), best_value, move_id(best_move))
+    return best_value
+
+
+def _pvs_frontier(board: Board, s: _Search, key: int, alpha: int, beta: int, ply: int) -> int:
+    """
+    Searches a node whose children are all leaves: children that are draws, in the tablebase or without legal moves get
+    the same value as in _pvs, all the others are evaluated with a single evaluate_children call, instead of visiting
+    them one by one.
+    Nothing is pruned, but the returned value and stored bound are the same as _pvs would return (or a tighter bound
+    if it would cut off).
+    :param key: hash of board
+    :return: value of the board for the player on the turn
+    """
+    moves = board.packed_legal_moves()
+    s.stats.nodes += len(moves)
+    # values of children for the opponent, who is on the turn after the move, None for leaves that are evaluated
+    values = []
+    leaves = []
+    for move in moves:
+        board.push(move)
+        value = DRAW_VALUE if board.draw_reason(repetitions=1) is not None else None
+        if value is None and s.tablebase is not None:
+            value = s.tablebase.value(board)
+            if value is not None:
+                s.stats.tablebase_hits += 1
+                value = _from_root(value, ply + 1)
+        if value is None and not board.has_legal_moves():
+            value = _from_root(-tablebase.WIN_VALUE, ply + 1)
+        board.pop()
+        values.append(value)
+        if value is None:
+            leaves.append(move)
+    evaluated = iter(s.evaluator.evaluate_children(board, leaves))
+    values = [value if value is not None else next(evaluated) for value in values]
+
+    best_move, best_value = None, -INF
+    for move, value in zip(moves, values):
+        if -value > best_value:
+            best_move, best_value = move, -value
+    if best_value >= beta:
+        s.stats.cutoffs += 1
+        s.ordering.cutoff(board, best_move, ply, 1)
+
+    s.table.store(key, 1, _bound(best_value, alpha, beta), best_value, move_id(best_move))
+    return best_value
+
+
+def _pvs_child(board: Board, s: _Search, depth: int, alpha: int, beta: int, ply: int, first: bool,
+               pv: List[List[Move]]) -> int:
+    """
+    Searches position after a move (board with the move already pushed), returning its value for the player that made
+    the move. First move is searched with full window, other moves with a null window, only to prove that they are not
+    better than alpha. If that fails, they are searched again with full window.
+    """
+    if first:
+        return -_pvs(board, s, depth, -beta, -alpha, ply, pv)
+
+    value = -_pvs(board, s, depth, -alpha - 1, -alpha, ply, pv)
+    if alpha < value < beta:
+        # value is a lower bound, so it can be used instead of alpha
+        s.stats.researches += 1
+        value = -_pvs(board, s, depth, -beta, -value, ply, pv)
+    return value
+
+
+def _from_root(value: int, ply: int) -> int:
+    """
+    Converts value of a position at given ply from the scale of Tablebase.value, where wins and losses are counted in
+    moves from the position, to moves from the root of the search, so that shorter wins and longer losses are preferred
+    whichever ply they are found at.
+    """
+    if value > 0:
+        return value - ply
+    if value < 0:
+        return value + ply
+    return value
+
+
+def _bound(value: int, alpha: int, beta: int) -> int:
+    """
+    :return: bound flag for a value found by searching with (alpha, beta) window
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
 
-        return value
+
+def _hint(entry, pv: List[List[Move]]) -> int:
+    """
+    :return: move id of the move from principal variation, or of the best move from transposition table entry
+    """
+    if pv:
+        return move_id(pv[0])
+    if entry is not None:
+        return entry[3]
+    return NO_MOVE
 
 
 def _board_value(board: Board, color: bool) -> int:
@@ -92,10 +458,7 @@ def _board_value(board: Board, color: bool) -> int:
     :param color:
     :return:
     """
-    total = 1
-    for (x, y, checker) in board.get_checkers():
-        total += (+1 if checker.color == color else -1) * (5 if checker.crowned else 1)
-    return total
+    return material_value(board, color)
 
 
 class BoardValueTests(unittest.TestCase):
@@ -122,4 +485,183 @@ class BoardValueTests(unittest.TestCase):
         b = Board()
         b.set_board("XXXOOOxoxo")
         self.assertEqual(0, _board_value(b, WHITE))
-        self.assertEqual(0, _board_value(b, BLACK))
\ No newline at end of file
+        self.assertEqual(0, _board_value(b, BLACK))
+
+class SearchTests(unittest.TestCase):
+
+    def test_time_limit(self):
+        b = Board()
+        start = time.perf_counter()
+        move = search(b, time_ms=100)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(str(move), str(b.legal_moves()))
+        self.assertEqual(Board().get_board(), b.get_board())
+        self.assertEqual([], b.move_stack)
+
+    def test_same_as_fixed_depth(self):
+        b = Board()
+        b.set_board(",,....O.....,,.o...o....,,..X.......,...o.o....,,x.x.x.....,")
+        self.assertEqual(str(alpha_beta_search(b, 3)), str(search(b, time_ms=None, max_depth=3)))
+
+    def test_ordering_savings(self):
+        unordered, ordered = ordering_savings(Board(), 4)
+        self.assertLess(ordered, unordered)
+
+    def test_aspiration(self):
+        # values of iterations of the same parity are close, so no root search has to be repeated
+        stats = SearchStats()
+        search(Board(), time_ms=None, max_depth=5, stats=stats)
+        self.assertEqual(0, stats.aspiration_researches)
+
+        # a search that falls outside of the window is repeated with a wider one, to the same result
+        notation, color, expected = PrincipalVariationSearchTests.SUITE[5]
+        b = Board()
+        b.set_board(notation)
+        b.color = color
+        stats, fixed = SearchStats(), SearchStats()
+        move = search(b, time_ms=None, max_depth=4, stats=stats, evaluator=WeightedEvaluator())
+        self.assertGreater(stats.aspiration_researches, 0)
+        self.assertEqual(str(alpha_beta_search(b, 4, stats=fixed, evaluator=WeightedEvaluator())), str(move))
+        self.assertEqual(fixed.value, stats.value)
+
+    def test_stats(self):
+        stats = SearchStats()
+        alpha_beta_search(Board(), 3, stats=stats)
+        self.assertGreater(stats.nodes, 0)
+        self.assertGreater(stats.cutoffs, 0)
+
+    def test_evaluator(self):
+        b = Board()
+        b.set_board(",,,,,,,o.o,.o,X.")
+        b.color = BLACK
+        stats = SearchStats()
+        move = alpha_beta_search(b, 3, stats=stats, evaluator=WeightedEvaluator())
+        self.assertIn(str(move), [str(m) for m in b.legal_moves()])
+        self.assertGreater(stats.value, 100)
+
+    def test_batch_leaves(self):
+        for (notation, color, expected) in PrincipalVariationSearchTests.SUITE[:6]:
+            b = Board()
+            b.set_board(notation)
+            b.color = color
+            before = b.get_board()
+            per_leaf, batched = SearchStats(), SearchStats()
+            alpha_beta_search(b, 3, stats=per_leaf, evaluator=WeightedEvaluator())
+            alpha_beta_search(b, 3, stats=batched, evaluator=WeightedEvaluator(), batch_leaves=True)
+            self.assertEqual(per_leaf.value, batched.value)
+            self.assertEqual(before, b.get_board())
+
+        # kings moving back and forth: leaves that repeat a position are draws in both searches
+        b = Board()
+        b.set_board("......O.O.,,,,,,,,,X")
+        for i in range(6):
+            if i % 4 < 2:
+                move = next(m for m in b.legal_moves() if m[0].checker.crowned)
+            else:
+                back = b.move_stack[-2][0]
+                move = next(m for m in b.legal_moves()
+                            if (m[0].move_from, m[0].move_to) == (back.move_to, back.move_from))
+            b.push(move)
+        per_leaf, batched = SearchStats(), SearchStats()
+        alpha_beta_search(b, 3, stats=per_leaf, evaluator=WeightedEvaluator())
+        alpha_beta_search(b, 3, stats=batched, evaluator=WeightedEvaluator(), batch_leaves=True)
+        self.assertEqual(DRAW_VALUE, per_leaf.value)
+        self.assertEqual(per_leaf.value, batched.value)
+
+
+class PrincipalVariationSearchTests(unittest.TestCase):
+    # positions, player on the turn and moves chosen by minimax with alpha-beta pruning at depth 4, which visited
+    # MINIMAX_NODES nodes in total
+    SUITE = [
+        (".o.o.o.o.o,o.o.o.o.o.,.o.o.o.o.o,o.o.o.o.o.,,,.x.x.x.x.x,x.x.x.x.x.,.x.x.x.x.x,x.x.x.x.x.", WHITE,
+         "[Move<x,f(1, 6),t(0, 5)>]"),
+        (",,....O.....,,.o...o....,,..X.......,...o.o....,,x.x.x.....,", WHITE,
+         "[Move<X,f(2, 6),t(4, 8)>, Move<X,f(4, 8),t(7, 5)>, Move<X,f(7, 5),t(3, 1)>]"),
+        (".......o.o,..o.....o.,.o........,o.o.o.....,...o......,........o.,.x.x......,x...x.....,...x...x.x,x...x.....", WHITE,
+         "[Move<x,f(1, 6),t(0, 5)>]"),
+        ("...o...o.o,o.o.....o.,.o...o.o.o,....o.o...,,,...x.....o,..x.x...x.,.x...x.x.x,x...x...x.", BLACK,
+         "[Move<o,f(3, 0),t(4, 1)>]"),
+        ("...o......,....o.o.o.,.o........,,...o......,o.........,.....x.x.o,x...x.x.x.,.x.....x.x,", BLACK,
+         "[Move<o,f(3, 0),t(2, 1)>]"),
+        (".o.o.o.o.o,o.o.o.o.o.,...o.o...o,o...o.o.o.,,....x...x.,.o........,x.x.x.x.x.,.x.x.x.x.x,x.x.x.x.x.", WHITE,
+         "[Move<x,f(0, 7),t(2, 5)>]"),
+        (".o.o.o.o.o,o.o...o.o.,...o.....o,o...o.o...,,......x...,,x...x.x...,.x...x.x.x,x.x.x.....", WHITE,
+         "[Move<x,f(0, 7),t(1, 6)>]"),
+        (".o.o.o.o..,o.o.o.o.o.,.o.o.o....,....o.....,,x.x.x...o.,...x......,x...x.x...,.x.x.x.x.x,x...x.x.x.", WHITE,
+         "[Move<x,f(0, 5),t(1, 4)>]"),
+        (".o.o.o.o.o,o.o.o.....,.o.o...o.o,o.o.o.o...,...o......,x.........,.x.x.x.x.x,..x.x...x.,.x.x.x.x.x,x.x.x.x.x.", WHITE,
+         "[Move<x,f(1, 6),t(2, 5)>]"),
+        (".o.o...o.o,o.o.o.o.o.,.o.......o,..o...o...,.....o....,,.....x....,x...x.x.x.,.x.x.x.x..,x.x.x...x.", BLACK,
+         "[Move<o,f(2, 1),t(3, 2)>]"),
+        (".o.o.o.o.o,o.o.o...o.,...o.o.o.o,o.o.o...o.,.o...o....,x.....x...,...x.x.x..,x.x.x...x.,.x.x.x.x.x,x.x.x.x.x.", WHITE,
+         "[Move<x,f(6, 5),t(7, 4)>]"),
+        (".o.o.o.o.o,..o.o.o.o.,.o...o.o.o,o.....o.o.,.....o....,........x.,.x.......x,x.x.x.x.x.,.x.x...x.x,x.x.x.x.x.", BLACK,
+         "[Move<o,f(1, 0),t(0, 1)>]"),
+    ]
+    MINIMAX_NODES = 13780
+
+    def test_suite(self):
+        stats = SearchStats()
+        for (notation, color, expected) in self.SUITE:
+            b = Board()
+            b.set_board(notation)
+            b.color = color
+            self.assertEqual(expected, str(alpha_beta_search(b, 4, stats=stats)))
+        self.assertLess(stats.nodes, self.MINIMAX_NODES)
+
+    def test_repetition(self):
+        b = Board()
+        b.set_board("......O.O.,,,,,,,,,X.X")
+        for (f, t) in ((90, 81), (8, 19), (81, 90), (19, 8)):
+            b.push(b.quiet_move(f, t))
+        s = _Search(b)
+        self.assertEqual(DRAW_VALUE, _pvs(b, s, 3, -INF, INF, 1))
+        b.pop()
+        self.assertEqual(s.evaluator.evaluate(b), _pvs(b, s, 0, -INF, INF, 1))
+
+    def test_no_moves(self):
+        b = Board()
+        # black man is blocked by white men
+        b.set_board(".o,x.x,...x")
+        b.color = BLACK
+        s = _Search(b)
+        self.assertEqual(-(tablebase.WIN_VALUE - 2), _pvs(b, s, 0, -INF, INF, 2))
+        self.assertEqual(-(tablebase.WIN_VALUE - 2), _pvs(b, s, 3, -INF, INF, 2))
+        # the same position after white's move is a leaf below a batched node too
+        b.set_board(".o,x.x,,....x")
+        b.color = WHITE
+        for batch_leaves in (False, True):
+            s = _Search(b, batch_leaves=batch_leaves)
+            self.assertEqual(tablebase.WIN_VALUE - 2, _pvs(b, s, 1, -INF, INF, 1))
+
+    def test_tablebase(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "endgame.tb")
+            tablebase.generate(path, 2)
+            tb = Tablebase(path)
+            b = Board()
+            # black man can only move onto the diagonal of the king, and it is captured
+            b.set_board(".X,,,,,,.........o")
+            b.color = BLACK
+            stats = SearchStats()
+            alpha_beta_search(b, 4, stats=stats, tablebase=tb)
+            # black is lost in 2 moves, the same as the root is in the tablebase
+            self.assertEqual(-(tablebase.WIN_VALUE - 2), stats.value)
+            self.assertEqual(1, stats.tablebase_hits)
+            # leaves below a batched node are probed too
+            b.set_board(",,,,,....o.....,,,.o...X....,")
+            b.color = WHITE
+            per_leaf, batched = SearchStats(), SearchStats()
+            alpha_beta_search(b, 2, stats=per_leaf, tablebase=tb)
+            alpha_beta_search(b, 2, stats=batched, tablebase=tb, batch_leaves=True)
+            self.assertEqual(per_leaf.value, batched.value)
+            self.assertGreater(batched.tablebase_hits, 0)
+            tb.close()
+
+    def test_principal_variation(self):
+        b = Board()
+        stats = SearchStats()
+        move = search(b, time_ms=None, max_depth=3, stats=stats)
+        self.assertEqual(3, stats.depth)
+        self.assertEqual(str(move), str(stats.pv[0]))
+        self.assertEqual(4, len(stats.pv))
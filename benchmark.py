@@ -0,0 +1,183 @@
+import argparse
+import json
+import time
+import unittest
+from typing import Dict, List, Sequence, Tuple
+
+from alphabeta import alpha_beta_search, SearchStats
+from checkers import Board, WHITE, BLACK
+from evaluation import get_evaluator, np
+from transposition import TranspositionTable
+
+
+def batch_leaves_benchmark(depths=range(4, 9), evaluator: str = None) -> List[Dict]:
+    """
+    Searches the initial position to each of depths, once evaluating leaves one by one and once in batches (see
+    alpha_beta_search), and measures speed of both.
+    :param depths: search depths to measure
+    :param evaluator: name of the evaluator to use (see evaluation.get_evaluator), "numpy" if numpy is installed and
+    "weighted" otherwise
+    :return: one dict per search, with depth, batch_leaves, nodes, seconds and nodes_per_second
+    """
+    if evaluator is None:
+        evaluator = "numpy" if np is not None else "weighted"
+
+    results = []
+    for depth in depths:
+        for batch_leaves in (False, True):
+            stats = SearchStats()
+            start = time.perf_counter()
+            alpha_beta_search(Board(), depth, TranspositionTable(), stats=stats, evaluator=get_evaluator(evaluator),
+                              batch_leaves=batch_leaves)
+            seconds = time.perf_counter() - start
+            results.append({"depth": depth, "batch_leaves": batch_leaves, "nodes": stats.nodes, "seconds": seconds,
+                            "nodes_per_second": stats.nodes / seconds})
+    return results
+
+
+SEARCH_POSITIONS: List[Tuple[str, str, bool, int]] = [
+    ("initial", "", WHITE, 8),
+    ("opening", ".o.o.o.o.o,o.o.o.o.o.,.o.o.o.o.o,..o.o.....,,x.........,...o......,x.x.x.x.x.,.x.x.x.x.x,"
+                "x.x.x.x.x.", WHITE, 8),
+    ("middlegame", ".o...o.o.o,o.o.o.o.o.,...o.o.o.o,..o.......,...x...o..,,,o.....x.x.,.x.x.x.x.x,x.x.x.x.x.",
+     BLACK, 10),
+    ("late middlegame", ".....o.o.o,o...o.o.o.,.o.o...o.o,,...o...o..,,.........x,o.x.......,...x.x.x.x,x.x...x.x.",
+     WHITE, 7),
+    ("kings", ",..o,.......O,....o,.x,......x,...X,........o,,x", WHITE, 8),
+]
+# name, notation (see Board.set_board, empty for the initial position), player on the turn and search depth of the
+# positions of search_benchmark
+
+
+def search_benchmark(positions: Sequence[Tuple[str, str, bool, int]] = SEARCH_POSITIONS,
+                     evaluator: str = None, repeat: int = 1) -> Dict:
+    """
+    Searches each position with alpha_beta_search to its depth, with a new transposition table, and measures the
+    search. Node counts and moves only change when the search itself changes, speed also changes with the machine.
+    :param positions: positions to search, as in SEARCH_POSITIONS
+    :param repeat: number of times each position is searched, the fastest search is kept
+    :param evaluator: name of the evaluator to use (see evaluation.get_evaluator), default evaluator if None
+    :return: dict with nodes, seconds and nodes_per_second of all searches together, and results with one dict per
+    position: name, depth, move, nodes, seconds, nodes_per_second, tt_hit_rate (share of transposition table probes
+    that found the position) and cutoff_rate (share of visited nodes that were pruned)
+    """
+    results = []
+    for (name, notation, color, depth) in positions:
+        board = Board()
+        if notation:
+            board.set_board(notation)
+        board.color = color
+        seconds = None
+        for _ in range(repeat):
+            table = TranspositionTable()
+            stats = SearchStats()
+            start = time.perf_counter()
+            move = alpha_beta_search(board, depth, table, stats=stats,
+                                     evaluator=get_evaluator(evaluator) if evaluator is not None else None)
+            seconds = min(seconds or float("inf"), time.perf_counter() - start)
+        results.append({"name": name, "depth": depth, "move": str(move), "nodes": stats.nodes, "seconds": seconds,
+                        "nodes_per_second": stats.nodes / seconds, "tt_hit_rate": table.hit_rate(),
+                        "cutoff_rate": (stats.cutoffs + stats.table_cutoffs) / stats.nodes if stats.nodes else 0.0})
+
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    return {"nodes": nodes, "seconds": seconds, "nodes_per_second": nodes / seconds if seconds > 0 else 0.0,
+            "results": results}
+
+
+def compare_to_baseline(benchmark: Dict, baseline: Dict, threshold: float = 0.1) -> Tuple[List[str], List[str]]:
+    """
+    Compares results of search_benchmark with earlier (baseline) results.
+    :param threshold: largest allowed relative drop of nodes per second of all searches together; speed of a single
+    short search varies too much from run to run to be checked on its own
+    :return: tuple (regressions, changes): description of the drop of nodes per second if it is larger than threshold,
+    and descriptions of positions whose node count or move differ from the baseline (search was changed, not
+    necessarily for the worse)
+    """
+    regressions, changes = [], []
+    current, before = benchmark["nodes_per_second"], baseline["nodes_per_second"]
+    if before > 0 and current < before * (1 - threshold):
+        regressions.append(f"all positions: {current:.0f} nodes/s, baseline {before:.0f} nodes/s "
+                           f"({100 * (current / before - 1):+.1f}%)")
+
+    before_results = {r["name"]: r for r in baseline["results"]}
+    for r in benchmark["results"]:
+        before = before_results.get(r["name"])
+        if before is None or before["depth"] != r["depth"]:
+            continue
+        if before["nodes"] != r["nodes"] or before["move"] != r["move"]:
+            changes.append(f"{r['name']}: {r['nodes']} nodes, move {r['move']}, baseline {before['nodes']} nodes, "
+                           f"move {before['move']}")
+    return regressions, changes
+
+
+class SearchBenchmarkTests(unittest.TestCase):
+    POSITIONS = [(name, notation, color, 3) for (name, notation, color, depth) in SEARCH_POSITIONS]
+
+    def test_benchmark(self):
+        benchmark = search_benchmark(self.POSITIONS)
+        self.assertEqual([p[0] for p in self.POSITIONS], [r["name"] for r in benchmark["results"]])
+        self.assertEqual(sum(r["nodes"] for r in benchmark["results"]), benchmark["nodes"])
+        for r in benchmark["results"]:
+            self.assertGreater(r["nodes"], 0)
+            self.assertTrue(0 <= r["tt_hit_rate"] <= 1 and 0 <= r["cutoff_rate"] <= 1)
+        # node counts and moves don't depend on time
+        again = search_benchmark(self.POSITIONS)
+        self.assertEqual([(r["nodes"], r["move"]) for r in benchmark["results"]],
+                         [(r["nodes"], r["move"]) for r in again["results"]])
+        json.dumps(benchmark)
+
+    def test_compare(self):
+        benchmark = search_benchmark(self.POSITIONS[:2])
+        self.assertEqual(([], []), compare_to_baseline(benchmark, benchmark))
+
+        baseline = json.loads(json.dumps(benchmark))
+        baseline["nodes_per_second"] *= 2
+        baseline["results"][1]["nodes"] += 1
+        regressions, changes = compare_to_baseline(benchmark, baseline, threshold=0.2)
+        self.assertEqual(1, len(regressions))
+        self.assertEqual(1, len(changes))
+        self.assertTrue(changes[0].startswith(self.POSITIONS[1][0]))
+        self.assertEqual(([], [changes[0]]), compare_to_baseline(benchmark, baseline, threshold=0.6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks per-leaf and batched leaf evaluation, or with --search "
+                                                 "searches of a fixed set of positions.")
+    parser.add_argument("--min-depth", type=int, default=4)
+    parser.add_argument("--max-depth", type=int, default=8)
+    parser.add_argument("--evaluator", default=None, help="evaluator name, numpy (if installed) or weighted by default")
+    parser.add_argument("--search", action="store_true", help="run the search benchmark on SEARCH_POSITIONS")
+    parser.add_argument("--output", default=None, help="JSON file to write search benchmark results to")
+    parser.add_argument("--baseline", default=None, help="JSON file of earlier search benchmark results to compare to")
+    parser.add_argument("--repeat", type=int, default=3, help="number of searches of each position, fastest is kept")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fail if nodes per second drop by more than this share of the baseline")
+    args = parser.parse_args()
+
+    if args.search:
+        benchmark = search_benchmark(evaluator=args.evaluator, repeat=args.repeat)
+        print("position            depth      nodes   seconds  nodes/s  tt hits  cutoffs  move")
+        for r in benchmark["results"]:
+            print(f"{r['name']:18}  {r['depth']:5}  {r['nodes']:9}  {r['seconds']:8.2f}  {r['nodes_per_second']:7.0f}  "
+                  f"{r['tt_hit_rate']:7.1%}  {r['cutoff_rate']:7.1%}  {r['move']}")
+        print(f"{'all':18}  {'':5}  {benchmark['nodes']:9}  {benchmark['seconds']:8.2f}  "
+              f"{benchmark['nodes_per_second']:7.0f}")
+        if args.output is not None:
+            with open(args.output, "w") as f:
+                json.dump(benchmark, f, indent=2)
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                regressions, changes = compare_to_baseline(benchmark, json.load(f), args.threshold)
+            for change in changes:
+                print("Changed: " + change)
+            for regression in regressions:
+                print("Slower: " + regression)
+            if regressions:
+                raise SystemExit(1)
+        raise SystemExit(0)
+
+    print("depth  batched      nodes   seconds  nodes/s")
+    for r in batch_leaves_benchmark(range(args.min_depth, args.max_depth + 1), args.evaluator):
+        print(f"{r['depth']:5}  {str(r['batch_leaves']):7}  {r['nodes']:9}  {r['seconds']:8.2f}  "
+              f"{r['nodes_per_second']:7.0f}")
@@ -0,0 +1,268 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import tempfile
+import unittest
+from typing import Dict, List, Optional, Tuple
+
+from alphabeta import INF, SearchStats, alpha_beta_search
+from checkers import Board, Move, pack_move
+from transposition import TranspositionTable
+
+MAGIC = b"CKOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+# magic, version and number of entries
+ENTRY = struct.Struct("<QQIi")
+# Zobrist hash of the position, move packed with pack_move, weight and score of the move; entries are sorted by hash
+# and then by decreasing weight
+KEY = struct.Struct("<Q")
+
+SEARCH_WEIGHT = 10
+# weight added to the best moves of each position searched by BookBuilder.add_searches
+GAME_POINTS = {1: 2, 0: 1, -1: 0}
+# weight added to a move played in a self-play game won, drawn or lost by the player who played it
+
+BookEntry = Tuple[List[Move], int, int]
+# move, weight and score of a book move
+
+
+class OpeningBook:
+    """
+    Opening book file opened through a memory map: only the header is read when it is opened, entries are found by
+    binary search over the sorted file when a position is probed.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: file written by BookBuilder.write
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not an opening book file: " + path)
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, board: Board) -> List[BookEntry]:
+        """
+        :return: book moves of the board (legal moves of board) with their weights and scores, sorted by decreasing
+        weight, or an empty list if the position is not in the book
+        """
+        key = hash(board)
+        # binary search for the first entry with the key
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self.data, HEADER.size + mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        entries = []
+        legal_moves = None
+        while lo < self.size:
+            entry_key, packed, weight, score = ENTRY.unpack_from(self.data, HEADER.size + lo * ENTRY.size)
+            if entry_key != key:
+                break
+            if legal_moves is None:
+                legal_moves = {pack_move(move): move for move in board.legal_moves()}
+            # a different position with the same hash can't have the same move
+            if packed in legal_moves:
+                entries.append((legal_moves[packed], weight, score))
+            lo += 1
+        return entries
+
+    def choose(self, board: Board, rng: random.Random = None) -> Optional[List[Move]]:
+        """
+        Returns a book move for the board: the one with the highest weight (and then score), or, if rng is given, a
+        random one with probability proportional to its weight.
+        :return: book move, or None if the position is not in the book
+        """
+        entries = [entry for entry in self.probe(board) if entry[1] > 0]
+        if not entries:
+            return None
+        if rng is not None:
+            return rng.choices([move for (move, weight, score) in entries],
+                               [weight for (move, weight, score) in entries])[0]
+        return max(entries, key=lambda entry: (entry[1], entry[2]))[0]
+
+    def close(self):
+        self.data.close()
+
+
+class BookBuilder:
+    """
+    Collects weights and scores of moves in opening positions and writes them into an opening book file.
+    """
+
+    def __init__(self):
+        self.moves: Dict[int, Dict[int, List[int]]] = {}
+        # [weight, score] of each move (packed with pack_move), by Zobrist hash of the position
+        self.searched: Dict[int, int] = {}
+        # number of plies covered by add_searches from each position it searched, by Zobrist hash of the position
+
+    def _entry(self, board: Board, move: List[Move]) -> List[int]:
+        return self.moves.setdefault(hash(board), {}).setdefault(pack_move(move), [0, 0])
+
+    def add_searches(self, plies: int, depth: int, width: int = 2, board: Board = None):
+        """
+        Searches positions of the first plies of the game: every legal move of a position is scored by a search of
+        given depth, best moves get SEARCH_WEIGHT, and positions after the width best moves are searched in the same
+        way. A position reached again by a different sequence of moves gets SEARCH_WEIGHT only once, it is searched
+        again only if more plies from it are left to cover.
+        :param plies: number of moves (of both players) from the board to cover
+        :param depth: depth of the search of each move, at least 1
+        :param width: number of best moves of each position that are followed
+        :param board: position to start from, initial position if None
+        """
+        if depth < 1:
+            raise ValueError("Book search depth must be at least 1: " + str(depth))
+        board = board if board is not None else Board()
+        key = hash(board)
+        if plies <= 0 or self.searched.get(key, 0) >= plies:
+            return
+        first = key not in self.searched
+        self.searched[key] = plies
+        table = TranspositionTable()
+        scored = []
+        for move in board.legal_moves():
+            board.push(move)
+            if board.has_legal_moves():
+                stats = SearchStats()
+                alpha_beta_search(board, depth - 1, table, stats=stats)
+                # value is for the opponent, who is on the turn after the move
+                scored.append((-stats.value, move))
+            else:
+                # opponent can't move and loses
+                scored.append((INF, move))
+            board.pop()
+        scored.sort(key=lambda s: -s[0])
+
+        best = scored[0][0]
+        for score, move in scored:
+            entry = self._entry(board, move)
+            entry[1] = score
+            if score == best and first:
+                entry[0] += SEARCH_WEIGHT
+        for score, move in scored[:width]:
+            board.push(move)
+            self.add_searches(plies - 1, depth, width, board)
+            board.pop()
+
+    def add_games(self, games: int, plies: int, depth: int, random_plies: int = 2, max_moves: int = 200,
+                  seed: int = 0):
+        """
+        Plays self-play games of alpha_beta_search, and adds GAME_POINTS of each game to the moves played in its first
+        plies.
+        :param games: number of games
+        :param plies: number of moves (of both players) of each game to add to the book
+        :param depth: search depth of both players
+        :param random_plies: number of random moves at the start of each game, so that games differ
+        :param max_moves: games longer than this are draws
+        :param seed: seed of the random moves
+        """
+        rng = random.Random(seed)
+        for _ in range(games):
+            board = Board()
+            table = TranspositionTable()
+            played = []
+            while board.outcome() is None and len(board.move_stack) < max_moves:
+                if len(board.move_stack) < random_plies:
+                    move = rng.choice(board.legal_moves())
+                else:
+                    move = alpha_beta_search(board, depth, table)
+                if len(board.move_stack) < plies:
+                    played.append((hash(board), pack_move(move), board.color))
+                board.push(move)
+
+            outcome = board.outcome()
+            winner = outcome.winner if outcome is not None else None
+            for key, packed, color in played:
+                result = 0 if winner is None else (1 if winner == color else -1)
+                self.moves.setdefault(key, {}).setdefault(packed, [0, 0])[0] += GAME_POINTS[result]
+
+    def write(self, path: str):
+        """
+        Writes the book into a file: HEADER and then one ENTRY per move, sorted by hash of the position.
+        """
+        entries = sorted(((key, packed, weight, score) for key, moves in self.moves.items()
+                          for packed, (weight, score) in moves.items()), key=lambda e: (e[0], -e[2], e[1]))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+
+
+class OpeningBookTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "opening.book")
+        builder = BookBuilder()
+        builder.add_searches(plies=2, depth=2)
+        builder.add_games(games=2, plies=4, depth=1, max_moves=20)
+        builder.write(cls.path)
+        cls.book = OpeningBook(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.book.close()
+        cls.directory.cleanup()
+
+    def test_probe(self):
+        b = Board()
+        entries = self.book.probe(b)
+        legal = [str(m) for m in b.legal_moves()]
+        self.assertEqual(len(legal), len(entries))
+        for move, weight, score in entries:
+            self.assertIn(str(move), legal)
+        self.assertEqual(sorted((weight for (move, weight, score) in entries), reverse=True),
+                         [weight for (move, weight, score) in entries])
+        self.assertGreater(entries[0][1], 0)
+        self.assertEqual(str(entries[0][0]), str(self.book.choose(b)))
+        self.assertIn(str(self.book.choose(b, random.Random(1))), legal)
+
+    def test_not_in_book(self):
+        b = Board()
+        b.set_board(",,,,,,,..o,,X")
+        self.assertEqual([], self.book.probe(b))
+        self.assertIsNone(self.book.choose(b))
+
+    def test_add_searches(self):
+        builder = BookBuilder()
+        builder.add_searches(plies=5, depth=1, width=3)
+        # positions reached by moves in a different order are weighted once
+        self.assertEqual({0, SEARCH_WEIGHT}, {weight for moves in builder.moves.values() for weight, _ in moves.values()})
+        self.assertRaises(ValueError, builder.add_searches, 2, 0)
+
+    def test_search(self):
+        b = Board()
+        stats = SearchStats()
+        move = alpha_beta_search(b, 4, stats=stats, book=self.book)
+        self.assertEqual(str(self.book.choose(b)), str(move))
+        self.assertEqual(1, stats.book_hits)
+        self.assertEqual(0, stats.nodes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds an opening book from searches and self-play games.")
+    parser.add_argument("output", help="opening book file to write")
+    parser.add_argument("--plies", type=int, default=4, help="number of moves from the initial position to search")
+    parser.add_argument("--depth", type=int, default=6, help="search depth of each move")
+    parser.add_argument("--width", type=int, default=2, help="number of best moves followed in each position")
+    parser.add_argument("--games", type=int, default=0, help="number of self-play games")
+    parser.add_argument("--game-plies", type=int, default=8, help="number of moves of each game added to the book")
+    parser.add_argument("--game-depth", type=int, default=4, help="search depth of self-play games")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    builder = BookBuilder()
+    builder.add_searches(args.plies, args.depth, args.width)
+    builder.add_games(args.games, args.game_plies, args.game_depth, seed=args.seed)
+    builder.write(args.output)
@@ -1,8 +1,20 @@
-from typing import List, Dict
+import random
+from array import array
+from typing import List, Dict, Tuple, Union
 
 WHITE = True  # X
 BLACK = False  # O
 
+ALL_SQUARES = (1 << 100) - 1
+# bitboard mask with all 100 squares of the board set
+ROW_MASK = (1 << 10) - 1
+# bitboard mask of a single row, shift it by (y * 10) to select row y
+
+# [up-left, up-right, down-left, down-right]
+KING_DIRECTIONS = [(-1, -1), (+1, -1), (-1, +1), (+1, +1)]
+# [upper-left, bottom-left, upper-right, bottom-right]
+MAN_JUMP_DIRECTIONS = [(-1, -1), (-1, +1), (+1, -1), (+1, +1)]
+
 
 class Checker:
     """
@@ -12,6 +24,7 @@ class Checker:
 
     Black checkers are printed as "o" (if crowned, "O")
     """
+    __slots__ = ("color", "crowned")
     color: bool
     crowned: bool
 
@@ -33,7 +46,10 @@ class Move:
     Move denotes a change in position for a checker from position (fx, fy) to position (tx, ty).
     It also stores information if the move results in a promotion of a checker, and the removed checker if the move
     was a jump.
+
+    Moves can also be packed into a single integer, see pack_move.
     """
+    __slots__ = ("checker", "move_from", "move_to", "is_promotion", "removed_checker")
     checker: Checker
     move_from: (int, int)
     move_to: (int, int)
@@ -67,23 +83,65 @@ class Move:
         return f"Move<{self.checker},f{self.move_from},t{self.move_to}>"
 
 
+NO_MOVES = "no_moves"
+REPETITION = "repetition"
+KINGS_ONLY = "25_move_rule"
+ENDGAME_LIMIT = "endgame_limit"
+# reasons why a game ended, see Outcome
+
+
+class Outcome:
+    """
+    Outcome of a finished game, see Board.outcome().
+    """
+    __slots__ = ("winner", "reason")
+    winner: bool
+    # winner is WHITE or BLACK, or None for a draw
+    reason: str
+    # reason is NO_MOVES (the player on the turn can't move and loses), REPETITION (the same position with the same
+    # player on the turn occurred three times), KINGS_ONLY (25 moves of each player with kings only and no captures) or
+    # ENDGAME_LIMIT (too many moves in an endgame against a single king, see ENDGAME_PLY_LIMITS)
+
+    def __init__(self, winner: bool, reason: str):
+        self.winner = winner
+        self.reason = reason
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, Outcome) and self.winner == o.winner and self.reason == o.reason
+
+    def result(self) -> str:
+        """
+        :return: result in the usual notation, "1-0" if white won, "0-1" if black won and "1/2-1/2" for a draw
+        """
+        if self.winner is None:
+            return "1/2-1/2"
+        return "1-0" if self.winner == WHITE else "0-1"
+
+    def __repr__(self) -> str:
+        return f"Outcome<{self.result()},{self.reason}>"
+
+
 class Board:
     """
     Holds state of a game of checkers.
+
+    Positions are stored as bitboards: every square (x, y) of the 10 x 10 grid maps to bit number y * 10 + x of
+    four integer masks, one for each kind of piece (white men, white kings, black men and black kings).
     """
 
-    state: Dict[int, Dict[int, Checker]] = {}
-    # state contains positions of all the checkers that are on board
-    # each dictionary is a row in a board, therefore state should be queried first by Y coordinate, and then
-    # by X coordinate, e.g. self.state[y][x].
-    # Example: self.state[3][7] would contain checker in 4th row (from top to bottom, starting with 0) and 8th column
-    # (from left to right, starting with 0)
+    white_men: int
+    white_kings: int
+    black_men: int
+    black_kings: int
+    # bitboards of all the checkers that are on board, bit (y * 10 + x) is set if a checker of that kind is placed at
+    # (x, y). Example: bit 37 of self.white_men would be set if there is a white (non-crowned) checker in 4th row
+    # (from top to bottom, starting with 0) and 8th column (from left to right, starting with 0)
 
-    move_stack: List[List[Move]] = []
+    move_stack: List[List[Move]]
     # move_stack is a list of performed "moves", note that a "move" is a list as it can consist of multiple Moves
     # (i.e. chaining jumps)
 
-    color: bool = WHITE
+    color: bool
 
     # color denotes which player is currently on the turn, and is updated when making a move (calling push) or undoing
     # a move (calling pop)
@@ -96,7 +154,7 @@ class Board:
         self.set_board(".o.o.o.o.o,o.o.o.o.o.,.o.o.o.o.o,o.o.o.o.o.,,,.x.x.x.x.x,x.x.x.x.x.,.x.x.x.x.x,x.x.x.x.x.")
 
     def __hash__(self) -> int:
-        return hash(hash(self.get_board()) + hash(self.color))
+        return self.zobrist_hash()
 
     def __str__(self):
         """
@@ -106,8 +164,9 @@ class Board:
         s = ""
         for y in range(0, 10):
             for x in range(0, 10):
-                if self.state[y].get(x) is not None:
-                    s += str(self.state[y][x]) + " "
+                chk = self.checker_at(x, y)
+                if chk is not None:
+                    s += str(chk) + " "
                 else:
                     s += ". "
             if y < 9: s += "\n"
@@ -119,72 +178,105 @@ class Board:
         :param notation:
         :return:
         """
-        self.clear_board()
-
+        masks = [0, 0, 0, 0]
         for y, row in enumerate(notation.split(",")):
             for x, state in enumerate(row):
-                if state == "x":
-                    ch = Checker(WHITE)
-                    self.state[y][x] = ch
-                elif state == "X":
-                    ch = Checker(WHITE)
-                    ch.crowned = True
-                    self.state[y][x] = ch
-                elif state == "o":
-                    ch = Checker(BLACK)
-                    self.state[y][x] = ch
-                elif state == "O":
-                    ch = Checker(BLACK)
-                    ch.crowned = True
-                    self.state[y][x] = ch
-                elif state == ".":
-                    pass
-                else:
+                if state == ".":
+                    continue
+                if not is_position_on_board(x, y):
+                    raise ValueError("Checker outside of the board in notation: " + str((x, y)))
+                if state not in "xXoO":
                     raise ValueError("Invalid character in notation: " + str(state))
+                masks["xXoO".index(state)] |= 1 << square(x, y)
+
+        self.set_bitboards(*masks)
+
+    def set_bitboards(self, white_men: int, white_kings: int, black_men: int, black_kings: int):
+        """
+        Clears the board and places checkers given by bitboards (see Board), faster than set_board when positions are
+        generated in bulk.
+        :return:
+        """
+        self.clear_board()
+        self.white_men, self.white_kings = white_men, white_kings
+        self.black_men, self.black_kings = black_men, black_kings
+        for kind, mask in enumerate((white_men, white_kings, black_men, black_kings)):
+            self._pieces_key = _toggle_squares(self._pieces_key, kind, mask)
+            self._counts += bin(mask).count("1") << COUNT_BITS * kind
+            self._placement += _placement_sum(kind, mask) << PLACEMENT_BITS * kind
 
     def get_board(self):
         """
         Notation output of the board. For a nicer output of the whole board, use str(board)!
         :return:
         """
-        s = ""
-        first = True
-        for row in range(0, 10):
-            if not first:
-                s += ","
-            first = False
-
-            if len(self.state[row]) == 0:
-                continue
-
-            for col in range(0, 10):
-                if col in self.state[row]:
-                    s += str(self.state[row][col])
-                else:
-                    s += "."
-        return s
+        wm, wk, bm, bk = self.white_men, self.white_kings, self.black_men, self.black_kings
+        rows = []
+        for y in range(0, 100, 10):
+            row = ((wm >> y) & ROW_MASK, (wk >> y) & ROW_MASK, (bm >> y) & ROW_MASK, (bk >> y) & ROW_MASK)
+            notation = _ROW_NOTATIONS.get(row)
+            if notation is None:
+                notation = _ROW_NOTATIONS[row] = _row_notation(*row)
+            rows.append(notation)
+        return ",".join(rows)
 
     def clear_board(self):
         """
         Empties the board (removes all checkers), clears move stack and sets player color to WHITE.
         :return:
         """
-        self.state.clear()
-        for i in range(10):
-            self.state[i] = {}
-
-        self.move_stack.clear()
+        self.white_men = 0
+        self.white_kings = 0
+        self.black_men = 0
+        self.black_kings = 0
+        self._pieces_key = 0
+        # _pieces_key is Zobrist key of the checkers on board, player on the turn is added in zobrist_hash() so that
+        # color can still be set directly
+        self._counts = 0
+        self._placement = 0
+        # _counts and _placement pack number of checkers and sum of PIECE_SQUARE_VALUES for each kind of checkers
+        # (white men, white kings, black men, black kings) into a single integer each, see counts() and placement()
+        self._reversible_plies = 0
+        self._material_plies = 0
+        # _reversible_plies is number of moves (of both players) since the last move of a man or capture, and
+        # _material_plies number of moves since the last capture or promotion (i.e. since numbers of checkers changed)
+        self._undo_stack = []
+        # _undo_stack holds bitboards, _pieces_key, _counts, _placement and move counters as they were before each
+        # move in move_stack, so pop can restore them directly; Zobrist keys in it are also the history of positions
+        # used to detect repetitions
+
+        self.move_stack = []
         self.color = WHITE
 
+    def copy(self) -> 'Board':
+        """
+        Returns an independent copy of the board, including its move stack (so moves can be popped from the copy).
+        Changes to the copy never affect this board, which makes copies safe to hand over to other threads or
+        processes.
+        :return:
+        """
+        board = Board.__new__(Board)
+        board.white_men, board.white_kings = self.white_men, self.white_kings
+        board.black_men, board.black_kings = self.black_men, self.black_kings
+        board._pieces_key = self._pieces_key
+        board._counts, board._placement = self._counts, self._placement
+        board._reversible_plies, board._material_plies = self._reversible_plies, self._material_plies
+        board.move_stack = list(self.move_stack)
+        board._undo_stack = list(self._undo_stack)
+        board.color = self.color
+        return board
+
     def get_checkers(self):
         """
         Returns a list of all checkers on board as a list of tuples (x, y, Checker)
         :return:
         """
         ret = []
-        for y, rows in list(self.state.items()):
-            for x, checker in list(rows.items()):
-                ret.append((x, y, checker))
+        for sq in iter_squares(self.white_men | self.white_kings | self.black_men | self.black_kings):
+            x, y = COORDS[sq]
+            color = bool(((self.white_men | self.white_kings) >> sq) & 1)
+            crowned = bool(((self.white_kings | self.black_kings) >> sq) & 1)
+            ret.append((x, y, Checker(color, crowned)))
         return ret
 
     def legal_moves(self):
@@ -192,93 +284,347 @@ class Board:
         Returns all possible legal moves for current board state and board player's turn.
         :return:
         """
-        normal_moves: List[List[Move]] = []
-        longest_jump_chains_global: List[List[Move]] = [[]]
-
-        for y, rows in list(self.state.items()):
-            for x, checker in list(rows.items()):
-                # generate moves for current player
-                if checker.color == self.color:
-
-                    # player must perform either one of the longest jump chains available, or a normal move if no jumps
-                    # are available.
-                    chains = get_longest_jump_chains(self, x, y, [], [[]])
-                    if len(chains[0]) > len(longest_jump_chains_global[0]):
-                        # store list of longer chains
-                        longest_jump_chains_global = chains
-                    elif len(chains[0]) == len(longest_jump_chains_global[0]):
-                        # if same sized chains, store both
-                        longest_jump_chains_global += chains
-
-                    if not checker.crowned:
-                        # for default moves, white checkers go up (-y) diagonally,
-                        # black checkers go down (+y) diagonally
-                        if self.color == WHITE:
-                            for (nx, ny) in [(x - 1, y - 1), (x + 1, y - 1)]:
-                                if is_position_on_board(nx, ny) and self.checker_at(nx, ny) is None:
-                                    normal_moves.append([Move(checker, from_pos=(x, y), to_pos=(nx, ny),
-                                                              prom=will_get_crowned(checker, ny))])
-                        else:
-                            for (nx, ny) in [(x - 1, y + 1), (x + 1, y + 1)]:
-                                if is_position_on_board(nx, ny) and self.checker_at(nx, ny) is None:
-                                    normal_moves.append([Move(checker, from_pos=(x, y), to_pos=(nx, ny),
-                                                              prom=will_get_crowned(checker, ny))])
-                    else:  # checker.crowned
-                        # crowned checkers can move along diagonal, however they can't jump over their own checkers
-                        # (if checkers on diagonal are of other color, that's classified as jump and not a normal move!)
-
-                        # [up-left, up-right, down-left, down-right]
-                        for (nx, ny) in [(-1, -1), (+1, -1), (-1, +1), (+1, +1)]:
-                            tx, ty = x, y
-                            while 0 <= tx <= 9 and 0 <= ty <= 9:
-                                # walk all four diagonal ways until border or checker
-                                tx = tx + nx
-                                ty = ty + ny
-
-                                # if over the border or blocked by a checker, stop
-                                if not is_position_on_board(tx, ty) or self.checker_at(tx, ty) is not None:
-                                    break
-                                normal_moves.append([Move(checker, from_pos=(x, y), to_pos=(tx, ty),
-                                                          prom=will_get_crowned(checker, ty))])
-
-            pass  # end of for loops
-        pass
-
-        if len(longest_jump_chains_global[0]) > 0:
-            for chain in longest_jump_chains_global:
-                # last move in a chain can result in crowning
-                last_move = chain[-1]
-                last_move.is_promotion = will_get_crowned(last_move.checker, last_move.move_to[1])
-            return longest_jump_chains_global
-
-        return normal_moves
-
-    def push(self, move: List[Move]):
+        captures = self.legal_captures()
+        if captures:
+            return captures
+        return list(self.iter_quiet_moves())
+
+    def iter_moves(self):
         """
-        Moves checker from starting to ending position of a move (or move chain).
-        :param move:
+        Yields the same moves as legal_moves(), but lazily: jump chains are found first (all of them, as only the longest
+        ones are legal), normal moves are generated one checker at a time only when they are requested.
+        """
+        captures = self.legal_captures()
+        if captures:
+            yield from captures
+        else:
+            yield from self.iter_quiet_moves()
+
+    def has_legal_moves(self) -> bool:
+        """
+        Returns True if player on the turn has any legal move. Much cheaper than generating the moves.
         :return:
         """
-        self.move_stack.append(move)
+        men, kings, opponents, empty = self._pieces()
+        up_left, down_left, up_right, down_right = JUMP_SOURCES
+        (left_offset, left_sources), (right_offset, right_sources) = WHITE_STEPS if self.color == WHITE else BLACK_STEPS
+
+        # normal moves of men, and of kings to neighbouring squares
+        if shift(men & left_sources, left_offset) & empty or shift(men & right_sources, right_offset) & empty:
+            return True
+        if kings:
+            for (offset, sources) in WHITE_STEPS + BLACK_STEPS:
+                if shift(kings & sources, offset) & empty:
+                    return True
+
+        # jumps over neighbouring opponent's checkers (kings that can't move to a neighbouring square can only jump
+        # over a neighbouring checker as well)
+        pieces = men | kings
+        return bool((((((pieces & up_left) >> 11) & opponents) >> 11) & empty) or
+                    (((((pieces & down_left) << 9) & opponents) << 9) & empty) or
+                    (((((pieces & up_right) >> 9) & opponents) >> 9) & empty) or
+                    (((((pieces & down_right) << 11) & opponents) << 11) & empty))
+
+    def legal_captures(self) -> List[List[Move]]:
+        """
+        Returns all the longest jump chains available to the player on the turn, or an empty list if player can't jump.
+        :return:
+        """
+        chains = self._longest_chains()
+        if not chains:
+            return []
 
-        fx, fy = move[0].move_from
-        tx, ty = move[-1].move_to
-        chk = move[0].checker
+        kings = self.white_kings if self.color == WHITE else self.black_kings
+        opponent_kings = self.black_kings if self.color == WHITE else self.white_kings
+        return [self._chain_to_moves(chain, kings, opponent_kings) for chain in chains]
+
+    def packed_legal_moves(self) -> array:
+        """
+        Returns the same moves as legal_moves(), in the same order, packed with pack_move. No Move objects are created.
+        :return: array of packed moves
+        """
+        return self.packed_legal_captures() or self.packed_quiet_moves()
+
+    def packed_legal_captures(self) -> array:
+        """
+        Returns the same jump chains as legal_captures(), in the same order, packed with pack_move.
+        :return: array of packed moves, empty if player can't jump
+        """
+        moves = array("Q")
+        chains = self._longest_chains()
+        if chains:
+            kings = self.white_kings if self.color == WHITE else self.black_kings
+            promotion_row = ROW_MASK if self.color == WHITE else ROW_MASK << 90
+            for chain in chains:
+                f, t = chain[0][0], chain[-1][1]
+                captured = 0
+                for (_, _, j) in chain:
+                    captured |= 1 << (j >> 1)
+                promotion = not (kings >> f) & 1 and (promotion_row >> t) & 1
+                moves.append(_pack(f, t, captured, promotion))
+        return moves
+
+    def packed_quiet_moves(self) -> array:
+        """
+        Returns the same moves as iter_quiet_moves(), in the same order, packed with pack_move. They are legal only if
+        packed_legal_captures() is empty.
+        :return: array of packed moves
+        """
+        men, kings, opponents, empty = self._pieces()
+        if self.color == WHITE:
+            (_, left_sources), (_, right_sources) = WHITE_STEPS
+            can_go_left = (((men & left_sources) >> 11) & empty) << 11
+            can_go_right = (((men & right_sources) >> 9) & empty) << 9
+            left_moves, right_moves = PACKED_STEPS[0], PACKED_STEPS[1]
+        else:
+            (_, left_sources), (_, right_sources) = BLACK_STEPS
+            can_go_left = (((men & left_sources) << 9) & empty) >> 9
+            can_go_right = (((men & right_sources) << 11) & empty) >> 11
+            left_moves, right_moves = PACKED_STEPS[2], PACKED_STEPS[3]
+
+        moves = array("Q")
+        movable = can_go_left | can_go_right | kings
+        while movable:
+            low = movable & -movable
+            movable ^= low
+            sq = low.bit_length() - 1
+            if not kings & low:
+                if can_go_left & low:
+                    moves.append(left_moves[sq])
+                if can_go_right & low:
+                    moves.append(right_moves[sq])
+            else:
+                # moves of kings along each diagonal are precomputed, only the empty part of the ray is taken
+                for d in range(4):
+                    blockers = RAY_MASKS[d][sq] & ~empty
+                    if blockers:
+                        moves.extend(PACKED_RAYS[d][sq][:abs(nearest_square(d, blockers) % 10 - sq % 10) - 1])
+                    else:
+                        moves.extend(PACKED_RAYS[d][sq])
+        return moves
 
-        # remove all jumped opponent's checkers
-        for m in move:
-            if m.removed_checker is not None:
-                rem_x, rem_y, rem_chk = m.removed_checker
-                del self.state[rem_y][rem_x]
+    def quiet_move(self, from_sq: int, to_sq: int):
+        """
+        Returns normal (non-jump) move from square from_sq to square to_sq if the player on the turn can make it, or
+        None. Doesn't check if a jump is available instead, see legal_captures.
+        :return:
+        """
+        packed = self.packed_quiet_move(from_sq, to_sq)
+        if packed is None:
+            return None
+        crowned = bool(((self.white_kings | self.black_kings) >> from_sq) & 1)
+        return [Move(Checker(self.color, crowned), from_pos=COORDS[from_sq], to_pos=COORDS[to_sq],
+                     prom=bool(packed >> 13))]
+
+    def packed_quiet_move(self, from_sq: int, to_sq: int):
+        """
+        Returns the same move as quiet_move(from_sq, to_sq), packed with pack_move, or None.
+        :return:
+        """
+        men, kings, opponents, empty = self._pieces()
+        if not (empty >> to_sq) & 1:
+            return None
+
+        if (men >> from_sq) & 1:
+            for d in ((0, 1) if self.color == WHITE else (2, 3)):
+                if NEIGHBOURS[d][from_sq] == to_sq:
+                    return PACKED_STEPS[d][from_sq]
+        elif (kings >> from_sq) & 1:
+            for d in range(4):
+                ray = RAY_MASKS[d][from_sq]
+                # all squares on the way must be empty
+                if (ray >> to_sq) & 1 and not ray & ~RAY_MASKS[d][to_sq] & ~empty:
+                    return _pack(from_sq, to_sq, 0, 0)
+        return None
+
+    def _longest_chains(self) -> List[List[tuple]]:
+        """
+        :return: longest jump chains of the player on the turn, see _collect_longest_chains
+        """
+        men, kings, opponents, empty = self._pieces()
+        if not opponents:
+            return []
+
+        # men that can jump are found for all of them at once, kings one at a time: a king can jump only if the first
+        # checker on one of its diagonals is opponent's, with an empty square behind it
+        jumping = 0
+        if kings:
+            # opponent's checkers that have an empty square behind them in each of KING_DIRECTIONS
+            (_, up_left), (_, up_right) = WHITE_STEPS
+            (_, down_left), (_, down_right) = BLACK_STEPS
+            targets = (opponents & up_left & (empty << 11), opponents & up_right & (empty << 9),
+                       opponents & down_left & (empty >> 9), opponents & down_right & (empty >> 11))
+            if targets[0] | targets[1] | targets[2] | targets[3]:
+                occupied = ~empty
+                for sq in iter_squares(kings):
+                    for d in range(4):
+                        ray = RAY_MASKS[d][sq]
+                        if ray & targets[d] and (targets[d] >> nearest_square(d, ray & occupied)) & 1:
+                            jumping |= 1 << sq
+                            break
+        if men:
+            up_left, down_left, up_right, down_right = JUMP_SOURCES
+            jumping |= (((((men & up_left) >> 11) & opponents) >> 11) & empty) << 22
+            jumping |= (((((men & down_left) << 9) & opponents) << 9) & empty) >> 18
+            jumping |= (((((men & up_right) >> 9) & opponents) >> 9) & empty) << 18
+            jumping |= (((((men & down_right) << 11) & opponents) << 11) & empty) >> 22
+        if not jumping:
+            return []
+
+        return _collect_longest_chains(jumping, kings, empty, opponents)
+
+    def _pieces(self):
+        """
+        :return: bitboards (men, kings, opponents, empty) from the perspective of the player on the turn
+        """
+        if self.color == WHITE:
+            men, kings, opponents = self.white_men, self.white_kings, self.black_men | self.black_kings
+        else:
+            men, kings, opponents = self.black_men, self.black_kings, self.white_men | self.white_kings
+        return men, kings, opponents, ALL_SQUARES & ~(men | kings | opponents)
 
-        # pick up checker from starting position...
-        del self.state[fy][fx]
-        # ... and place it at ending position
-        self.state[ty][tx] = chk
+    def iter_quiet_moves(self):
+        """
+        Yields all normal (non-jump) moves of the player on the turn, one checker at a time. They are legal only if
+        legal_captures() is empty.
+        """
+        men, kings, opponents, empty = self._pieces()
+        if self.color == WHITE:
+            steps, promotion_row = WHITE_STEPS, ROW_MASK
+        else:
+            steps, promotion_row = BLACK_STEPS, ROW_MASK << 90
+        man, king = Checker(self.color), Checker(self.color, True)
+
+        # for default moves, white checkers go up (-y) diagonally, black checkers go down (+y) diagonally
+        (left_offset, left_sources), (right_offset, right_sources) = steps
+        can_go_left = shift(shift(men & left_sources, left_offset) & empty, -left_offset)
+        can_go_right = shift(shift(men & right_sources, right_offset) & empty, -right_offset)
+
+        movable = can_go_left | can_go_right | kings
+        while movable:
+            low = movable & -movable
+            movable ^= low
+            sq = low.bit_length() - 1
+            from_pos = COORDS[sq]
+
+            if not kings & low:
+                if can_go_left & low:
+                    t = sq + left_offset
+                    yield [Move(man, from_pos=from_pos, to_pos=COORDS[t], prom=bool((promotion_row >> t) & 1))]
+                if can_go_right & low:
+                    t = sq + right_offset
+                    yield [Move(man, from_pos=from_pos, to_pos=COORDS[t], prom=bool((promotion_row >> t) & 1))]
+            else:
+                # crowned checkers can move along diagonal, however they can't jump over their own checkers
+                # (if checkers on diagonal are of other color, that's classified as jump and not a normal move!)
+                for d in range(4):
+                    # walk all four diagonal ways until border or checker
+                    for t in ray_squares(d, sq, empty):
+                        yield [Move(king, from_pos=from_pos, to_pos=COORDS[t])]
+
+    def _chain_to_moves(self, chain: List[tuple], kings: int, opponent_kings: int) -> List[Move]:
+        """
+        Converts a jump chain of (from square, to square, jumped square) triplets into a list of Moves.
+        """
+        origin = chain[0][0]
+        checker = Checker(self.color, bool((kings >> origin) & 1))
+        moves = []
+        for (f, t, j) in chain:
+            jumped = Checker(not self.color, bool((opponent_kings >> j) & 1))
+            moves.append(Move(checker, from_pos=COORDS[f], to_pos=COORDS[t], removed=COORDS[j] + (jumped,)))
+
+        # last move in a chain can result in crowning
+        last_move = moves[-1]
+        last_move.is_promotion = will_get_crowned(checker, last_move.move_to[1])
+        return moves
+
+    def push(self, move: Union[List[Move], int]):
+        """
+        Moves checker from starting to ending position of a move (or move chain).
+        :param move: list of Moves, or a move packed with pack_move
+        :return:
+        """
+        if isinstance(move, int):
+            # same as unpack_move, without a call and a tuple on every move of the search
+            squares = PACKED_SQUARES[(move >> 12) & 1]
+            f, t, promotion = squares[move & 63], squares[(move >> 6) & 63], (move >> 13) & 1
+            removed = 0
+            captured = move >> 14
+            while captured:
+                low = captured & -captured
+                removed |= 1 << squares[low.bit_length() - 1]
+                captured ^= low
+        else:
+            fx, fy = move[0].move_from
+            tx, ty = move[-1].move_to
+            f, t = fy * 10 + fx, ty * 10 + tx
+            promotion = move[-1].is_promotion
+
+            # all jumped opponent's checkers
+            removed = 0
+            for m in move:
+                if m.removed_checker is not None:
+                    rem_x, rem_y, rem_chk = m.removed_checker
+                    removed |= 1 << (rem_y * 10 + rem_x)
+        from_bit, to_bit = 1 << f, 1 << t
+
+        wm, wk, bm, bk = self.white_men, self.white_kings, self.black_men, self.black_kings
+        if not (wm | wk | bm | bk) & from_bit:
+            raise ValueError("No checker to move at " + str(COORDS[f]))
 
-        # set checker crowned if last move in chain is promotion
-        if move[-1].is_promotion:
-            chk.crowned = True
+        self.move_stack.append(move)
+        self._undo_stack.append((wm, wk, bm, bk, self._pieces_key, self._counts, self._placement,
+                                 self._reversible_plies, self._material_plies))
+
+        # pick up checker from starting position and place it at ending position (crowned if last move in chain is
+        # promotion), then remove jumped checkers; only opponent's bitboards are cleared, so the moving checker stays
+        # in place even if the chain ends on a square of a jumped checker
+        key = self._pieces_key
+        if wm & from_bit or wk & from_bit:
+            if wk & from_bit:
+                self.white_kings = (wk ^ from_bit) | to_bit
+                kind, new_kind = 1, 1
+            elif promotion:
+                self.white_men = wm ^ from_bit
+                self.white_kings = wk | to_bit
+                kind, new_kind = 0, 1
+            else:
+                self.white_men = (wm ^ from_bit) | to_bit
+                kind, new_kind = 0, 0
+            if removed:
+                self.black_men, self.black_kings = bm & ~removed, bk & ~removed
+                removed_kinds = ((2, bm & removed), (3, bk & removed))
+        else:
+            if bk & from_bit:
+                self.black_kings = (bk ^ from_bit) | to_bit
+                kind, new_kind = 3, 3
+            elif promotion:
+                self.black_men = bm ^ from_bit
+                self.black_kings = bk | to_bit
+                kind, new_kind = 2, 3
+            else:
+                self.black_men = (bm ^ from_bit) | to_bit
+                kind, new_kind = 2, 2
+            if removed:
+                self.white_men, self.white_kings = wm & ~removed, wk & ~removed
+                removed_kinds = ((0, wm & removed), (1, wk & removed))
+
+        # moves of men and captures can't be undone, captures and promotions change the material
+        self._reversible_plies = 0 if kind in (0, 2) or removed else self._reversible_plies + 1
+        self._material_plies = 0 if removed or kind != new_kind else self._material_plies + 1
+
+        counts, placement = self._counts, self._placement
+        key ^= ZOBRIST_KEYS[kind][f] ^ ZOBRIST_KEYS[new_kind][t]
+        if kind != new_kind:
+            counts += COUNT_UNITS[new_kind] - COUNT_UNITS[kind]
+        placement += PLACEMENT_UNITS[new_kind][t] - PLACEMENT_UNITS[kind][f]
+        if removed:
+            for (kind, mask) in removed_kinds:
+                if mask:
+                    key = _toggle_squares(key, kind, mask)
+                    counts -= bin(mask).count("1") << COUNT_BITS * kind
+                    placement -= _placement_sum(kind, mask) << PLACEMENT_BITS * kind
+        self._pieces_key, self._counts, self._placement = key, counts, placement
 
         # set other player's round
         self.color = not self.color
@@ -288,32 +634,93 @@ class Board:
         Undoes the move on top of the stack, returning board in a state before the move was made.
         :return:
         """
-        move = self.move_stack.pop()
+        self.move_stack.pop()
+        (self.white_men, self.white_kings, self.black_men, self.black_kings,
+         self._pieces_key, self._counts, self._placement,
+         self._reversible_plies, self._material_plies) = self._undo_stack.pop()
 
-        fx, fy = move[0].move_from
-        tx, ty = move[-1].move_to
-        chk = move[-1].checker
+        # set other player's round
+        self.color = not self.color
 
-        # pick up checker from ending position...
-        del self.state[ty][tx]
-        # ... and place it back on starting position
-        self.state[fy][fx] = chk
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Returns numbers of checkers on board in O(1), they are kept up to date by push and pop.
+        :return: tuple (white men, white kings, black men, black kings)
+        """
+        c = self._counts
+        return c & COUNT_MASK, (c >> COUNT_BITS) & COUNT_MASK, (c >> 2 * COUNT_BITS) & COUNT_MASK, c >> 3 * COUNT_BITS
 
-        # restore all jumped opponent's checkers
-        for m in move:
-            if m.removed_checker is not None:
-                rem_x, rem_y, rem_chk = m.removed_checker
-                self.state[rem_y][rem_x] = rem_chk
+    def placement(self) -> Tuple[int, int, int, int]:
+        """
+        Returns sums of PIECE_SQUARE_VALUES of all checkers on board in O(1), they are kept up to date by push and pop.
+        :return: tuple (white men, white kings, black men, black kings)
+        """
+        p = self._placement
+        return (p & PLACEMENT_MASK, (p >> PLACEMENT_BITS) & PLACEMENT_MASK, (p >> 2 * PLACEMENT_BITS) & PLACEMENT_MASK,
+                p >> 3 * PLACEMENT_BITS)
 
-        # set checker not crowned if last move in chain was promotion
-        if move[-1].is_promotion:
-            chk.crowned = False
+    def repetitions(self) -> int:
+        """
+        Returns how many times the current position (with the same player on the turn) occurred before in the game.
+        Only positions since the last irreversible move (move of a man or capture) are compared, by their Zobrist keys.
+        :return:
+        """
+        key, undo = self._pieces_key, self._undo_stack
+        count = 0
+        for i in range(len(undo) - 2, len(undo) - 1 - self._reversible_plies, -2):
+            if undo[i][4] == key:
+                count += 1
+        return count
+
+    def draw_reason(self, repetitions: int = 2):
+        """
+        Returns why the game is drawn by the rules, regardless of legal moves:
+         - REPETITION if the position occurred given number of times before (third occurrence by default),
+         - KINGS_ONLY if both players moved only kings without capturing for 25 moves,
+         - ENDGAME_LIMIT if a single king is against three checkers (at least one of them a king) for 16 moves, or
+           against at most two checkers (at least one of them a king) for 5 moves.
+        :param repetitions: number of earlier occurrences of the position needed for REPETITION, search uses 1 so that
+        it doesn't go around in circles
+        :return: one of the reasons above, or None if game is not drawn
+        """
+        if self._reversible_plies >= 50:
+            return KINGS_ONLY
+        limit = ENDGAME_PLY_LIMITS.get(self._counts)
+        if limit is not None and self._material_plies >= limit:
+            return ENDGAME_LIMIT
+        if self._reversible_plies >= 4 and self.repetitions() >= repetitions:
+            return REPETITION
+        return None
+
+    def outcome(self):
+        """
+        Returns Outcome of the game if it is over, or None if the player on the turn should make a move.
+        :return:
+        """
+        if not self.has_legal_moves():
+            return Outcome(not self.color, NO_MOVES)
+        reason = self.draw_reason()
+        return Outcome(None, reason) if reason is not None else None
 
-        # set other player's round
-        self.color = not self.color
+    def zobrist_hash(self) -> int:
+        """
+        Returns 64-bit Zobrist key of the position, i.e. positions of all the checkers and player on the turn. The key
+        is kept up to date by push and pop, so this is O(1).
+        :return:
+        """
+        return self._pieces_key if self.color == WHITE else self._pieces_key ^ ZOBRIST_BLACK_TO_MOVE
 
     def checker_at(self, x: int, y: int):
-        return self.state[y].get(x)
+        bit = 1 << square(x, y)
+        if self.white_men & bit:
+            return Checker(WHITE)
+        if self.white_kings & bit:
+            return Checker(WHITE, True)
+        if self.black_men & bit:
+            return Checker(BLACK)
+        if self.black_kings & bit:
+            return Checker(BLACK, True)
+        return None
 
 
 ###################
@@ -325,6 +732,23 @@ def is_position_on_board(x, y) -> bool:
     return 0 <= x < 10 and 0 <= y < 10
 
 
+def square(x: int, y: int) -> int:
+    """
+    :return: index of the bit that represents position (x, y) in a bitboard
+    """
+    return y * 10 + x
+
+
+def iter_squares(mask: int):
+    """
+    Yields indexes of all set bits in a bitboard, from the lowest to the highest (i.e. row by row, left to right).
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 def will_get_crowned(checker: Checker, y: int) -> bool:
     """
     :param checker:
@@ -341,15 +765,54 @@ def will_get_crowned(checker: Checker, y: int) -> bool:
     return False
 
 
+def pack_move(move: List[Move]) -> int:
+    """
+    Packs a move (or move chain) into a 64-bit integer: starting square, ending square, promotion flag and all jumped
+    squares. Intermediate squares of a jump chain are not kept, as they are not needed to make the move.
+
+    A checker only ever moves between squares of the same color, so all squares of a move are stored as indices
+    (square // 2) among the 50 squares of that color: bits 0-5 hold the starting square, bits 6-11 the ending square,
+    bit 12 the color of squares ((x + y) % 2), bit 13 promotion and bits 14-63 the jumped squares.
+    :param move:
+    :return:
+    """
+    fx, fy = move[0].move_from
+    tx, ty = move[-1].move_to
+    captured = 0
+    for m in move:
+        if m.removed_checker is not None:
+            rem_x, rem_y, rem_chk = m.removed_checker
+            captured |= 1 << (square(rem_x, rem_y) >> 1)
+    return _pack(square(fx, fy), square(tx, ty), captured, move[-1].is_promotion)
+
+
+def unpack_move(packed: int) -> Tuple[int, int, int, bool]:
+    """
+    :param packed: move packed with pack_move
+    :return: tuple (starting square, ending square, bitboard of jumped squares, promotion)
+    """
+    squares = PACKED_SQUARES[(packed >> 12) & 1]
+    removed = 0
+    captured = packed >> 14
+    while captured:
+        low = captured & -captured
+        removed |= 1 << squares[low.bit_length() - 1]
+        captured ^= low
+    return squares[packed & 63], squares[(packed >> 6) & 63], removed, bool((packed >> 13) & 1)
+
+
+def _pack(f: int, t: int, captured: int, promotion) -> int:
+    """
+    :param captured: indices of jumped squares, see pack_move
+    """
+    return (f >> 1) | (t >> 1) << 6 | ((f // 10 + f) & 1) << 12 | bool(promotion) << 13 | captured << 14
+
+
 def get_diagonal_positions(x: int, y: int):
     """
     Returns all diagonal positions of (x, y)
     """
-    # top-left to bottom-right
-    d1 = [(x, y) for (x, y) in zip(range(0, 10), range(max(x - y, y - x), 10))]
-    # bottom-left to top-right
-    d2 = [(x, y) for (x, y) in zip(range(0, 10), range(y + x, -1, -1))]
-    return d1 + d2
+    return DIAGONALS[square(x, y)]
 
 
 def can_perform_jump(board: Board, x: int, y: int, jx: int, jy: int) -> bool:
@@ -361,17 +824,19 @@ def can_perform_jump(board: Board, x: int, y: int, jx: int, jy: int) -> bool:
         # obviously, jump should be performed with a checker
         return False
 
-    if board.checker_at(jx, jy) is not None:
-        # jump can only be performed if the goal position is free
+    # non-crowned checker can only jump over one field
+    if not is_position_on_board(jx, jy):
+        return False
+    jumps = [jump for jump in MAN_JUMPS[square(x, y)] if jump[1] == square(jx, jy)]
+    if not jumps:
         return False
 
-    # non-crowned checker can only jump over one field
-    if (jx, jy) not in [(x - 2, y - 2), (x - 2, y + 2), (x + 2, y - 2), (x + 2, y + 2)]:
+    if board.checker_at(jx, jy) is not None:
+        # jump can only be performed if the goal position is free
         return False
 
     # jump can only be performed if the field between start and goal has a checker of other color
-    ox, oy = (x + jx) // 2, (y + jy) // 2
-    other_checker = board.checker_at(ox, oy)
+    other_checker = board.checker_at(*COORDS[jumps[0][0]])
     if other_checker is not None and other_checker.color != checker.color:
         return True
     else:
@@ -389,38 +854,32 @@ def get_possible_jumps(board: Board, x: int, y: int) -> List[Move]:
     moves: List[Move] = []
 
     chk = board.checker_at(x, y)
+    sq = square(x, y)
 
     if not chk.crowned:
         # Positions in list: [upper-left, bottom-left, upper-right, bottom-right]
-        for (jx, jy) in [(x - 2, y - 2), (x - 2, y + 2), (x + 2, y - 2), (x + 2, y + 2)]:
-            if is_position_on_board(jx, jy) and can_perform_jump(board, x, y, jx, jy):
-                rx, ry = (x + jx) // 2, (y + jy) // 2
-                jumped_checker = board.checker_at(rx, ry)
-                moves.append(Move(chk, from_pos=(x, y), to_pos=(jx, jy), removed=(rx, ry, jumped_checker)))
+        for (j, t) in MAN_JUMPS[sq]:
+            jumped_checker = board.checker_at(*COORDS[j])
+            if jumped_checker is not None and jumped_checker.color != chk.color and \
+                    board.checker_at(*COORDS[t]) is None:
+                moves.append(Move(chk, from_pos=(x, y), to_pos=COORDS[t], removed=COORDS[j] + (jumped_checker,)))
 
     else:
         # [up-left, up-right, down-left, down-right]
-        for (nx, ny) in [(-1, -1), (+1, -1), (-1, +1), (+1, +1)]:
-            tx, ty = x, y
+        for ray in (RAYS[d][sq] for d in range(4)):
             jchk = None
-            while 0 <= tx <= 9 and 0 <= ty <= 9:
+            for t in ray:
                 # walk all four diagonal ways until border or checker
-                tx = tx + nx
-                ty = ty + ny
-                if not is_position_on_board(tx, ty):
-                    break
-
-                tchk = board.checker_at(tx, ty)
+                tchk = board.checker_at(*COORDS[t])
                 if tchk is not None:
                     if tchk.color == chk.color or jchk is not None:
                         break  # can't jump over own checkers or over two checkers, stop
                     else:
-                        jchk = (tx, ty, tchk)  # can jump over checker, store checker for removal
+                        jchk = COORDS[t] + (tchk,)  # can jump over checker, store checker for removal
                         continue
 
                 if jchk is not None:
-                    moves.append(Move(chk, from_pos=(x, y), to_pos=(tx, ty), removed=jchk))
-        pass
+                    moves.append(Move(chk, from_pos=(x, y), to_pos=COORDS[t], removed=jchk))
 
     return moves
 
@@ -453,3 +912,281 @@ def get_longest_jump_chains(board: Board, x: int, y: int, current_chain: List[Mo
         chains = chains + [current_chain]
 
     return chains  # return list of longest found chains
+
+
+def _collect_longest_chains(jumping: int, kings: int, empty: int, opponents: int) -> List[List[tuple]]:
+    """
+    Performs all possible jumps on bitboards and returns the longest jump chains.
+
+    Search is depth-first with an explicit stack instead of recursion. Jumped checkers are marked in `empty` and
+    `opponents` in place and unmarked when backtracking, the current chain is kept in one set of buffers (shared by all
+    jumping checkers) and is copied out only when it is at least as long as the longest chains found so far.
+
+    Chains are lists of (from square, to square, jumped square) triplets, and are returned in the same order as
+    get_longest_jump_chains would return them for each checker in jumping. Jumped checkers are removed immediately, so
+    a chain can pass over the same square more than once.
+    :param jumping: bitboard of checkers that may be able to jump
+    :param kings: bitboard of crowned checkers of the player (may include checkers that are not in jumping)
+    :param empty: bitboard of empty squares
+    :param opponents: bitboard of opponent's checkers that can be jumped
+    :return: list of longest chains
+    """
+    size = bin(opponents).count("1") + 1
+    # chain buffers, i-th jump of the current chain goes from from_sqs[i] to to_sqs[i] over jumped[i] in direction
+    # directions[i]
+    from_sqs = [0] * size
+    to_sqs = [-1] * size
+    jumped = [0] * size
+    directions = [0] * size
+    rays, neighbours, man_jumps = RAY_MASKS, NEIGHBOURS, MAN_JUMPS
+    found: List[List[tuple]] = []
+    longest = 1
+
+    for sq in iter_squares(jumping):
+        crowned = (kings >> sq) & 1
+        # square of the jumping checker is empty while it jumps
+        empty |= 1 << sq
+        from_sqs[0] = sq
+        depth = 0
+        cur, d, t, j = sq, 0, -1, 0
+        # cur is the current square, d direction (or index in MAN_JUMPS[cur] for men) being tried from it and t the
+        # last tried landing square (or -1)
+        extended = False
+        # only chains that can't be extended any more are collected
+        while True:
+            if crowned:
+                if t >= 0:
+                    # try next landing square behind the same jumped checker
+                    n = neighbours[d][t]
+                    if n >= 0 and (empty >> n) & 1:
+                        t = n
+                    else:
+                        t = -1
+                        d += 1
+                while t < 0 and d < 4:
+                    # first checker on the diagonal must be opponent's, can't jump over own checkers
+                    blockers = rays[d][cur] & ~empty
+                    if blockers:
+                        j = blockers.bit_length() - 1 if d < 2 else (blockers & -blockers).bit_length() - 1
+                        n = neighbours[d][j]
+                        if (opponents >> j) & 1 and n >= 0 and (empty >> n) & 1:
+                            t = n
+                            break
+                    d += 1
+            else:
+                t = -1
+                jumps = man_jumps[cur]
+                while d < len(jumps):
+                    j, n = jumps[d]
+                    if (opponents >> j) & 1 and (empty >> n) & 1:
+                        t = n
+                        break
+                    d += 1
+
+            if t >= 0:
+                # jump and go deeper
+                to_sqs[depth] = t
+                jumped[depth] = j
+                directions[depth] = d
+                empty |= 1 << j
+                opponents ^= 1 << j
+                depth += 1
+                from_sqs[depth] = t
+                cur, d, t = t, 0, -1
+                extended = False
+                continue
+
+            # all jumps from the current square were tried
+            if not extended and depth >= longest:
+                if depth > longest:
+                    # discard currently stored chains (they are shorter) and store new one
+                    found.clear()
+                    longest = depth
+                found.append(list(zip(from_sqs[:depth], to_sqs[:depth], jumped[:depth])))
+            if depth == 0:
+                break
+
+            # take back the last jump
+            depth -= 1
+            cur, d, t, j = from_sqs[depth], directions[depth], to_sqs[depth], jumped[depth]
+            empty ^= 1 << j
+            opponents |= 1 << j
+            extended = True
+            if not crowned:
+                d += 1
+
+        empty ^= 1 << sq
+
+    return found
+
+
+#####################
+### ~ BITBOARDS ~ ###
+#####################
+
+
+def shift(mask: int, offset: int) -> int:
+    """
+    Shifts all squares of a bitboard by given offset (positive offset moves squares down the board).
+    """
+    return mask << offset if offset > 0 else mask >> -offset
+
+
+def nearest_square(d: int, mask: int) -> int:
+    """
+    :param d: index of direction in KING_DIRECTIONS
+    :param mask: squares on a single diagonal ray in direction d
+    :return: square in mask that is the closest to the start of the ray
+    """
+    if d >= 2:
+        # directions going down the board (+y) walk towards higher squares
+        return (mask & -mask).bit_length() - 1
+    return mask.bit_length() - 1
+
+
+def ray_squares(d: int, sq: int, empty: int) -> Tuple[int, ...]:
+    """
+    Walks from square sq in direction d (index in KING_DIRECTIONS) and returns empty squares until border or checker.
+    """
+    ray = RAYS[d][sq]
+    blockers = RAY_MASKS[d][sq] & ~empty
+    if not blockers:
+        return ray
+    # squares on a diagonal are as far apart as their columns
+    return ray[:abs(nearest_square(d, blockers) % 10 - sq % 10) - 1]
+
+
+def _toggle_squares(key: int, kind: int, mask: int) -> int:
+    """
+    Adds (or removes) checkers of given kind (index in ZOBRIST_KEYS) on all squares of mask to Zobrist key.
+    """
+    while mask:
+        low = mask & -mask
+        key ^= ZOBRIST_KEYS[kind][low.bit_length() - 1]
+        mask ^= low
+    return key
+
+
+def _placement_sum(kind: int, mask: int) -> int:
+    """
+    Sum of PIECE_SQUARE_VALUES of checkers of given kind on all squares of mask.
+    """
+    values = PIECE_SQUARE_VALUES[kind]
+    total = 0
+    while mask:
+        low = mask & -mask
+        total += values[low.bit_length() - 1]
+        mask ^= low
+    return total
+
+
+def _row_notation(wm: int, wk: int, bm: int, bk: int) -> str:
+    """
+    Notation of a single row from its bits of white men, white kings, black men and black kings bitboards.
+    """
+    if not wm | wk | bm | bk:
+        # empty rows are left out
+        return ""
+
+    s = ""
+    for x in range(0, 10):
+        bit = 1 << x
+        s += "x" if wm & bit else "X" if wk & bit else "o" if bm & bit else "O" if bk & bit else "."
+    return s
+
+
+_ROW_NOTATIONS: Dict[tuple, str] = {}
+# cache of already built row notations, see Board.get_board
+
+
+def _ray(sq: int, dx: int, dy: int) -> Tuple[int, ...]:
+    x, y = COORDS[sq]
+    ray = []
+    while is_position_on_board(x + dx, y + dy):
+        x, y = x + dx, y + dy
+        ray.append(square(x, y))
+    return tuple(ray)
+
+
+def _sources_mask(dx: int, dy: int) -> int:
+    """
+    :return: bitboard of all squares from which moving by (dx, dy) stays on board
+    """
+    return sum(1 << sq for sq, (x, y) in enumerate(COORDS) if is_position_on_board(x + dx, y + dy))
+
+
+COORDS = [(sq % 10, sq // 10) for sq in range(100)]
+# COORDS[sq] are (x, y) coordinates of square sq
+
+RAYS = [[_ray(sq, dx, dy) for sq in range(100)] for (dx, dy) in KING_DIRECTIONS]
+# RAYS[d][sq] are all squares on the diagonal from sq in direction KING_DIRECTIONS[d], in walking order, excluding sq
+
+RAY_MASKS = [[sum(1 << t for t in ray) for ray in rays] for rays in RAYS]
+# RAY_MASKS[d][sq] is a bitboard of all squares on the diagonal from sq in direction KING_DIRECTIONS[d], excluding sq
+
+NEIGHBOURS = [[ray[0] if ray else -1 for ray in rays] for rays in RAYS]
+# NEIGHBOURS[d][sq] is the square next to sq in direction KING_DIRECTIONS[d], or -1 if sq is on the border
+
+MAN_JUMPS = [tuple((RAYS[d][sq][0], RAYS[d][sq][1]) for d in (0, 2, 1, 3) if len(RAYS[d][sq]) >= 2)
+             for sq in range(100)]
+# MAN_JUMPS[sq] are (jumped square, landing square) of all jumps from sq that land on board, in the order of
+# MAN_JUMP_DIRECTIONS
+
+DIAGONALS = [tuple((x, y) for (x, y) in zip(range(0, 10), range(max(x - y, y - x), 10))) +
+             tuple((x, y) for (x, y) in zip(range(0, 10), range(y + x, -1, -1)))
+             for (x, y) in COORDS]
+# DIAGONALS[sq] are positions returned by get_diagonal_positions
+
+JUMP_SOURCES = [_sources_mask(2 * dx, 2 * dy) for (dx, dy) in MAN_JUMP_DIRECTIONS]
+# JUMP_SOURCES are bitboards of squares from which a jump in each of MAN_JUMP_DIRECTIONS lands on board
+
+WHITE_STEPS = [(-11, _sources_mask(-1, -1)), (-9, _sources_mask(+1, -1))]
+BLACK_STEPS = [(+9, _sources_mask(-1, +1)), (+11, _sources_mask(+1, +1))]
+# WHITE_STEPS and BLACK_STEPS are (square offset, bitboard of squares that can move in that direction) for normal
+# moves of men, left before right
+
+COUNT_BITS, COUNT_MASK = 8, 0xFF
+PLACEMENT_BITS, PLACEMENT_MASK = 16, 0xFFFF
+# bits used by each kind of checkers in Board._counts and Board._placement
+
+PIECE_SQUARE_VALUES = [
+    [9 - y for (x, y) in COORDS],
+    [min(x, 9 - x, y, 9 - y) for (x, y) in COORDS],
+    [y for (x, y) in COORDS],
+    [min(x, 9 - x, y, 9 - y) for (x, y) in COORDS],
+]
+# PIECE_SQUARE_VALUES[kind][sq] is positional value of a checker of given kind (white men, white kings, black men,
+# black kings) on square sq: how far men advanced towards the crowning row, and how far kings are from the border
+
+COUNT_UNITS = [1 << COUNT_BITS * kind for kind in range(4)]
+PLACEMENT_UNITS = [[value << PLACEMENT_BITS * kind for value in values]
+                   for kind, values in enumerate(PIECE_SQUARE_VALUES)]
+# COUNT_UNITS[kind] and PLACEMENT_UNITS[kind][sq] are what a checker of given kind on square sq adds to Board._counts
+# and Board._placement
+
+PACKED_SQUARES = [[2 * i + ((color + i // 5) & 1) for i in range(50)] for color in range(2)]
+# PACKED_SQUARES[color][i] is the i-th square with (x + y) % 2 == color, see pack_move
+
+PACKED_RAYS = [[tuple(_pack(sq, t, 0, 0) for t in ray) for (sq, ray) in enumerate(rays)] for rays in RAYS]
+# PACKED_RAYS[d][sq] are packed normal moves of a king from sq to each square of RAYS[d][sq]
+
+PACKED_STEPS = [[_pack(sq, t, 0, (t < 10) if d < 2 else (t >= 90)) if t >= 0 else 0 for (sq, t) in enumerate(n)]
+                for d, n in enumerate(NEIGHBOURS)]
+# PACKED_STEPS[d][sq] is packed normal move of a man from sq to NEIGHBOURS[d][sq], promoted if it reaches the last
+# row in that direction (up for white, down for black), or 0 if there is no such square
+
+ENDGAME_PLY_LIMITS = {}
+for _men in range(3):
+    for _kings in range(1, 4 - _men):
+        # moves of both players, 16 moves each against three checkers, 5 against less
+        _limit = 32 if _men + _kings == 3 else 10
+        ENDGAME_PLY_LIMITS[_men | _kings << COUNT_BITS | 1 << 3 * COUNT_BITS] = _limit
+        ENDGAME_PLY_LIMITS[1 << COUNT_BITS | _men << 2 * COUNT_BITS | _kings << 3 * COUNT_BITS] = _limit
+# ENDGAME_PLY_LIMITS maps Board._counts of endgames where one player only has a single king, and the other at most
+# three checkers including a king, to number of moves (of both players) after which the game is a draw
+
+_zobrist_random = random.Random(0x636865636b657273)
+ZOBRIST_KEYS = [[_zobrist_random.getrandbits(64) for sq in range(100)] for kind in range(4)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+# ZOBRIST_KEYS[kind][sq] are random 64-bit keys for checkers of every kind (white men, white kings, black men, black
+# kings) on every square. Keys are generated from a fixed seed, so hashes are the same in every process.
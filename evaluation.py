@@ -0,0 +1,338 @@
+import unittest
+from typing import Dict, List, Sequence, Union
+
+from checkers import Board, Move, WHITE, BLACK, COORDS, PACKED_SQUARES, iter_squares
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is only needed by NumpyEvaluator
+    np = None
+
+DARK_SQUARES = PACKED_SQUARES[1]
+DARK_MASK = sum(1 << sq for sq in DARK_SQUARES)
+# squares of the standard game ((x + y) % 2 == 1), i-th of them is square 2 * i + 1 or 2 * i; checkers on the other
+# squares (only possible with custom notations) are not seen by evaluators that work on encoded boards
+
+KING_VALUE = 3
+# material value of a king in men, used by weighted evaluators
+
+CENTER_MASK = sum(1 << sq for sq in DARK_SQUARES if 2 <= COORDS[sq][0] <= 7 and 3 <= COORDS[sq][1] <= 6)
+WHITE_BACK_RANK = sum(1 << sq for sq in DARK_SQUARES if COORDS[sq][1] == 9)
+BLACK_BACK_RANK = sum(1 << sq for sq in DARK_SQUARES if COORDS[sq][1] == 0)
+# squares of the center and back rank features, see feature_planes
+
+DEFAULT_WEIGHTS = {
+    "material": 100,  # per man, kings are worth KING_VALUE men
+    "advancement": 2,  # per row a man advanced from its starting row
+    "center": 4,  # per checker on one of the central squares
+    "back_rank": 6,  # per man still guarding its own crowning row
+    "tempo": 3,  # for the player on the turn
+}
+
+
+def material_value(board: Board, color: bool) -> int:
+    """
+    Returns value of the board. Value is calculated as +1 for each checker of given color and -1 for each checker of
+    other color (kings count as 5).
+    :param board:
+    :param color:
+    :return:
+    """
+    white_men, white_kings, black_men, black_kings = board.counts()
+    white = white_men + 5 * white_kings
+    black = black_men + 5 * black_kings
+    return 1 + (white - black if color == WHITE else black - white)
+
+
+def feature_planes() -> Dict[str, List[List[int]]]:
+    """
+    Returns features of a checker on each of DARK_SQUARES, from white's perspective (black checkers use the planes
+    rotated by 180 degrees).
+    :return: dict of feature name to planes [men values, kings values], each with one value per dark square
+    """
+    planes = {}
+    coords = [COORDS[sq] for sq in DARK_SQUARES]
+    planes["material"] = [[1] * len(coords), [KING_VALUE] * len(coords)]
+    planes["advancement"] = [[9 - y for (x, y) in coords], [0] * len(coords)]
+    center = [1 if 2 <= x <= 7 and 3 <= y <= 6 else 0 for (x, y) in coords]
+    planes["center"] = [center, center]
+    planes["back_rank"] = [[1 if y == 9 else 0 for (x, y) in coords], [0] * len(coords)]
+    return planes
+
+
+def weight_tables(weights: Dict[str, int]) -> List[List[int]]:
+    """
+    Combines feature planes with given weights into one value table per kind of checkers.
+    :param weights: weight of each feature, see DEFAULT_WEIGHTS; missing features have weight 0
+    :return: tables [white men, white kings, black men, black kings], each with one value per dark square
+    """
+    planes = feature_planes()
+    tables = []
+    for kind in range(2):
+        tables.append([sum(weights.get(name, 0) * plane[kind][i] for (name, plane) in planes.items())
+                       for i in range(len(DARK_SQUARES))])
+    # square i of black is rotated square (49 - i) of white
+    return tables + [table[::-1] for table in tables]
+
+
+class Evaluator:
+    """
+    Evaluates positions at the leaves of a search. Values are from the perspective of the player on the turn, higher
+    values are better for them, and must be well inside (-alphabeta.INF, alphabeta.INF).
+
+    Subclass and override evaluate() for a different evaluation. Override evaluate_batch() and evaluate_children() as
+    well if many positions can be evaluated faster at once than one by one.
+    """
+
+    aspiration_window = 2
+    # half-width of the aspiration window of alphabeta.search, should be about the smallest difference in values that
+    # changes the best move
+
+    def evaluate(self, board: Board) -> int:
+        """
+        :return: value of board for the player on the turn
+        """
+        raise NotImplementedError
+
+    def evaluate_batch(self, boards: Sequence[Board]) -> List[int]:
+        """
+        :return: values of boards, each for its player on the turn
+        """
+        return [self.evaluate(board) for board in boards]
+
+    def evaluate_children(self, board: Board, moves: Sequence[Union[List[Move], int]]) -> List[int]:
+        """
+        Evaluates positions after each of the moves, used by the search to score all leaves below a node at once.
+        :param board: position before the moves, unchanged when this returns
+        :param moves: legal moves of board, lists of Moves or packed with pack_move
+        :return: values of positions after each move, for the player on the turn after the move
+        """
+        values = []
+        for move in moves:
+            board.push(move)
+            values.append(self.evaluate(board))
+            board.pop()
+        return values
+
+
+class MaterialEvaluator(Evaluator):
+    """
+    Counts material only: men are worth 1 and kings 5, see material_value. This is the default evaluator of the
+    search.
+    """
+
+    def evaluate(self, board: Board) -> int:
+        return material_value(board, board.color)
+
+
+class WeightedEvaluator(Evaluator):
+    """
+    Sums weighted features of all checkers: material, advancement of men, center control, back rank guard, and a
+    tempo bonus for the player on the turn. See DEFAULT_WEIGHTS.
+    """
+
+    aspiration_window = 25
+
+    def __init__(self, weights: Dict[str, int] = None):
+        """
+        :param weights: weight of each feature, DEFAULT_WEIGHTS if None
+        """
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.tables = weight_tables(self.weights)
+        self.tempo = self.weights.get("tempo", 0)
+        self.material = self.weights.get("material", 0)
+        self.advancement = self.weights.get("advancement", 0)
+        self.center = self.weights.get("center", 0)
+        self.back_rank = self.weights.get("back_rank", 0)
+
+    def evaluate(self, board: Board) -> int:
+        white = board.white_men | board.white_kings
+        black = board.black_men | board.black_kings
+        if (white | black) & ~DARK_MASK:
+            return self._evaluate_squares(board)
+        # material and advancement of men are kept up to date by the board, see Board.counts and Board.placement
+        white_men, white_kings, black_men, black_kings = board.counts()
+        white_advancement, _, black_advancement, _ = board.placement()
+        value = self.material * (white_men - black_men + KING_VALUE * (white_kings - black_kings)) + \
+            self.advancement * (white_advancement - black_advancement) + \
+            self.center * (bin(white & CENTER_MASK).count("1") - bin(black & CENTER_MASK).count("1")) + \
+            self.back_rank * (bin(board.white_men & WHITE_BACK_RANK).count("1") -
+                              bin(board.black_men & BLACK_BACK_RANK).count("1"))
+        return self.tempo + (value if board.color == WHITE else -value)
+
+    def _evaluate_squares(self, board: Board) -> int:
+        """
+        Sums weight tables over checkers on DARK_SQUARES, for boards with checkers on other squares as well (whose
+        counts and placement include all checkers).
+        """
+        white_men, white_kings, black_men, black_kings = self.tables
+        white = black = 0
+        for sq in iter_squares(board.white_men & DARK_MASK):
+            white += white_men[sq >> 1]
+        for sq in iter_squares(board.white_kings & DARK_MASK):
+            white += white_kings[sq >> 1]
+        for sq in iter_squares(board.black_men & DARK_MASK):
+            black += black_men[sq >> 1]
+        for sq in iter_squares(board.black_kings & DARK_MASK):
+            black += black_kings[sq >> 1]
+        return self.tempo + (white - black if board.color == WHITE else black - white)
+
+
+class NumpyEvaluator(WeightedEvaluator):
+    """
+    Same evaluation as WeightedEvaluator, but evaluate_batch() and evaluate_children() score all boards at once with
+    NumPy: boards are encoded into an (N, 50) int8 array (see encode) and multiplied with the weight tables. Requires
+    numpy.
+    """
+
+    def __init__(self, weights: Dict[str, int] = None):
+        if np is None:
+            raise ImportError("NumpyEvaluator requires numpy")
+        super().__init__(weights)
+        self.arrays = np.array(self.tables, dtype=np.int32)
+
+    def evaluate(self, board: Board) -> int:
+        return self.evaluate_batch([board])[0]
+
+    def evaluate_batch(self, boards: Sequence[Board]) -> List[int]:
+        return self._evaluate_positions([_position(board) for board in boards])
+
+    def evaluate_children(self, board: Board, moves: Sequence[Union[List[Move], int]]) -> List[int]:
+        positions = []
+        for move in moves:
+            board.push(move)
+            positions.append(_position(board))
+            board.pop()
+        return self._evaluate_positions(positions)
+
+    def _evaluate_positions(self, positions: List[tuple]) -> List[int]:
+        """
+        :param positions: bitboards and player on the turn of each board, see _position
+        """
+        if not positions:
+            return []
+        encoded = encode_positions(positions)
+        white_men, white_kings, black_men, black_kings = self.arrays
+        white = (encoded == 1).astype(np.int32) @ white_men + (encoded == 2).astype(np.int32) @ white_kings
+        black = (encoded == -1).astype(np.int32) @ black_men + (encoded == -2).astype(np.int32) @ black_kings
+        to_move = np.fromiter((position[4] == WHITE for position in positions), dtype=bool, count=len(positions))
+        return (self.tempo + np.where(to_move, white - black, black - white)).tolist()
+
+
+def encode(boards: Sequence[Board]):
+    """
+    Encodes boards into a numpy array of shape (len(boards), 50) and type int8, with one column per dark square:
+    1 for a white man, 2 for a white king, -1 for a black man, -2 for a black king and 0 for an empty square.
+    """
+    return encode_positions([_position(board) for board in boards])
+
+
+def encode_positions(positions: Sequence[tuple]):
+    """
+    Same as encode, for positions given as (white men, white kings, black men, black kings, ...) bitboards.
+    """
+    masks = b"".join(mask.to_bytes(13, "little") for position in positions for mask in position[:4])
+    bits = np.unpackbits(np.frombuffer(masks, dtype=np.uint8).reshape(len(positions), 4, 13), axis=2,
+                         bitorder="little")
+    dark = bits[:, :, DARK_SQUARES].astype(np.int8)
+    return dark[:, 0] + 2 * dark[:, 1] - dark[:, 2] - 2 * dark[:, 3]
+
+
+def _position(board: Board) -> tuple:
+    """
+    :return: bitboards of board and player on the turn, a snapshot that doesn't change with the board
+    """
+    return board.white_men, board.white_kings, board.black_men, board.black_kings, board.color
+
+
+EVALUATORS = {
+    "material": MaterialEvaluator,
+    "weighted": WeightedEvaluator,
+    "numpy": NumpyEvaluator,
+}
+# evaluators by name, see get_evaluator
+
+
+def register_evaluator(name: str, evaluator: type):
+    """
+    Makes an Evaluator subclass available to get_evaluator under given name.
+    """
+    EVALUATORS[name] = evaluator
+
+
+def get_evaluator(name: str, **kwargs) -> Evaluator:
+    """
+    Creates an evaluator registered under given name.
+    :param name: "material", "weighted", "numpy" or a name passed to register_evaluator
+    :param kwargs: arguments of the evaluator's constructor
+    :return:
+    """
+    if name not in EVALUATORS:
+        raise ValueError("Unknown evaluator: " + name)
+    return EVALUATORS[name](**kwargs)
+
+
+class EvaluatorTests(unittest.TestCase):
+    NOTATIONS = [
+        ".x.x.x.x.x,x.x.x.x.x.,,,,,,,.o.o.o.o.o,o.o.o.o.o.",
+        ",,.....O....,,...o......,........o.",
+        ",,,,.x.o.x,..X..x,,o...o,......O,",
+    ]
+
+    def test_material(self):
+        b = Board()
+        b.set_board(self.NOTATIONS[1])
+        self.assertEqual(-6, MaterialEvaluator().evaluate(b))
+        b.color = BLACK
+        self.assertEqual(8, MaterialEvaluator().evaluate(b))
+
+    def test_weighted(self):
+        b = Board()
+        e = WeightedEvaluator()
+        # initial position is symmetric, only tempo counts
+        self.assertEqual(DEFAULT_WEIGHTS["tempo"], e.evaluate(b))
+        b.color = BLACK
+        self.assertEqual(DEFAULT_WEIGHTS["tempo"], e.evaluate(b))
+
+        b.set_board(",,,,,,,,,x")
+        b.color = WHITE
+        self.assertEqual(100 + 6 + 3, WeightedEvaluator().evaluate(b))
+        self.assertEqual(1, WeightedEvaluator({"material": 1}).evaluate(b))
+
+    def test_weighted_tables(self):
+        # features read from the board are the same as sums of weight tables over all checkers
+        e = WeightedEvaluator({"material": 7, "advancement": 3, "center": 5, "back_rank": 11, "tempo": 2})
+        for notation in self.NOTATIONS[:2] + [""]:
+            b = Board()
+            if notation:
+                b.set_board(notation)
+            for color in (WHITE, BLACK):
+                b.color = color
+                for move in b.legal_moves():
+                    b.push(move)
+                    self.assertEqual(e._evaluate_squares(b), e.evaluate(b))
+                    b.pop()
+                self.assertEqual(e._evaluate_squares(b), e.evaluate(b))
+
+    def test_registry(self):
+        self.assertIsInstance(get_evaluator("weighted", weights={"material": 1}), WeightedEvaluator)
+        self.assertRaises(ValueError, get_evaluator, "unknown")
+        register_evaluator("test", MaterialEvaluator)
+        self.assertIsInstance(get_evaluator("test"), MaterialEvaluator)
+        del EVALUATORS["test"]
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_batch(self):
+        boards = []
+        for notation in self.NOTATIONS:
+            for color in (WHITE, BLACK):
+                b = Board()
+                b.set_board(notation)
+                b.color = color
+                boards.append(b)
+        self.assertEqual((len(boards), 50), encode(boards).shape)
+        self.assertEqual(WeightedEvaluator().evaluate_batch(boards), NumpyEvaluator().evaluate_batch(boards))
+        b = boards[2]
+        self.assertEqual(WeightedEvaluator().evaluate_children(b, b.legal_moves()),
+                         NumpyEvaluator().evaluate_children(b, b.legal_moves()))
@@ -1,35 +1,40 @@
-import copy
 import random
 
-from alphabeta import alpha_beta_search
+from alphabeta import alpha_beta_search, search
 from checkers import Board, WHITE, BLACK
+# from rein_learn import QLearningAgent, QTable
+from transposition import TranspositionTable
 
 board = Board()
+# transposition table of alpha-beta player is kept for the whole game
+table = TranspositionTable()
 # board.set_board(".X...o.o..,,...o,,,.........o,...x,x.x.x.x.x.")
 # board.color = BLACK
 
 print(board)
 print("----- ************* -----")
 
-while len(board.legal_moves()) > 0:
+# game ends when the player on the turn can't move, or when it's a draw by the rules
+while board.outcome() is None:
     print("Player " + str("WHITE" if board.color else "BLACK") + " has " + str(len(board.legal_moves())) + " available moves.")
 
     # !! important: work with this copy of a board to prevent
     # accidental changes to actual game state.
-    board_copy = copy.deepcopy(board)
+    board_copy = board.copy()
 
     # store your selected move (returned by your algorithm) into this variable
     selected_move = None
 
     if board.color == BLACK:
-        # AI Player 1 (Minimax with alpha-beta prunning)
-        selected_move = alpha_beta_search(board_copy, 5)
+        # AI Player 1 (Minimax with alpha-beta prunning, iterative deepening with 1 second per move)
+        selected_move = search(board_copy, time_ms=1000, table=table)
         pass
 
     else: # brd.color == BLACK
         # AI Player 2 (TODO)
 
         # selected_move = alpha_beta_search(board_copy, 4)
+        # selected_move = QLearningAgent(QTable.load("q_table.npy")).choose_move(board_copy)
         selected_move = random.choice(board_copy.legal_moves())
         # selected_move = board_copy.legal_moves()[0]
 
@@ -40,3 +45,5 @@ while len(board.legal_moves()) > 0:
 
     print(board)
     print("----- ----- -----")
+
+print("Game over: " + str(board.outcome()))
@@ -0,0 +1,231 @@
+import unittest
+from typing import Dict, Iterator, List, Sequence, Union
+
+from checkers import Board, Move, WHITE, BLACK, pack_move, unpack_move
+from transposition import NO_MOVE, PACKED_MOVE_IDS, move_id
+
+# Scores of ordering heuristics, a move gets the sum of all that apply to it
+HINT_SCORE = 1 << 30  # best move from transposition table or principal variation
+CAPTURE_SCORE = 1 << 24  # per jumped checker
+CAPTURED_KING_SCORE = 1 << 22  # per jumped king
+PROMOTION_SCORE = 1 << 21
+KILLER_SCORE = 1 << 20  # first killer move, the second one gets half
+# history scores are below KILLER_SCORE
+
+
+class MoveOrdering:
+    """
+    Orders moves in alpha-beta search, so that moves most likely to cause a cutoff are searched first. Moves are ranked
+    by:
+     - best move from the transposition table (or principal variation of the previous search),
+     - number of jumped checkers and jumped kings,
+     - promotions,
+     - killer moves (last two quiet moves that caused a cutoff on the same ply),
+     - history heuristic (how often and how deep a quiet move caused a cutoff anywhere in the tree).
+
+    Moves can be ordered all at once with order(), or generated lazily in stages with iter_ordered(), which skips
+    generating all normal moves if hint or a killer move causes a cutoff. Moves can be lists of Moves or packed with
+    pack_move, iter_ordered() yields packed moves. Subclass and override order() and cutoff() for a different
+    ordering. State is kept between searches, call clear() when starting a new game.
+    """
+
+    def __init__(self, killers: bool = True, history: bool = True):
+        """
+        :param killers: use killer moves
+        :param history: use history heuristic
+        """
+        self.use_killers = killers
+        self.use_history = history
+        self.killers: List[List[int]] = []
+        # killers[ply] are move ids of (up to) two last quiet moves that caused a cutoff on that ply
+        self.history: Dict[tuple, int] = {}
+        # history[(color, move id)] is sum of squared depths at which a quiet move caused a cutoff
+
+    def clear(self):
+        """
+        Forgets killer moves and history.
+        """
+        self.killers = []
+        self.history = {}
+
+    def order(self, board: Board, moves: Sequence[Union[List[Move], int]], ply: int, hint: int = NO_MOVE) -> \
+            Sequence[Union[List[Move], int]]:
+        """
+        Returns moves ordered from the most to the least promising.
+        :param board: board on which moves will be played
+        :param moves: legal moves of board, lists of Moves or packed
+        :param ply: distance from the root of the search
+        :param hint: move id of the best move from transposition table or principal variation, or NO_MOVE
+        :return:
+        """
+        if len(moves) <= 1:
+            return moves
+
+        killers = self.killers[ply] if self.use_killers and ply < len(self.killers) else ()
+        history = self.history if self.use_history else {}
+        color = board.color
+        opponent_kings = board.black_kings if color == WHITE else board.white_kings
+
+        scored = []
+        for i, move in enumerate(moves):
+            packed = move if isinstance(move, int) else pack_move(move)
+            mid = PACKED_MOVE_IDS[packed & 0x1FFF]
+            if mid == hint:
+                score = HINT_SCORE
+            elif packed >> 14:
+                # one bit per jumped checker, see pack_move
+                score = CAPTURE_SCORE * bin(packed >> 14).count("1")
+                jumped_kings = unpack_move(packed)[2] & opponent_kings
+                if jumped_kings:
+                    score += CAPTURED_KING_SCORE * bin(jumped_kings).count("1")
+            else:
+                score = history.get((color, mid), 0)
+                if mid in killers:
+                    score += KILLER_SCORE >> killers.index(mid)
+            if (packed >> 13) & 1:
+                score += PROMOTION_SCORE
+            # equal scores keep the order of legal_moves
+            scored.append((-score, i, move))
+
+        scored.sort()
+        return [move for (score, i, move) in scored]
+
+    def iter_ordered(self, board: Board, ply: int, hint: int = NO_MOVE) -> Iterator[int]:
+        """
+        Yields legal moves of board, packed with pack_move, from the most to the least promising, generating them in
+        stages: jump chains (all at once, ordered), then hint and killer moves if they are legal, then the remaining
+        normal moves. Board must be in the same state each time the next move is requested.
+        :param board: board on which moves will be played
+        :param ply: distance from the root of the search
+        :param hint: move id of the best move from transposition table or principal variation, or NO_MOVE
+        """
+        captures = board.packed_legal_captures()
+        if captures:
+            yield from self.order(board, captures, ply, hint)
+            return
+
+        searched = []
+        killers = tuple(self.killers[ply]) if self.use_killers and ply < len(self.killers) else ()
+        for mid in (hint,) + killers:
+            if mid != NO_MOVE:
+                move = board.packed_quiet_move(*divmod(mid - 1, 100))
+                if move is not None and move not in searched:
+                    searched.append(move)
+                    yield move
+
+        rest = [move for move in board.packed_quiet_moves() if move not in searched]
+        yield from self.order(board, rest, ply)
+
+    def cutoff(self, board: Board, move: Union[List[Move], int], ply: int, depth: int):
+        """
+        Notifies ordering that move caused a cutoff.
+        :param board: board on which move was played
+        :param move: list of Moves or packed move
+        :param ply: distance from the root of the search
+        :param depth: remaining depth of the search
+        """
+        packed = move if isinstance(move, int) else pack_move(move)
+        if packed >> 14:
+            # captures are always searched early
+            return
+
+        mid = move_id(packed)
+        if self.use_killers:
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            killers = self.killers[ply]
+            if mid not in killers:
+                killers.insert(0, mid)
+                del killers[2:]
+
+        if self.use_history:
+            key = (board.color, mid)
+            self.history[key] = self.history.get(key, 0) + depth * depth
+            if self.history[key] >= KILLER_SCORE:
+                # keep history scores below killer moves
+                for k in self.history:
+                    self.history[k] >>= 1
+
+
+class NoOrdering(MoveOrdering):
+    """
+    Leaves moves in the order in which Board.legal_moves returns them. Useful as a baseline.
+    """
+
+    def order(self, board: Board, moves: Sequence[Union[List[Move], int]], ply: int, hint: int = NO_MOVE) -> \
+            Sequence[Union[List[Move], int]]:
+        return moves
+
+    def iter_ordered(self, board: Board, ply: int, hint: int = NO_MOVE) -> Iterator[int]:
+        return iter(board.packed_legal_moves())
+
+    def cutoff(self, board: Board, move: Union[List[Move], int], ply: int, depth: int):
+        pass
+
+
+class MoveOrderingTests(unittest.TestCase):
+
+    def test_hint_first(self):
+        b = Board()
+        moves = b.legal_moves()
+        ordered = MoveOrdering().order(b, moves, 0, move_id(moves[5]))
+        self.assertIs(moves[5], ordered[0])
+        self.assertCountEqual(moves, ordered)
+
+    def test_promotion(self):
+        b = Board()
+        b.set_board(",.x,,,,,,..x")
+        ordered = MoveOrdering().order(b, b.legal_moves(), 0)
+        self.assertTrue(ordered[0][-1].is_promotion)
+        self.assertTrue(ordered[1][-1].is_promotion)
+
+    def test_killers_and_history(self):
+        b = Board()
+        moves = b.legal_moves()
+        o = MoveOrdering()
+        o.cutoff(b, moves[3], 2, 4)
+        o.cutoff(b, moves[7], 2, 1)
+        self.assertEqual(str([moves[7], moves[3]]), str(o.order(b, moves, 2)[:2]))
+        # on other plies only history is used
+        self.assertEqual(str([moves[3], moves[7]]), str(o.order(b, moves, 1)[:2]))
+        # history is per player
+        b.color = BLACK
+        self.assertNotIn((BLACK, move_id(moves[3])), o.history)
+
+    def test_no_ordering(self):
+        b = Board()
+        moves = b.legal_moves()
+        self.assertIs(moves, NoOrdering().order(b, moves, 0, move_id(moves[5])))
+
+    def test_iter_ordered(self):
+        b = Board()
+        moves = b.legal_moves()
+        o = MoveOrdering()
+        o.cutoff(b, moves[3], 0, 4)
+        o.cutoff(b, moves[7], 0, 1)
+        staged = list(o.iter_ordered(b, 0, move_id(moves[5])))
+        self.assertEqual([pack_move(m) for m in (moves[5], moves[7], moves[3])], staged[:3])
+        self.assertCountEqual([pack_move(m) for m in moves], staged)
+
+        # hint that isn't a legal move is skipped, jumps are ordered as with order()
+        b.set_board(",,,..x,...o")
+        self.assertEqual([pack_move(m) for m in o.order(b, b.legal_moves(), 0)],
+                         list(o.iter_ordered(b, 0, move_id(moves[5]))))
+
+    def test_packed(self):
+        o = MoveOrdering()
+        b = Board()
+        moves = b.legal_moves()
+        o.cutoff(b, b.packed_legal_moves()[3], 0, 4)
+        self.assertEqual([pack_move(m) for m in o.order(b, moves, 0, move_id(moves[5]))],
+                         list(o.order(b, b.packed_legal_moves(), 0, move_id(moves[5]))))
+        self.assertIs(moves[3], o.order(b, moves, 1)[0])
+
+        # jumped kings and promotions are found in packed moves too
+        kings = ".o.....o..,..o...o.o.,...o.x....,....o.....,,,.O........,..x...x.x.,...x...x.."
+        for notation in (",.x,,,,,,..x", kings):
+            b.set_board(notation)
+            ordered = o.order(b, b.legal_moves(), 0)
+            self.assertEqual([pack_move(m) for m in ordered], list(o.order(b, b.packed_legal_moves(), 0)))
+        self.assertTrue(ordered[0][0].removed_checker[2].crowned)
+        self.assertFalse(b.legal_moves()[0][0].removed_checker[2].crowned)
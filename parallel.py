@@ -0,0 +1,246 @@
+import os
+import random
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Value
+from typing import List
+
+import alphabeta
+from alphabeta import INF, MAX_DEPTH, SearchStats, _Search, _pvs, _pvs_child, alpha_beta_search, search
+from checkers import Board, Move, pack_move
+from evaluation import Evaluator
+from ordering import MoveOrdering
+from transposition import TranspositionTable, SharedTranspositionTable, NO_MOVE
+
+
+def parallel_alpha_beta_search(board: Board, max_depth: int, workers: int = None, evaluator: Evaluator = None,
+                               stats: SearchStats = None) -> List[Move]:
+    """
+    Returns best Move for given Board, found by searching root moves in parallel in a pool of processes.
+
+    The most promising root move is searched first in this process (young brothers wait), then all other root moves
+    are searched by the workers. Workers share the best value found so far, and only search each move to prove it is
+    not better. Result doesn't depend on the order in which workers finish: the best move is the one with the highest
+    value, and of those the first one in the order of the search.
+    :param board: Board to start search from
+    :param max_depth: Maximum tree depth to search, with the same meaning as in alpha_beta_search
+    :param workers: number of worker processes, number of CPUs if None
+    :param evaluator: Evaluator used to score positions at the leaves, MaterialEvaluator if None
+    :param stats: SearchStats to which node count (of all processes) and result of this search are added, or None
+    :return: best found Move, or None if there are no legal moves
+    """
+    legal_moves = board.legal_moves()
+    if len(legal_moves) <= 1:
+        # nothing to search for
+        return legal_moves[0] if legal_moves else None
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    s = _Search(board, TranspositionTable(), MoveOrdering(), SearchStats(), evaluator=evaluator)
+    moves = s.ordering.order(board, legal_moves, 0)
+    # workers find moves by their index in legal_moves of the same position
+    indices = [next(i for i, m in enumerate(legal_moves) if m is move) for move in moves]
+
+    # eldest brother is searched alone with full window, to get a good bound for the others
+    board.push(moves[0])
+    best_value = _pvs_child(board, s, max_depth, -INF, INF, 1, True, ())
+    board.pop()
+    nodes = s.stats.nodes + 1
+
+    shared_alpha = Value("i", best_value)
+    values = [best_value]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shared_alpha, evaluator)) as executor:
+        # workers get a copy with the move history, which decides draws by repetition and by the move count rules
+        position = board.copy()
+        futures = [executor.submit(_search_root_move, position, index, max_depth) for index in indices[1:]]
+        for future in futures:
+            value, worker_nodes = future.result()
+            values.append(value)
+            nodes += worker_nodes
+
+    best = max(range(len(moves)), key=lambda i: (values[i], -i))
+    if stats is not None:
+        stats.nodes += nodes
+        stats.depth, stats.value, stats.pv = max_depth, values[best], [moves[best]]
+    return moves[best]
+
+
+def lazy_smp_search(board: Board, time_ms: int = 1000, max_depth: int = MAX_DEPTH, workers: int = None,
+                    evaluator: Evaluator = None, stats: SearchStats = None, table_mb: float = 64) -> List[Move]:
+    """
+    Returns best Move for given Board, found by several processes searching the same position at once (Lazy SMP).
+
+    Every worker runs iterative deepening (see alphabeta.search) on the whole position, with a slightly different
+    move ordering, and all of them share one SharedTranspositionTable. Workers skip parts of the tree that other
+    workers already searched, as their results are found in the table. Result of the worker that finished the
+    deepest iteration is returned, ties are broken by the lowest worker number.
+    :param board: Board to start search from
+    :param time_ms: time budget for the search in milliseconds, or None for no time limit
+    :param max_depth: Maximum tree depth to search, with the same meaning as in alpha_beta_search
+    :param workers: number of worker processes, number of CPUs if None
+    :param evaluator: Evaluator used to score positions at the leaves, MaterialEvaluator if None
+    :param stats: SearchStats to which node count (of all workers) and result of the deepest search are added, or
+    None
+    :param table_mb: size of the shared transposition table in megabytes
+    :return: best found Move, or None if there are no legal moves
+    """
+    legal_moves = board.legal_moves()
+    if len(legal_moves) <= 1:
+        # nothing to search for
+        return legal_moves[0] if legal_moves else None
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    table = SharedTranspositionTable(table_mb)
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_lazy_smp_worker, board.copy(), time_ms, max_depth, table, evaluator, i)
+                       for i in range(workers)]
+            results = [future.result() for future in futures]
+    finally:
+        table.close()
+        table.unlink()
+
+    depth, value, index, nodes = max(results, key=lambda r: r[0])
+    if stats is not None:
+        stats.nodes += sum(r[3] for r in results)
+        stats.depth, stats.value, stats.pv = depth, value, [legal_moves[index]]
+    return legal_moves[index]
+
+
+def _lazy_smp_worker(board: Board, time_ms: int, max_depth: int, table: SharedTranspositionTable,
+                     evaluator: Evaluator, worker: int):
+    """
+    Runs iterative deepening of lazy_smp_search in a worker process.
+    :param board: copy of the searched board, with its move history
+    :param worker: number of the worker, worker 0 uses the default move ordering
+    :return: tuple (depth of the deepest finished iteration, its value, index of the best move in legal moves, number
+    of visited nodes)
+    """
+    legal_moves = board.legal_moves()
+
+    stats = SearchStats()
+    ordering = MoveOrdering() if worker == 0 else _ShuffledOrdering(worker)
+    move = search(board, time_ms, max_depth, table, ordering, stats, evaluator)
+    index = [pack_move(m) for m in legal_moves].index(pack_move(move))
+    table.close()
+    return stats.depth if stats.depth is not None else -1, stats.value, index, stats.nodes
+
+
+class _ShuffledOrdering(MoveOrdering):
+    """
+    MoveOrdering that orders moves with equal scores randomly instead of in the order of legal_moves, so that Lazy
+    SMP workers search the tree in different orders.
+    """
+
+    def __init__(self, seed: int):
+        super().__init__()
+        self.random = random.Random(seed)
+
+    def order(self, board: Board, moves: List[List[Move]], ply: int, hint: int = NO_MOVE) -> List[List[Move]]:
+        moves = list(moves)
+        self.random.shuffle(moves)
+        return super().order(board, moves, ply, hint)
+
+
+_worker_alpha = None
+_worker_evaluator = None
+_worker_table = None
+_worker_ordering = None
+# state of a worker process, set by _init_worker; table and ordering are reused for all root moves the process
+# searches, which are parts of the same search of the table
+
+
+def _init_worker(alpha, evaluator: Evaluator):
+    """
+    Initializes a worker process of parallel_alpha_beta_search.
+    :param alpha: multiprocessing.Value with the best value of root moves found so far
+    """
+    global _worker_alpha, _worker_evaluator, _worker_table, _worker_ordering
+    _worker_alpha = alpha
+    _worker_evaluator = evaluator
+    _worker_table = TranspositionTable()
+    _worker_table.new_search()
+    _worker_ordering = MoveOrdering()
+
+
+def _search_root_move(board: Board, index: int, max_depth: int):
+    """
+    Searches one root move in a worker process. Position is passed as a copy of the board with its move history (so
+    that draws are scored the same as in alpha_beta_search), and move as its index in legal moves of the position.
+    :return: tuple (value of the move for the player on the turn, number of visited nodes)
+    """
+    move = board.legal_moves()[index]
+
+    s = _Search(board, _worker_table, _worker_ordering, SearchStats(), evaluator=_worker_evaluator, new_search=False)
+    # a move with the same value as the best one must get an exact value too, so that the result doesn't depend on
+    # the order in which moves are finished
+    alpha = _worker_alpha.value - 1
+    board.push(move)
+    value = -_pvs(board, s, max_depth, -INF, -alpha, 1)
+    board.pop()
+
+    with _worker_alpha.get_lock():
+        if value > _worker_alpha.value:
+            _worker_alpha.value = value
+    return value, s.stats.nodes
+
+
+class ParallelSearchTests(unittest.TestCase):
+
+    def test_same_value(self):
+        for (notation, color, expected) in alphabeta.PrincipalVariationSearchTests.SUITE[:4]:
+            b = Board()
+            b.set_board(notation)
+            b.color = color
+            before = b.get_board()
+            serial, parallel = SearchStats(), SearchStats()
+            alpha_beta_search(b, 3, stats=serial)
+            move = parallel_alpha_beta_search(b, 3, workers=2, stats=parallel)
+            self.assertEqual(serial.value, parallel.value)
+            self.assertIn(str(move), [str(m) for m in b.legal_moves()])
+            self.assertEqual(before, b.get_board())
+
+    def test_history(self):
+        # after 23 moves of each player with kings only, every line of the search ends in a draw by the 25-move rule,
+        # which workers only see if they get the moves played before the position
+        b = Board()
+        b.set_board("......O.O.,,,,,,,,,X.X.X")
+        for i in range(46):
+            if i % 4 < 2:
+                move = next(m for m in b.legal_moves() if m[0].checker.crowned)
+            else:
+                back = b.move_stack[-2][0]
+                move = next(m for m in b.legal_moves()
+                            if (m[0].move_from, m[0].move_to) == (back.move_to, back.move_from))
+            b.push(move)
+        serial, parallel, lazy = SearchStats(), SearchStats(), SearchStats()
+        alpha_beta_search(b, 3, stats=serial)
+        parallel_alpha_beta_search(b, 3, workers=2, stats=parallel)
+        lazy_smp_search(b, time_ms=None, max_depth=3, workers=2, stats=lazy)
+        self.assertEqual(0, serial.value)
+        self.assertEqual(serial.value, parallel.value)
+        self.assertEqual(serial.value, lazy.value)
+
+    def test_single_move(self):
+        b = Board()
+        b.set_board(",,....o,...x")
+        self.assertEqual("[Move<x,f(3, 3),t(5, 1)>]", str(parallel_alpha_beta_search(b, 3, workers=2)))
+        b.set_board(".x")
+        self.assertIsNone(parallel_alpha_beta_search(b, 3, workers=2))
+
+    def test_worker_age(self):
+        # root moves searched by one worker are parts of one search, entries of earlier moves keep their slots
+        b = Board()
+        _init_worker(Value("i", -INF), None)
+        for index in range(len(b.legal_moves())):
+            _search_root_move(b, index, 2)
+        self.assertEqual(1, _worker_table.age)
+
+    def test_lazy_smp(self):
+        b = Board()
+        stats = SearchStats()
+        move = lazy_smp_search(b, time_ms=None, max_depth=3, workers=2, stats=stats)
+        self.assertIn(str(move), [str(m) for m in b.legal_moves()])
+        self.assertEqual(3, stats.depth)
+        self.assertEqual(str(move), str(stats.pv[0]))
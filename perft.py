@@ -0,0 +1,227 @@
+import argparse
+import time
+import unittest
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import checkers
+from checkers import Board, Move, WHITE, BLACK, pack_move
+
+MoveGenerator = Callable[[Board], Sequence[Union[List[Move], int]]]
+# returns legal moves of the board in any form Board.push accepts
+
+
+def reference_moves(board: Board) -> List[List[Move]]:
+    """
+    Legal moves found the slow way: jump chains of each checker by the recursive get_longest_jump_chains, on Checker
+    objects instead of bitboards, and normal moves only if no checker can jump. get_longest_jump_chains doesn't mark
+    promotions, so a chain of a man ending on the last row is marked here.
+    """
+    longest = [[]]
+    for (x, y, checker) in board.get_checkers():
+        if checker.color == board.color:
+            chains = checkers.get_longest_jump_chains(board, x, y, [], [[]])
+            if len(chains[0]) > len(longest[0]):
+                longest = chains
+            elif len(chains[0]) == len(longest[0]):
+                longest += chains
+    if longest[0]:
+        for chain in longest:
+            last = chain[-1]
+            if not chain[0].checker.crowned and checkers.will_get_crowned(chain[0].checker, last.move_to[1]):
+                chain[-1] = Move(last.checker, last.move_from, last.move_to, True, last.removed_checker)
+        return longest
+    return list(board.iter_quiet_moves())
+
+
+GENERATORS: Dict[str, MoveGenerator] = {
+    "moves": Board.legal_moves,
+    "packed": Board.packed_legal_moves,
+    "reference": reference_moves,
+}
+# move generators that can be compared by perft_diff, by name
+
+KNOWN: List[Tuple[str, str, bool, Tuple[int, ...]]] = [
+    ("initial", "", WHITE, (9, 81, 658, 4265, 27117, 167140, 1049442, 6483961)),
+    ("king jumps", ",,,,o.........,.o.....o..,,,....X.....,", WHITE, (2, 4, 40, 100, 949)),
+    ("kings", ".X,,...x,,.....o,,...O,,,....X", BLACK, (12, 133, 1226, 12276, 114171)),
+    ("men and kings", ",..o,.......O,....o,.x,......x,...X,........o,,x", WHITE, (2, 12, 150, 740, 7492)),
+]
+# name, notation (see Board.set_board), player on the turn and number of leaves at depths 1, 2, ...; the initial
+# position has the published perft numbers of international draughts, the others were counted by all of GENERATORS
+
+
+def perft(board: Board, depth: int, generator: MoveGenerator = Board.legal_moves) -> int:
+    """
+    Counts leaves of the game tree of given depth: all sequences of depth legal moves. Moves are only generated, and
+    not made, at the last level. Draw rules are not applied. The board is not changed.
+    :param generator: move generator to count the moves of
+    :return: number of leaves
+    """
+    moves = generator(board)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1, generator)
+        board.pop()
+    return nodes
+
+
+def divide(board: Board, depth: int, generator: MoveGenerator = Board.legal_moves) -> List[Tuple[str, int]]:
+    """
+    Counts leaves of perft(board, depth) below each legal move.
+    :return: list of (move, number of leaves) in the order of the generator; moves are strings of Move lists
+    """
+    result = []
+    for move in generator(board):
+        board.push(move)
+        nodes = perft(board, depth - 1, generator)
+        board.pop()
+        result.append((_move_name(move), nodes))
+    return result
+
+
+def perft_diff(board: Board, depth: int, first: MoveGenerator, second: MoveGenerator) -> \
+        Optional[Tuple[List[str], List[str], List[str]]]:
+    """
+    Compares two move generators move by move in all positions up to given depth: both must return the same moves
+    (compared packed with pack_move, in any order). The board is not changed.
+    :return: None if generators agree, otherwise tuple (moves leading to the first position where they differ, moves
+    only first returns, moves only second returns)
+    """
+    first_moves = {_packed(move): move for move in first(board)}
+    second_moves = {_packed(move): move for move in second(board)}
+    if first_moves.keys() != second_moves.keys():
+        return ([], [_move_name(m) for (p, m) in first_moves.items() if p not in second_moves],
+                [_move_name(m) for (p, m) in second_moves.items() if p not in first_moves])
+    if depth <= 1:
+        return None
+    for move in first_moves.values():
+        board.push(move)
+        difference = perft_diff(board, depth - 1, first, second)
+        board.pop()
+        if difference is not None:
+            return [_move_name(move)] + difference[0], difference[1], difference[2]
+    return None
+
+
+def benchmark(board: Board, depth: int, generator: MoveGenerator = Board.legal_moves) -> List[Dict]:
+    """
+    Runs perft to each depth up to given depth and measures its speed.
+    :return: one dict per depth, with depth, nodes, seconds and nodes_per_second
+    """
+    results = []
+    for d in range(1, depth + 1):
+        start = time.perf_counter()
+        nodes = perft(board, d, generator)
+        seconds = time.perf_counter() - start
+        results.append({"depth": d, "nodes": nodes, "seconds": seconds,
+                        "nodes_per_second": nodes / seconds if seconds > 0 else 0.0})
+    return results
+
+
+def _packed(move: Union[List[Move], int]) -> int:
+    return move if isinstance(move, int) else pack_move(move)
+
+
+def _move_name(move: Union[List[Move], int]) -> str:
+    if isinstance(move, int):
+        f, t, captured, promotion = checkers.unpack_move(move)
+        return f"{checkers.COORDS[f]}-{checkers.COORDS[t]}" + ("x" + str(bin(captured).count("1")) if captured else "")
+    return str(move)
+
+
+def _board(notation: str, color: bool) -> Board:
+    board = Board()
+    if notation:
+        board.set_board(notation)
+    board.color = color
+    return board
+
+
+class PerftTests(unittest.TestCase):
+    def test_known(self):
+        for (name, notation, color, counts) in KNOWN:
+            board = _board(notation, color)
+            before = board.get_board()
+            for depth, count in enumerate(counts[:4], 1):
+                self.assertEqual(count, perft(board, depth), name)
+            self.assertEqual(before, board.get_board())
+            self.assertEqual(1, perft(board, 0))
+
+    def test_generators(self):
+        for (name, notation, color, counts) in KNOWN:
+            for generator in GENERATORS.values():
+                self.assertEqual(counts[2], perft(_board(notation, color), 3, generator), name)
+
+    def test_divide(self):
+        board = _board(*KNOWN[1][1:3])
+        result = divide(board, 4)
+        self.assertEqual(KNOWN[1][3][0], len(result))
+        self.assertEqual(KNOWN[1][3][3], sum(nodes for (move, nodes) in result))
+
+    def test_diff(self):
+        for (name, notation, color, counts) in KNOWN:
+            self.assertIsNone(perft_diff(_board(notation, color), 3, Board.legal_moves, reference_moves), name)
+
+        # a generator that forgets normal moves of kings
+        def broken(board: Board):
+            return [move for move in board.legal_moves() if move[0].removed_checker is not None or
+                    not move[0].checker.crowned]
+
+        board = _board(*KNOWN[2][1:3])
+        path, only_first, only_second = perft_diff(board, 3, Board.legal_moves, broken)
+        self.assertEqual([], path)
+        self.assertEqual(KNOWN[2][3][0], len(only_first) + len(broken(board)))
+        self.assertGreater(len(only_first), 0)
+        self.assertEqual([], only_second)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Counts and times leaves of the game tree to check move generation.")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--position", default=None,
+                        help="position in Board.set_board notation or name of a KNOWN position, initial by default")
+    parser.add_argument("--black", action="store_true", help="black is on the turn in --position")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default="moves")
+    parser.add_argument("--divide", action="store_true", help="print number of leaves below each move")
+    parser.add_argument("--diff", choices=sorted(GENERATORS), default=None,
+                        help="compare moves of --generator with this generator up to --depth")
+    parser.add_argument("--check", action="store_true", help="check all KNOWN positions up to --depth")
+    args = parser.parse_args()
+
+    known = {name: (notation, color) for (name, notation, color, counts) in KNOWN}
+    if args.position in known:
+        board = _board(*known[args.position])
+    else:
+        board = _board(args.position or "", BLACK if args.black else WHITE)
+    generator = GENERATORS[args.generator]
+
+    if args.check:
+        failed = False
+        for (name, notation, color, counts) in KNOWN:
+            for depth, count in enumerate(counts[:args.depth], 1):
+                nodes = perft(_board(notation, color), depth, generator)
+                failed |= nodes != count
+                print(f"{name:15} {depth:5} {nodes:10} {'ok' if nodes == count else 'expected ' + str(count)}")
+        raise SystemExit(1 if failed else 0)
+    elif args.diff is not None:
+        difference = perft_diff(board, args.depth, generator, GENERATORS[args.diff])
+        if difference is None:
+            print("Generators agree to depth " + str(args.depth))
+        else:
+            path, only_first, only_second = difference
+            print("Generators differ after moves: " + (" ".join(path) or "(none)"))
+            print("Only " + args.generator + ": " + ", ".join(only_first))
+            print("Only " + args.diff + ": " + ", ".join(only_second))
+            raise SystemExit(1)
+    elif args.divide:
+        result = divide(board, args.depth, generator)
+        for (move, nodes) in result:
+            print(f"{move} {nodes}")
+        print("Moves: " + str(len(result)) + ", leaves: " + str(sum(nodes for (move, nodes) in result)))
+    else:
+        print("depth       nodes   seconds    nodes/s")
+        for r in benchmark(board, args.depth, generator):
+            print(f"{r['depth']:5}  {r['nodes']:10}  {r['seconds']:8.3f}  {r['nodes_per_second']:9.0f}")
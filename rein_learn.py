@@ -1,10 +1,15 @@
-import copy
+import argparse
+import os
+import tempfile
+import unittest
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from random import Random
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-import sys
+import numpy as np
 
-from checkers import Board, Move
-from random import randint, uniform
-from alphabeta import alpha_beta_search
+from checkers import Board, Move, WHITE, BLACK, pack_move, unpack_move
+from tournament import Agent, make_agent
 
 # ~ Player 1 is us ~
 
@@ -109,14 +114,217 @@ class State:
                -5 * self.n_their_king + \
                6 * self.n_pcs_on_edge
 
-
-
-
-def get_transition_key(from_state, to_state):
-    return from_state.to_string() + "->" + to_state.to_string()
-
-def get_from_and_to(transition_key):
-    return transition_key.split('->')
+    def features(self) -> Tuple[int, ...]:
+        return (self.n_our_un_crwn_pices, self.n_their_un_crwn_pices, self.n_our_king, self.n_their_king,
+                self.n_pcs_on_edge, self.own_center_of_mass, self.their_center_of_mass)
+
+    def key(self) -> int:
+        """
+        Packs the features into a single integer, see FEATURE_BITS.
+        """
+        key = 0
+        for value, bits in zip(self.features(), FEATURE_BITS):
+            key = key << bits | value
+        return key
+
+    @staticmethod
+    def from_key(key: int) -> 'State':
+        features = []
+        for bits in reversed(FEATURE_BITS):
+            features.append(key & ((1 << bits) - 1))
+            key >>= bits
+        return State(*reversed(features))
+
+
+FEATURE_BITS = (5, 5, 5, 5, 4, 4, 4)
+# bits of each State feature in packed state keys, in the order of State.features(); a key takes 32 bits, so a
+# transition (from and to state) fits into 64 bits
+STATE_BITS = sum(FEATURE_BITS)
+FEATURE_SHIFTS = np.array([sum(FEATURE_BITS[i + 1:]) for i in range(len(FEATURE_BITS))], dtype=np.uint64)
+
+
+def get_transition_key(from_key: int, to_key: int) -> int:
+    return from_key << STATE_BITS | to_key
+
+def get_from_and_to(transition_key: int) -> Tuple[int, int]:
+    return transition_key >> STATE_BITS, transition_key & ((1 << STATE_BITS) - 1)
+
+
+def successor_features(board: Board, legal_moves: Sequence[Union[List[Move], int]]):
+    """
+    Computes features of States after each of the moves without playing them: counts and edge rows of the board only
+    change by the checkers a move moves, crowns and captures, which are read from the move packed with pack_move.
+    :param legal_moves: legal moves of board, lists of Moves or packed with pack_move
+    :return: array of shape (len(legal_moves), 7), one row of State.features() per move
+    """
+    wm, wk, bm, bk = board.counts()
+    white = board.white_men | board.white_kings
+    opponent_men, opponent_kings = (board.black_men, board.black_kings) if board.color == WHITE else \
+        (board.white_men, board.white_kings)
+    rows = []
+    for move in legal_moves:
+        f, t, removed, promotion = unpack_move(move if isinstance(move, int) else pack_move(move))
+        men, kings = bin(removed & opponent_men).count("1"), bin(removed & opponent_kings).count("1")
+        if board.color == WHITE:
+            after = white & ~(1 << f) | 1 << t
+            rows.append((wm - promotion, bm - men, wk + promotion, bk - kings, _edge_rows(after), 0, 0))
+        else:
+            after = white & ~removed
+            rows.append((wm - men, bm - promotion, wk - kings, bk + promotion, _edge_rows(after), 0, 0))
+    return np.array(rows, dtype=np.int64).reshape(len(rows), 7)
+
+
+LEFT_EDGE = sum(1 << y for y in range(0, 100, 10))
+# squares on the left edge of the board
+
+
+def _edge_rows(mask: int) -> int:
+    """
+    :return: number of rows with a checker of the bitboard on the left or right edge of the board
+    """
+    # squares on the right edge are moved to the left edge of the same row
+    return bin((mask | mask >> 9) & LEFT_EDGE).count("1")
+
+
+def pack_features(features) -> np.ndarray:
+    """
+    :param features: array of rows of State.features()
+    :return: State.key() of every row, as an uint64 array
+    """
+    return (features.astype(np.uint64) << FEATURE_SHIFTS).sum(axis=1, dtype=np.uint64)
+
+
+EMPTY_KEY = (1 << 64) - 1
+# key of empty slots of QTable, not a valid transition key as the 5-bit features of a state can't all be 31
+QTABLE_DTYPE = np.dtype([("key", "<u8"), ("value", "<f8")])
+
+
+class QTable:
+    """
+    Q-table of transitions between States: values by transition key (see get_transition_key), in an open addressing
+    hash table of NumPy arrays with linear probing. The table can be saved to an .npy file and loaded back as a
+    read-only memory map, without rebuilding it; such a table can't be changed.
+    """
+
+    def __init__(self, capacity: int = 1024, entries: np.ndarray = None):
+        """
+        :param capacity: initial number of slots, a power of 2
+        :param entries: array of QTABLE_DTYPE to use as the table (see load), or None
+        """
+        if entries is None:
+            entries = np.zeros(capacity, dtype=QTABLE_DTYPE)
+            entries["key"] = EMPTY_KEY
+        self.entries = entries
+        self.keys, self.values = entries["key"], entries["value"]
+        self.shift = 64 - (len(entries).bit_length() - 1)
+        self.size = int(np.count_nonzero(self.keys != EMPTY_KEY))
+        self.maxima: Dict[int, float] = {}
+        # maximum value of transitions from each state, see max_from
+        self.transitions: Optional[Dict[int, List[int]]] = None
+        # keys of transitions from each state, only built when a maximum decreases for the first time, see
+        # _transitions_from
+        if self.size:
+            occupied = self.keys != EMPTY_KEY
+            from_keys, values = self.keys[occupied] >> np.uint64(STATE_BITS), self.values[occupied]
+            order = np.lexsort((values, from_keys))
+            last = np.append(from_keys[order][1:] != from_keys[order][:-1], True)
+            self.maxima = dict(zip(from_keys[order][last].tolist(), values[order][last].tolist()))
+
+    def __len__(self):
+        return self.size
+
+    def _slot(self, key: int) -> int:
+        """
+        :return: slot of key, or the empty slot where it would be inserted
+        """
+        mask = len(self.keys) - 1
+        slot = ((key * 0x9E3779B97F4A7C15) & EMPTY_KEY) >> self.shift
+        keys = self.keys
+        while True:
+            k = int(keys[slot])
+            if k == key or k == EMPTY_KEY:
+                return slot
+            slot = (slot + 1) & mask
+
+    def __contains__(self, key: int) -> bool:
+        return int(self.keys[self._slot(key)]) == key
+
+    def get(self, key: int, default: float = None) -> Optional[float]:
+        slot = self._slot(key)
+        return float(self.values[slot]) if int(self.keys[slot]) == key else default
+
+    def __getitem__(self, key: int) -> float:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: int, value: float):
+        if not self.keys.flags.writeable:
+            # growing would silently copy the table into memory, and changes would never get into the file
+            raise ValueError("Q-table is a read-only memory map, load it with mmap=False to change it")
+        if 2 * (self.size + 1) > len(self.keys):
+            self._grow()
+        slot = self._slot(key)
+        old = float(self.values[slot]) if int(self.keys[slot]) == key else None
+        self.keys[slot] = key
+        self.values[slot] = value
+        from_key = key >> STATE_BITS
+        if old is None:
+            self.size += 1
+            if self.transitions is not None:
+                self.transitions.setdefault(from_key, []).append(key)
+
+        best = self.maxima.get(from_key)
+        if best is None or value >= best:
+            self.maxima[from_key] = value
+        elif old == best:
+            # the maximum decreased, find the new one among transitions from the same state
+            self.maxima[from_key] = max(self.get(k) for k in self._transitions_from(from_key))
+
+    def _transitions_from(self, from_key: int) -> List[int]:
+        """
+        :return: keys of all transitions from given state
+        """
+        if self.transitions is None:
+            # keys of transitions from the same state are next to each other when sorted, as from key is their top
+            keys = np.sort(self.keys[self.keys != EMPTY_KEY])
+            from_keys = keys >> np.uint64(STATE_BITS)
+            starts = np.flatnonzero(np.append(True, from_keys[1:] != from_keys[:-1]))
+            self.transitions = dict(zip(from_keys[starts].tolist(), (k.tolist() for k in np.split(keys, starts[1:]))))
+        return self.transitions[from_key]
+
+    def _grow(self):
+        old_keys, old_values = self.keys, self.values
+        entries = np.zeros(2 * len(old_keys), dtype=QTABLE_DTYPE)
+        entries["key"] = EMPTY_KEY
+        self.entries, self.keys, self.values = entries, entries["key"], entries["value"]
+        self.shift -= 1
+        for slot in np.flatnonzero(old_keys != EMPTY_KEY).tolist():
+            new_slot = self._slot(int(old_keys[slot]))
+            self.keys[new_slot] = old_keys[slot]
+            self.values[new_slot] = old_values[slot]
+
+    def max_from(self, from_key: int) -> Optional[float]:
+        """
+        :return: highest value of transitions from given state, or None if there are none
+        """
+        return self.maxima.get(from_key)
+
+    def save(self, path: str):
+        """
+        Saves the table (with its empty slots, so it can be used as it is) into an .npy file.
+        """
+        np.save(path, self.entries)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'QTable':
+        """
+        Loads a table saved with save.
+        :param mmap: if True, the table is a read-only memory map of the file (setting a value raises ValueError),
+        otherwise it is loaded into memory
+        """
+        return QTable(entries=np.load(path, mmap_mode="r" if mmap else None))
 
 
 def get_pics_on_edge(pics_mark, king_mark, board):
@@ -127,19 +335,17 @@ def get_pics_on_edge(pics_mark, king_mark, board):
     return counter
 
 def have_we_won(board: Board):
-    board_str = board.get_board()
-    n_we = board_str.count(our_pics) + board_str.count(our_kings)
-    n_they = board_str.count(their_pics) + board_str.count(their_kings)
+    white_men, white_kings, black_men, black_kings = board.counts()
+    n_we = white_men + white_kings
+    n_they = black_men + black_kings
 
     return n_we >= n_they
 
 
 def get_state(move: Move, board: Board):
     board.push(move)
-    n_our_un_crwn_pices = board.get_board().count(our_pics)
-    n_their_un_crwn_pices = board.get_board().count(their_pics)
-    n_our_king = board.get_board().count(our_kings)
-    n_their_king = board.get_board().count(their_kings)
+    # we play white checkers (our_pics)
+    n_our_un_crwn_pices, n_our_king, n_their_un_crwn_pices, n_their_king = board.counts()
     n_pcs_on_edge = get_pics_on_edge(our_pics, our_kings, board)
     own_center_of_mass = 0
     their_center_of_mass = 0
@@ -156,176 +362,348 @@ def get_state(move: Move, board: Board):
 
 
 def get_transitions(current_state: State, legal_moves, board: Board):
+    # states after all moves are computed at once, same as get_state of each move; packed moves are in the same order
+    # as legal moves
+    from_key = current_state.key()
+    to_keys = pack_features(successor_features(board, board.packed_legal_moves())).tolist() if legal_moves else []
     transitions = {}
     action_by_transition = {}
-    for move in legal_moves:
-        new_state = get_state(move, board)
-        transiton_key = get_transition_key(current_state, new_state)
-        transitions[transiton_key] = [current_state, new_state]
+    for move, to_key in zip(legal_moves, to_keys):
+        transiton_key = get_transition_key(from_key, to_key)
+        transitions[transiton_key] = [from_key, to_key]
         action_by_transition[transiton_key] = move
 
     return transitions, action_by_transition
 
 
-# Actions
-# Is a transition between state
-
-# Q-table -> Q[State][Action]
-# Q - table is dynamic and is names Transition table, as it is in key (transition) value format
-# It is 2D dictionary:
-#   o first key is a "from" state
-#   o second key is a "to" state
-T = {}
-
 # Exploration rate (0 <= ex_rate <= 1)
 # Rate at which AI tries to make new moves
 ex_rate = 0.8
 
-wins = 0
-
-if learning:
-    for i in range(nmb_of_learning_iterations):
-
-        # Init board
-        board = Board()
-
-        # Init starting state
-        current_state = State(20, 20, 0, 0, 4, 0, 0)
-
-        while True:
-
-            # Generate all moves
-            legal_moves = board.legal_moves()
-
-            # Check if game over
-            if len(legal_moves) <= 0:
-                print("Prisel do konca")
-
-                # If we won
-                if have_we_won(board):
-                    T[current_state.to_string()][new_state.to_string()] *= 10
-                    print()
-                    print("--- ZMAGA JE NASA --")
-                    print()
-                    wins+=1
-                # If we lost
-                else:
-                    T[current_state.to_string()][new_state.to_string()] *= -10
-                    print()
-                    print("--- ZGUBILI SMO --")
-                    print()
-                break
-
-            # If only one move available: do it
-            if len(legal_moves) == 1:
-                pass
-
-
-            # For every move calculate the state it produces
-            board_copy = copy.deepcopy(board)
-            transitions, action_by_transition = get_transitions(current_state, legal_moves, board_copy)
 
-            explore = uniform(0, 1) <= ex_rate
-
-            new_transitions = {}
-            chosen_transition_key = ""
-
-            if not T:
-                # Empty dictionary: 100% explore
-                new_transitions = transitions
-                explore = True
-            else:
-                # If one or more transition is unknown, then explore or choose the highest value with ration ex_rate
-                max_value = -sys.maxsize -1
-                max_transition_to_state = None
-                has_known_transitions = False
-
-                for transition_key, states in transitions.items():
-                    state_keys = get_from_and_to(transition_key)
-                    from_state_key = state_keys[0]
-                    to_state_key = state_keys[1]
-                    if from_state_key not in T or to_state_key not in T[from_state_key]:
-                        new_transitions[transition_key] = states
-                        continue
-
-                    value = T[from_state_key][to_state_key]
-
-                    if value > max_value:
-                        max_value = value
-                        chosen_transition_key = transition_key
-                        max_transition_to_state = states[1]
-                        has_known_transitions = True
-
-            if len(new_transitions) <= 0:
-                explore = False
-
-            if explore or not has_known_transitions:
-                # Choose random new transition
-                new_state_key = list(new_transitions.keys())[randint(0, len(new_transitions) - 1)]
-                new_state = new_transitions[new_state_key][1]
-                old_transition_value = 0
-                chosen_transition_key = new_state_key
-            else:
-                # Choose max transition
-                new_state = max_transition_to_state
-                old_transition_value = max_value
-
-            value_of_transition = old_transition_value - new_state.get_value()
-
-            # Get max optimal future value
-            if new_state.to_string() not in T:
-                optimal_future_value = 0
+def board_state(board: Board) -> State:
+    """
+    :return: State of the board itself (as get_state returns State after a move)
+    """
+    white = board.white_men | board.white_kings
+    n_our_un_crwn_pices, n_our_king, n_their_un_crwn_pices, n_their_king = board.counts()
+    n_pcs_on_edge = sum(1 for y in range(0, 100, 10) if white & (1 << y | 1 << (y + 9)))
+    return State(n_our_un_crwn_pices, n_their_un_crwn_pices, n_our_king, n_their_king, n_pcs_on_edge, 0, 0)
+
+
+Transition = Tuple[int, int, float]
+# (from state key, to state key, reward): a move of the Q-learning player, reward is value of the state after it
+
+
+class QLearningAgent(Agent):
+    """
+    Q-learning player. Its Q-table (a QTable of transitions between States) has values for the white player: the agent
+    learns by playing white, and when playing black it prefers transitions with the lowest value.
+    """
+
+    def __init__(self, table: QTable = None, alpha: float = _alpha, delta: float = _delta,
+                 exploration: float = ex_rate, seed: int = None):
+        """
+        :param table: Q-table, an empty one if None
+        :param alpha: learning rate (0 <= alpha <= 1)
+        :param delta: discount factor (0 <= delta <= 1)
+        :param exploration: probability of trying an unknown transition while learning (0 <= exploration <= 1)
+        :param seed: seed of random choices
+        """
+        self.table = table if table is not None else QTable()
+        self.alpha = alpha
+        self.delta = delta
+        self.exploration = exploration
+        self.random = Random(seed)
+
+    def new_game(self, color: bool, seed: int):
+        self.random.seed(seed)
+
+    def choose_move(self, board: Board) -> List[Move]:
+        """
+        Returns move with the best known transition for the player on the turn, or a random move if no transition is
+        known. The board is not changed.
+        :return: one of board.legal_moves(), or None if there are none
+        """
+        legal_moves = board.legal_moves()
+        if not legal_moves:
+            return None
+        return self._choose(board, legal_moves, False)[2]
+
+    def select_move(self, board: Board) -> List[Move]:
+        return self.choose_move(board)
+
+    def _choose(self, board: Board, legal_moves: List[List[Move]], explore: bool) -> Tuple[int, int, List[Move]]:
+        """
+        :param explore: if True, an unknown transition is chosen with probability exploration
+        :return: tuple (from state key, to state key, move) of the chosen transition
+        """
+        transitions, action_by_transition = get_transitions(board_state(board), legal_moves, board)
+        sign = 1 if board.color == WHITE else -1
+        known, unknown = [], []
+        for key in transitions:
+            value = self.table.get(key)
+            if value is None:
+                unknown.append(key)
             else:
-                key_of_max = max(T[new_state.to_string()].keys(), key=(lambda k: T[new_state.to_string()][k]))
-                optimal_future_value = T[new_state.to_string()][key_of_max]
-
-            # Now we update transition table:
-            # new_value <- (1-_alpha)old_value + _alpha*(reward_for_transition + _delta*(max (all_new_potential_transitions - current_transition)))
-            if current_state not in T:
-                T[current_state.to_string()] = {}
-
-            T[current_state.to_string()][new_state.to_string()] = old_transition_value + _alpha*value_of_transition + _delta*optimal_future_value
-
-            # Make move
-            move = action_by_transition[chosen_transition_key]
+                known.append((sign * value, key))
+        if unknown and (not known or explore and self.random.random() <= self.exploration):
+            key = unknown[self.random.randrange(len(unknown))]
+        else:
+            key = max(known)[1]
+        from_key, to_key = transitions[key]
+        return from_key, to_key, action_by_transition[key]
+
+    def play_episode(self, opponent: Agent) -> Tuple[List[Transition], bool]:
+        """
+        Plays one game as white against opponent (which plays black), exploring but without changing the table.
+        :return: tuple (transitions of this agent in order, True if it won)
+        """
+        board = Board()
+        transitions = []
+        while board.outcome() is None:
+            from_key, to_key, move = self._choose(board, board.legal_moves(), True)
+            transitions.append((from_key, to_key, State.from_key(to_key).get_value()))
             board.push(move)
-
-            print("Q-learn made a move:\n")
-            print(board)
-            print("----- ----- -----")
-
-
-
-            # AlphaBeta makes move
-            # !! important: work with this copy of a board to prevent
-            # accidental changes to actual game state.
-            board_copy = copy.deepcopy(board)
-            best_move = alpha_beta_search(board_copy, 4)
-            if best_move is not None:
-                board.push(best_move)
-            else:
-                print("Prisel do konca")
-                # If we won
-                if have_we_won(board):
-                    T[current_state.to_string()][new_state.to_string()] *= 10
-                    print()
-                    print("--- ZMAGA JE NASA --")
-                    print()
-                    wins += 1
-                # If we lost
-                else:
-                    T[current_state.to_string()][new_state.to_string()] *= -10
-                    print()
-                    print("--- ZGUBILI SMO --")
-                    print()
+            if board.outcome() is not None:
                 break
-
-            print("Alpha-Beta made a move:\n")
-            print(board)
-            print("----- ----- -----")
-
-
-print()
-print("*******************")
-print("Koncni score: "+ str(wins)+"/"+str(nmb_of_learning_iterations))
-print("*******************")
\ No newline at end of file
+            # opponent gets a copy, so it can't change the game
+            board.push(opponent.select_move(board.copy()))
+        return transitions, have_we_won(board)
+
+    def learn(self, transitions: List[Transition], won: bool):
+        """
+        Updates the table with transitions of a played episode, in the order they were played: value of each
+        transition moves by alpha towards its value minus the reward plus delta times the best value from the state
+        after it. Value of the last transition is multiplied by 10 if the episode was won, and by -10 if it was lost.
+        """
+        table = self.table
+        for from_key, to_key, reward in transitions:
+            key = get_transition_key(from_key, to_key)
+            old_value = table.get(key, 0.0)
+            optimal_future_value = table.max_from(to_key)
+            if optimal_future_value is None:
+                optimal_future_value = 0
+            table[key] = old_value + self.alpha * (old_value - reward) + self.delta * optimal_future_value
+        if transitions:
+            key = get_transition_key(*transitions[-1][:2])
+            table[key] *= 10 if won else -10
+
+
+class Trainer:
+    """
+    Trains a QLearningAgent by playing episodes against an opponent, in this process or in a pool of worker processes.
+    Workers play with a read-only snapshot of the table (memory-mapped .npy file) and send back transitions of their
+    episodes; the trainer merges them into the table as they arrive, and saves a new snapshot for the workers after
+    every sync_every merged episodes.
+    """
+
+    def __init__(self, agent: QLearningAgent, opponent: str = "alphabeta:4", workers: int = 1,
+                 episodes_per_task: int = 10, sync_every: int = 100, seed: int = 0):
+        """
+        :param agent: agent to train
+        :param opponent: spec of the opponent, see tournament.make_agent
+        :param workers: number of worker processes, 1 to play all episodes in this process and learn from each
+        episode before the next one, or None for number of CPUs
+        :param episodes_per_task: number of episodes a worker plays before it sends back their transitions
+        :param sync_every: number of merged episodes after which workers get a new snapshot
+        :param seed: seed of the first episode, following episodes use the following seeds
+        """
+        self.agent = agent
+        self.opponent = opponent
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.episodes_per_task = episodes_per_task
+        self.sync_every = sync_every
+        self.seed = seed
+        self.episodes = 0
+        self.wins = 0
+        # number of played and won episodes so far
+
+    def train(self, episodes: int) -> int:
+        """
+        Plays given number of episodes and learns from them.
+        :return: number of won episodes
+        """
+        wins = self._train_parallel(episodes) if self.workers > 1 else self._train_here(episodes)
+        self.episodes += episodes
+        self.wins += wins
+        return wins
+
+    def _train_here(self, episodes: int) -> int:
+        opponent = make_agent(self.opponent)
+        wins = 0
+        for i in range(self.episodes, self.episodes + episodes):
+            self.agent.new_game(WHITE, self.seed + i)
+            opponent.new_game(BLACK, self.seed + i)
+            transitions, won = self.agent.play_episode(opponent)
+            self.agent.learn(transitions, won)
+            wins += won
+        return wins
+
+    def _train_parallel(self, episodes: int) -> int:
+        agent = self.agent
+        wins, merged, version = 0, 0, 0
+        first, submitted = self.episodes, self.episodes
+        with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(self.workers) as executor:
+            snapshot = os.path.join(directory, "snapshot-0.npy")
+            agent.table.save(snapshot)
+            pending = set()
+            while submitted < first + episodes or pending:
+                # keep every worker busy with one task, and one more task waiting
+                while submitted < first + episodes and len(pending) < 2 * self.workers:
+                    count = min(self.episodes_per_task, first + episodes - submitted)
+                    pending.add(executor.submit(_play_episodes, snapshot, self.opponent, agent.exploration,
+                                                self.seed + submitted, count))
+                    submitted += count
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for transitions, won in future.result():
+                        agent.learn(transitions, won)
+                        wins += won
+                        merged += 1
+                if merged >= self.sync_every * (version + 1):
+                    # a new file for every snapshot, as workers may still have the old one mapped
+                    version += 1
+                    snapshot = os.path.join(directory, f"snapshot-{version}.npy")
+                    agent.table.save(snapshot)
+        return wins
+
+
+_worker_agent = (None, None)
+# snapshot path and QLearningAgent of a worker process of Trainer, the snapshot is only loaded when it changes
+_worker_opponents: Dict[str, Agent] = {}
+# opponents of a worker process of Trainer, by spec
+
+
+def _play_episodes(snapshot: str, opponent: str, exploration: float, seed: int, episodes: int) -> \
+        List[Tuple[List[Transition], bool]]:
+    """
+    Plays episodes in a worker process of Trainer.
+    :return: transitions and result of each episode
+    """
+    global _worker_agent
+    if _worker_agent[0] != snapshot:
+        _worker_agent = (snapshot, QLearningAgent(QTable.load(snapshot), exploration=exploration))
+    agent = _worker_agent[1]
+    if opponent not in _worker_opponents:
+        _worker_opponents[opponent] = make_agent(opponent)
+
+    results = []
+    for i in range(seed, seed + episodes):
+        agent.new_game(WHITE, i)
+        _worker_opponents[opponent].new_game(BLACK, i)
+        results.append(agent.play_episode(_worker_opponents[opponent]))
+    return results
+
+
+class QTableTests(unittest.TestCase):
+
+    def test_features(self):
+        b = Board()
+        b.set_board(",,,,.x.o.x,..X..x,,o...o,......O,x")
+        moves = b.legal_moves()
+        features = successor_features(b, moves)
+        keys = pack_features(features).tolist()
+        for move, row, key in zip(moves, features.tolist(), keys):
+            state = get_state(move, b)
+            self.assertEqual(list(state.features()), row)
+            self.assertEqual(state.key(), key)
+            self.assertEqual(state.features(), State.from_key(key).features())
+
+    def test_table(self):
+        table = QTable(capacity=4)
+        for i in range(100):
+            table[get_transition_key(i % 7, i)] = float(i)
+        self.assertEqual(100, len(table))
+        self.assertEqual(50.0, table[get_transition_key(1, 50)])
+        self.assertIsNone(table.get(get_transition_key(2, 50)))
+        self.assertEqual(99.0, table.max_from(1))
+        # maximum is found again when it decreases
+        table[get_transition_key(1, 99)] = -1.0
+        self.assertEqual(92.0, table.max_from(1))
+        self.assertIsNone(table.max_from(7))
+        # transitions added later are found too
+        table[get_transition_key(1, 1000)] = 90.0
+        for i in range(100, 1000):
+            table[get_transition_key(i % 7, i)] = 0.0
+        table[get_transition_key(1, 92)] = -1.0
+        self.assertEqual(90.0, table.max_from(1))
+        table[get_transition_key(1, 1000)] = -2.0
+        self.assertEqual(85.0, table.max_from(1))
+
+    def test_save_load(self):
+        table = QTable()
+        table[get_transition_key(3, 4)] = 2.5
+        table[get_transition_key(3, 5)] = 1.5
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "q.npy")
+            table.save(path)
+            loaded = QTable.load(path)
+            self.assertEqual(2, len(loaded))
+            self.assertEqual(1.5, loaded[get_transition_key(3, 5)])
+            self.assertEqual(2.5, loaded.max_from(3))
+            # memory mapped table is read-only, also when it would have to grow
+            self.assertRaises(ValueError, loaded.__setitem__, get_transition_key(3, 6), 1.0)
+            small = QTable(capacity=4)
+            small[get_transition_key(3, 4)] = 2.5
+            small[get_transition_key(3, 5)] = 1.5
+            small.save(path)
+            small = QTable.load(path)
+            self.assertRaises(ValueError, small.__setitem__, get_transition_key(3, 6), 1.0)
+            self.assertEqual(4, len(small.keys))
+            self.assertIsNone(small.get(get_transition_key(3, 6)))
+            del loaded, small
+
+    def test_agent(self):
+        agent = QLearningAgent(seed=1)
+        b = Board()
+        # nothing is known yet, any legal move
+        self.assertIn(str(agent.choose_move(b)), [str(m) for m in b.legal_moves()])
+        self.assertEqual(Board().get_board(), b.get_board())
+
+        from_key = board_state(b).key()
+        moves = b.legal_moves()
+        to_keys = pack_features(successor_features(b, moves)).tolist()
+        agent.table[get_transition_key(from_key, to_keys[3])] = 5.0
+        self.assertEqual(to_keys[3], get_state(agent.choose_move(b), b).key())
+        b.set_board(".x")
+        self.assertIsNone(agent.choose_move(b))
+
+    def test_train(self):
+        agent = QLearningAgent(seed=1)
+        transitions, won = agent.play_episode(make_agent("alphabeta:1"))
+        self.assertEqual(0, len(agent.table))
+        agent.learn(transitions, won)
+        self.assertEqual(len({t[:2] for t in transitions}), len(agent.table))
+        trainer = Trainer(agent, opponent="alphabeta:1")
+        self.assertIn(trainer.train(2), (0, 1, 2))
+        self.assertEqual(2, trainer.episodes)
+
+    def test_parallel_train(self):
+        trainer = Trainer(QLearningAgent(), opponent="alphabeta:1", workers=2, episodes_per_task=1, sync_every=2)
+        wins = trainer.train(4)
+        self.assertLessEqual(wins, 4)
+        self.assertGreater(len(trainer.agent.table), 0)
+
+
+# training runs only when this file is run as a script, so that Q-learning classes can be imported
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trains Q-learning player against another player.")
+    parser.add_argument("--episodes", type=int, default=nmb_of_learning_iterations)
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes playing the episodes")
+    parser.add_argument("--opponent", default="alphabeta:4", help="opponent, see tournament.make_agent")
+    parser.add_argument("--alpha", type=float, default=_alpha, help="learning rate")
+    parser.add_argument("--delta", type=float, default=_delta, help="discount factor")
+    parser.add_argument("--exploration", type=float, default=ex_rate, help="exploration rate")
+    parser.add_argument("--table", default=None, help=".npy file of the Q-table to continue training from")
+    parser.add_argument("--output", default=None, help=".npy file to save the Q-table to")
+    args = parser.parse_args()
+
+    if learning:
+        table = QTable.load(args.table, mmap=False) if args.table is not None else None
+        agent = QLearningAgent(table, args.alpha, args.delta, args.exploration)
+        wins = Trainer(agent, args.opponent, args.workers).train(args.episodes)
+        if args.output is not None:
+            agent.table.save(args.output)
+        print("Koncni score: " + str(wins) + "/" + str(args.episodes))
@@ -0,0 +1,477 @@
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import unittest
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Tuple
+
+from checkers import Board, WHITE, BLACK, NEIGHBOURS, PACKED_SQUARES, RAYS, ROW_MASK, unpack_move
+
+DARK_SQUARES = PACKED_SQUARES[1]
+DARK_MASK = sum(1 << sq for sq in DARK_SQUARES)
+# tablebases only hold positions of the standard game, with all checkers on squares with (x + y) % 2 == 1; i-th of
+# them is square 2 * i + 1 or 2 * i, so its number among dark squares is sq >> 1
+
+DRAW = 255
+MAX_DISTANCE = 254
+# each position is stored in one byte: DRAW, or number of moves (of both players) to the end of the game with perfect
+# play; even distances are losses and odd distances wins for the player on the turn, 0 means it can't move
+
+WIN_VALUE = 100000
+# search value of a position won in 0 moves, wins in more moves are worth less, see Tablebase.value
+
+MAGIC = b"CKTB"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+# magic, version and number of sections
+SECTION = struct.Struct("<BBBBQQ")
+# numbers of white men, white kings, black men and black kings, and offset and size of the section in the file
+
+Material = Tuple[int, int, int, int]
+# numbers of checkers of a section: white men, white kings, black men, black kings, as returned by Board.counts()
+
+_COMB = [[comb(n, k) for k in range(6)] for n in range(51)]
+
+
+def section_size(material: Material) -> int:
+    """
+    Returns number of positions with given material: every kind of checkers (in the order of Material) is placed on
+    the dark squares that are still empty, for both players on the turn. Positions with men on their crowning row can't
+    occur in a game, their entries are never probed.
+    """
+    size, placed = 2, 0
+    for count in material:
+        size *= _COMB[50 - placed][count]
+        placed += count
+    return size
+
+
+def position_index(white_men: int, white_kings: int, black_men: int, black_kings: int, color: bool) -> Optional[int]:
+    """
+    Returns index of a position in the section of its material, the inverse of the enumeration of generate_section.
+    Squares of each kind are ranked with the combinatorial number system among dark squares not occupied by the kinds
+    before it, so every index below section_size belongs to exactly one position.
+    :return: index, or None if a checker is on a light square
+    """
+    if (white_men | white_kings | black_men | black_kings) & ~DARK_MASK:
+        return None
+    index, occupied, placed = 0, 0, 0
+    for mask in (white_men, white_kings, black_men, black_kings):
+        if not mask:
+            continue
+        rank, count, rest = 0, 0, mask
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            count += 1
+            # number of the square among dark squares that are not occupied yet
+            rank += _COMB[((low.bit_length() - 1) >> 1) - bin(occupied & (low - 1)).count("1")][count]
+        index = index * _COMB[50 - placed][count] + rank
+        occupied |= mask
+        placed += count
+    return 2 * index + (color == BLACK)
+
+
+def board_index(board: Board) -> Optional[int]:
+    """
+    :return: position_index of board
+    """
+    return position_index(board.white_men, board.white_kings, board.black_men, board.black_kings, board.color)
+
+
+def materials(max_pieces: int) -> List[Material]:
+    """
+    Returns all materials with at least one checker of each player and at most max_pieces checkers, in the order in
+    which they must be generated: captures lead to fewer checkers and promotions to fewer men, so those sections come
+    first.
+    """
+    result = []
+    for wm in range(max_pieces + 1):
+        for wk in range(max_pieces - wm + 1):
+            for bm in range(max_pieces - wm - wk + 1):
+                for bk in range(max_pieces - wm - wk - bm + 1):
+                    if wm + wk > 0 and bm + bk > 0:
+                        result.append((wm, wk, bm, bk))
+    result.sort(key=lambda m: (sum(m), m[0] + m[2]))
+    return result
+
+
+@lru_cache(maxsize=None)
+def _colex(n: int, k: int) -> List[Tuple[int, ...]]:
+    """
+    :return: all k-element subsets of range(n), each at the index of its rank in the combinatorial number system
+    """
+    return sorted(combinations(range(n), k), key=lambda c: c[::-1])
+
+
+def _placements(material: Material):
+    """
+    Yields (number, bitboards) of all placements of material on dark squares in the order of position_index, except
+    those with men on their crowning rows. Number of a placement is position_index of its positions divided by 2,
+    bitboards are (white men, white kings, black men, black kings).
+    """
+
+    def place(kind: int, free: List[int], number: int, masks: tuple):
+        if kind == 4:
+            yield number, masks
+            return
+        count = material[kind]
+        if not count:
+            yield from place(kind + 1, free, number, masks + (0,))
+            return
+        for rank, slots in enumerate(_colex(len(free), count)):
+            squares = [free[slot] for slot in slots]
+            mask = sum(1 << sq for sq in squares)
+            if kind == 0 and mask & ROW_MASK or kind == 2 and mask >> 90:
+                continue
+            rest = free.copy()
+            for sq in squares:
+                rest.remove(sq)
+            yield from place(kind + 1, rest, number * _COMB[len(free)][count] + rank, masks + (mask,))
+
+    yield from place(0, list(DARK_SQUARES), 0, ())
+
+
+def index_position(material: Material, index: int) -> Tuple[Tuple[int, int, int, int], bool]:
+    """
+    Returns the position at given index of the section of material, the inverse of position_index.
+    :return: tuple (bitboards (white men, white kings, black men, black kings), color of the player on the turn)
+    """
+    number, ranks, placed = index >> 1, [], sum(material)
+    for count in reversed(material):
+        placed -= count
+        number, rank = divmod(number, _COMB[50 - placed][count])
+        ranks.append(rank)
+    free, masks = list(DARK_SQUARES), []
+    for count, rank in zip(material, reversed(ranks)):
+        mask = 0
+        if count:
+            squares = [free[slot] for slot in _colex(len(free), count)[rank]]
+            for sq in squares:
+                mask |= 1 << sq
+                free.remove(sq)
+        masks.append(mask)
+    return tuple(masks), BLACK if index & 1 else WHITE
+
+
+def _exit_value(masks: Tuple[int, int, int, int], color: bool, move: int, solved: Dict[Material, bytearray]) -> int:
+    """
+    :param move: packed capture or promotion of the player on the turn, it leads to a position of another section
+    :return: stored value of the position after move, 0 if the opponent has no checkers left
+    """
+    f, t, removed, promotion = unpack_move(move)
+    wm, wk, bm, bk = masks
+    if color == WHITE:
+        if (wm >> f) & 1:
+            wm &= ~(1 << f)
+            if promotion:
+                wk |= 1 << t
+            else:
+                wm |= 1 << t
+        else:
+            wk = wk & ~(1 << f) | 1 << t
+        bm, bk = bm & ~removed, bk & ~removed
+        if not bm | bk:
+            return 0
+    else:
+        if (bm >> f) & 1:
+            bm &= ~(1 << f)
+            if promotion:
+                bk |= 1 << t
+            else:
+                bm |= 1 << t
+        else:
+            bk = bk & ~(1 << f) | 1 << t
+        wm, wk = wm & ~removed, wk & ~removed
+        if not wm | wk:
+            return 0
+    material = tuple(bin(mask).count("1") for mask in (wm, wk, bm, bk))
+    return solved[material][position_index(wm, wk, bm, bk, not color)]
+
+
+def _predecessors(material: Material, index: int):
+    """
+    Yields indices of positions of the section from which a normal move that is not a promotion leads to the position at
+    index. The move is undone by moving a checker of the player who made it back to an empty square. It was legal only
+    if that player had no capture, generate_section knows that from the number of moves within the section.
+    """
+    (wm, wk, bm, bk), color = index_position(material, index)
+    empty = DARK_MASK & ~(wm | wk | bm | bk)
+    # white men came from below, black men from above
+    if color == BLACK:
+        men, kings, backwards = wm, wk, (2, 3)
+    else:
+        men, kings, backwards = bm, bk, (0, 1)
+    rest = men
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        sq = low.bit_length() - 1
+        for d in backwards:
+            f = NEIGHBOURS[d][sq]
+            if f >= 0 and (empty >> f) & 1:
+                moved = men ^ (low | 1 << f)
+                if color == BLACK:
+                    yield position_index(moved, wk, bm, bk, WHITE)
+                else:
+                    yield position_index(wm, wk, moved, bk, BLACK)
+    rest = kings
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        sq = low.bit_length() - 1
+        for ray in (RAYS[0][sq], RAYS[1][sq], RAYS[2][sq], RAYS[3][sq]):
+            for f in ray:
+                if not (empty >> f) & 1:
+                    break
+                moved = kings ^ (low | 1 << f)
+                if color == BLACK:
+                    yield position_index(wm, moved, bm, bk, WHITE)
+                else:
+                    yield position_index(wm, wk, bm, moved, BLACK)
+
+
+def generate_section(material: Material, solved: Dict[Material, bytearray]) -> bytearray:
+    """
+    Solves all positions with given material by retrograde analysis. Moves of every position are generated once, to
+    count its moves within the section and to look up values after its captures and promotions, which lead to other
+    sections. Then positions are resolved in order of increasing distance to the end of the game: predecessors of
+    positions resolved at distance n - 1, found by undoing moves, are won in n moves if the position is lost, and lost
+    in n moves when it was their last move that doesn't lose (and moves out of the section lose in at most n - 1 moves).
+    Positions that are never resolved are draws. Draws by repetition and by move limits of Board.draw_reason are not
+    taken into account.
+    :param material: material of the section
+    :param solved: already generated sections, must contain all materials reachable by captures and promotions
+    :return: value of every position, indexed by position_index
+    """
+    size = section_size(material)
+    values = bytearray([DRAW]) * size
+    pending = bytearray([DRAW]) * size
+    # distance at which a position is resolved by its moves out of the section: odd if one of them wins, even if none
+    # of them wins or draws (and then only once remaining reaches 0), DRAW if one of them draws
+    remaining = bytearray(size)
+    # number of moves within the section that are not known to lose yet, 0 for positions that must capture, so moves
+    # undone into them are never counted
+    board = Board()
+    last = 0
+    # the longest distance in pending, positions can't be resolved without a new position in the previous distance
+    # only after it
+    for number, masks in _placements(material):
+        for color in (WHITE, BLACK):
+            index = 2 * number + (color == BLACK)
+            # only move generation is used, so checkers are placed without the hash and counters of set_bitboards
+            board.white_men, board.white_kings, board.black_men, board.black_kings = masks
+            board.color = color
+            captures = board.packed_legal_captures()
+            moves = captures or board.packed_quiet_moves()
+            if not moves:
+                values[index] = 0
+                continue
+            inside, win, loss = 0, DRAW, 0
+            for move in moves:
+                if not captures and not (move >> 13) & 1:
+                    inside += 1
+                    continue
+                value = _exit_value(masks, color, move, solved)
+                if value == DRAW:
+                    loss = DRAW
+                elif value % 2 == 0:
+                    win = min(win, value + 1)
+                elif loss != DRAW:
+                    loss = max(loss, value + 1)
+            remaining[index] = inside
+            if win != DRAW:
+                pending[index] = win
+                last = max(last, win)
+            elif loss != DRAW:
+                pending[index] = loss
+                last = max(last, loss)
+
+    distance, found = 0, True
+    while found or distance < last:
+        distance += 1
+        if distance > MAX_DISTANCE:
+            raise ValueError("Distance to the end of the game doesn't fit into the tablebase")
+        found = False
+        # values are scanned in place for positions resolved at the previous distance, this pass sets only the current
+        # distance, so positions resolved in it don't count as resolved at a shorter distance
+        previous = bytes([distance - 1])
+        lost = (distance - 1) % 2 == 0
+        i = values.find(previous)
+        while i >= 0:
+            for j in _predecessors(material, i):
+                if not remaining[j]:
+                    continue
+                if lost:
+                    if values[j] == DRAW:
+                        values[j] = distance
+                        found = True
+                else:
+                    remaining[j] -= 1
+                    if not remaining[j] and values[j] == DRAW and pending[j] % 2 == 0 and pending[j] <= distance:
+                        values[j] = distance
+                        found = True
+            i = values.find(previous, i + 1)
+
+        current = bytes([distance])
+        i = pending.find(current)
+        while i >= 0:
+            if values[i] == DRAW and (distance % 2 == 1 or not remaining[i]):
+                values[i] = distance
+                found = True
+            i = pending.find(current, i + 1)
+    return values
+
+
+def generate(path: str, max_pieces: int = 3, verbose: bool = False):
+    """
+    Generates tablebase of all positions with at most max_pieces checkers and writes it to a file. Every section
+    (material) takes section_size bytes. 3 pieces (1.9 million positions) take about a minute, 4 pieces (105 million
+    positions, 105 MB) about 80 minutes; 5 pieces (4.2 billion positions) are out of reach in Python.
+    File format: HEADER, one SECTION per material, and then one byte per position of each section (see DRAW and
+    MAX_DISTANCE).
+    """
+    solved = {}
+    for material in materials(max_pieces):
+        solved[material] = generate_section(material, solved)
+        if verbose:
+            print("Generated", material, len(solved[material]), "positions")
+
+    offset = HEADER.size + SECTION.size * len(solved)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(solved)))
+        for material, values in solved.items():
+            f.write(SECTION.pack(*material, offset, len(values)))
+            offset += len(values)
+        for values in solved.values():
+            f.write(values)
+
+
+class Tablebase:
+    """
+    Endgame tablebase file opened through a memory map: only the small header is read when it is opened, positions are
+    read from the page cache of the operating system when they are probed.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: file written by generate
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a tablebase file: " + path)
+        self.sections: Dict[Material, int] = {}
+        # offset of each section in the file, by its material
+        self.max_pieces = 0
+        for i in range(count):
+            wm, wk, bm, bk, offset, size = SECTION.unpack_from(self.data, HEADER.size + i * SECTION.size)
+            self.sections[(wm, wk, bm, bk)] = offset
+            self.max_pieces = max(self.max_pieces, wm + wk + bm + bk)
+
+    def probe(self, board: Board) -> Optional[int]:
+        """
+        :return: stored value of the board (DRAW or distance, see MAX_DISTANCE), or None if the board is not in the
+        tablebase
+        """
+        offset = self.sections.get(board.counts())
+        if offset is None:
+            return None
+        index = board_index(board)
+        if index is None:
+            return None
+        return self.data[offset + index]
+
+    def value(self, board: Board) -> Optional[int]:
+        """
+        :return: value of the board for the player on the turn on the scale of alphabeta search (wins close to
+        WIN_VALUE, shorter wins are better), or None if the board is not in the tablebase
+        """
+        stored = self.probe(board)
+        if stored is None:
+            return None
+        if stored == DRAW:
+            return 0
+        return -(WIN_VALUE - stored) if stored % 2 == 0 else WIN_VALUE - stored
+
+    def close(self):
+        self.data.close()
+
+
+class TablebaseTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "endgame.tb")
+        generate(cls.path, 2)
+        cls.tablebase = Tablebase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def test_index(self):
+        for material in [(1, 0, 1, 0), (0, 2, 0, 1), (1, 1, 1, 0)]:
+            indices = {position_index(*masks, color) for _, masks in _placements(material) for color in (WHITE, BLACK)}
+            self.assertLess(max(indices), section_size(material))
+            self.assertEqual(2 * len(list(_placements(material))), len(indices))
+            for number, masks in _placements(material):
+                self.assertEqual(2 * number + 1, position_index(*masks, BLACK))
+                self.assertEqual((masks, BLACK), index_position(material, 2 * number + 1))
+
+    def test_consistent(self):
+        # value of every position follows from values after its moves
+        b = Board()
+        for material in materials(2):
+            for masks, color in ((masks, color) for _, masks in _placements(material) for color in (WHITE, BLACK)):
+                b.set_bitboards(*masks)
+                b.color = color
+                stored = self.tablebase.probe(b)
+                children = []
+                for move in b.legal_moves():
+                    b.push(move)
+                    children.append(self.tablebase.probe(b) if b.has_legal_moves() else 0)
+                    b.pop()
+                if not children:
+                    self.assertEqual(0, stored)
+                elif any(c != DRAW and c % 2 == 0 for c in children):
+                    self.assertEqual(1 + min(c for c in children if c != DRAW and c % 2 == 0), stored)
+                elif DRAW in children:
+                    self.assertEqual(DRAW, stored)
+                else:
+                    self.assertEqual(1 + max(children), stored)
+
+    def test_probe(self):
+        b = Board()
+        # king against king can't be won
+        b.set_board(".X,,,,,,,,,........O.")
+        self.assertEqual(DRAW, self.tablebase.probe(b))
+        self.assertEqual(0, self.tablebase.value(b))
+        # king captures the man
+        b.set_board(",,,,,,,..o,,X")
+        self.assertEqual(1, self.tablebase.probe(b))
+        self.assertEqual(WIN_VALUE - 1, self.tablebase.value(b))
+        # black man can only move onto the diagonal of the king, and it is captured
+        b.set_board(".X,,,,,,.........o")
+        b.color = BLACK
+        self.assertEqual(2, self.tablebase.probe(b))
+        self.assertEqual(-(WIN_VALUE - 2), self.tablebase.value(b))
+        # not in the tablebase: too many checkers, or a checker on a light square
+        self.assertIsNone(self.tablebase.probe(Board()))
+        b.set_board("X,,,,,,,,,........O.")
+        self.assertIsNone(self.tablebase.probe(b))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates endgame tablebase by retrograde analysis.")
+    parser.add_argument("output", help="tablebase file to write")
+    parser.add_argument("--pieces", type=int, default=3, help="maximum number of checkers on the board")
+    args = parser.parse_args()
+    generate(args.output, args.pieces, verbose=True)
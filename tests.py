@@ -98,6 +98,168 @@ class TurnTests(unittest.TestCase):
         self.assertTrue(not b.color)
 
 
+class IndependentBoardsTests(unittest.TestCase):
+    def test_two_boards(self):
+        b1 = Board()
+        b2 = Board()
+        b2.set_board(",,,,,,.x")
+        b1.push(b1.legal_moves()[0])
+        self.assertEqual(",,,,,,.x........,,,", b2.get_board())
+        self.assertEqual([], b2.move_stack)
+        self.assertTrue(b2.color)
+
+    def test_copy(self):
+        b = Board()
+        b.push(b.legal_moves()[0])
+        c = b.copy()
+        c.push(c.legal_moves()[0])
+        self.assertEqual(1, len(b.move_stack))
+        self.assertFalse(b.color)
+        self.assertNotEqual(b.get_board(), c.get_board())
+
+        c.pop()
+        self.assertEqual(b.get_board(), c.get_board())
+        c.pop()
+        self.assertEqual(Board().get_board(), c.get_board())
+        self.assertEqual(1, len(b.move_stack))
+
+
+class HashTests(unittest.TestCase):
+    def test_push_pop(self):
+        b = Board()
+        start = hash(b)
+        for i in range(30):
+            b.push(b.legal_moves()[i % len(b.legal_moves())])
+            fresh = Board()
+            fresh.set_board(b.get_board())
+            fresh.color = b.color
+            self.assertEqual(hash(fresh), hash(b))
+        for i in range(30):
+            b.pop()
+        self.assertEqual(start, hash(b))
+
+    def test_color(self):
+        b = Board()
+        white = hash(b)
+        b.color = BLACK
+        self.assertNotEqual(white, hash(b))
+
+    def test_crowning(self):
+        b = Board()
+        b.set_board(",.x")
+        b.push(b.legal_moves()[1])
+        fresh = Board()
+        fresh.set_board("..X")
+        fresh.color = BLACK
+        self.assertEqual(hash(fresh), hash(b))
+
+
+class CountsTests(unittest.TestCase):
+    def test_initial(self):
+        b = Board()
+        self.assertEqual((20, 0, 20, 0), b.counts())
+        self.assertEqual((20, 0, 20, 0), b.copy().counts())
+        wm, wk, bm, bk = b.placement()
+        self.assertEqual(wm, bm)
+
+    def test_push_pop(self):
+        b = Board()
+        b.set_board(",...o,,...o,..x")
+        placement = b.placement()
+        b.push(b.legal_moves()[0])
+        # double jump ends with crowning
+        self.assertEqual((0, 1, 0, 0), b.counts())
+        self.assertEqual((0, 0, 0, 0), b.placement())  # crowned on the border
+        b.pop()
+        self.assertEqual((1, 0, 2, 0), b.counts())
+        self.assertEqual(placement, b.placement())
+
+
+class DrawTests(unittest.TestCase):
+    @staticmethod
+    def shuffle(b: Board, plies: int):
+        """
+        Moves kings back and forth: first legal move of each player, then the reverse of the player's last move.
+        """
+        for i in range(plies):
+            if len(b.move_stack) < 2:
+                b.push(b.legal_moves()[0])
+            else:
+                (fx, fy), (tx, ty) = b.move_stack[-2][0].move_from, b.move_stack[-2][-1].move_to
+                b.push(b.quiet_move(ty * 10 + tx, fy * 10 + fx))
+
+    def test_no_moves(self):
+        b = Board()
+        b.set_board(",.o,,.o")
+        self.assertEqual(checkers.Outcome(BLACK, checkers.NO_MOVES), b.outcome())
+        self.assertEqual("0-1", b.outcome().result())
+        self.assertIsNone(Board().outcome())
+
+    def test_repetition(self):
+        b = Board()
+        b.set_board("......O.O.,,,,,,,,,X.X")
+        self.shuffle(b, 4)
+        self.assertEqual(1, b.repetitions())
+        self.assertIsNone(b.outcome())
+        self.assertEqual(checkers.REPETITION, b.draw_reason(repetitions=1))
+        self.shuffle(b, 4)
+        self.assertEqual(2, b.repetitions())
+        self.assertEqual(checkers.Outcome(None, checkers.REPETITION), b.outcome())
+        self.assertEqual(2, b.copy().repetitions())
+        b.pop()
+        self.assertEqual(1, b.repetitions())
+
+    def test_color(self):
+        b = Board()
+        b.set_board("......O.O.,,,,,,,,,X.X")
+        self.shuffle(b, 2)
+        # same checkers, but other player on the turn
+        b.color = BLACK
+        self.assertEqual(0, b.repetitions())
+
+    def test_man_move(self):
+        b = Board()
+        b.set_board("......O.O.,,,,,x,,,,X.X")
+        b.push(b.quiet_move(90, 81))
+        b.push(b.quiet_move(8, 19))
+        b.push(b.quiet_move(50, 41))
+        b.push(b.quiet_move(19, 8))
+        b.push(b.quiet_move(81, 90))
+        # position with the man on its starting square can't repeat
+        self.assertEqual(0, b.repetitions())
+
+    def test_kings_only(self):
+        b = Board()
+        b.set_board("......O.O.,,,,,x,,,,X.X")
+        b.push(b.quiet_move(90, 81))
+        b.push(b.quiet_move(8, 19))
+        self.shuffle(b, 47)
+        self.assertEqual(checkers.REPETITION, b.draw_reason())
+        self.shuffle(b, 1)
+        self.assertEqual(checkers.KINGS_ONLY, b.draw_reason())
+        b.pop()
+        b.pop()
+        b.push(b.quiet_move(50, 41))
+        self.assertIsNone(b.draw_reason())
+
+    def test_endgame_limit(self):
+        b = Board()
+        # king captures the man and it's a single king against a single king
+        b.set_board("........O.,,,,,,,..o,,X")
+        b.push(b.legal_moves()[0])
+        self.assertEqual((0, 1, 0, 1), b.counts())
+        self.shuffle(b, 9)
+        self.assertNotEqual(checkers.ENDGAME_LIMIT, b.draw_reason())
+        self.shuffle(b, 1)
+        self.assertEqual(checkers.Outcome(None, checkers.ENDGAME_LIMIT), b.outcome())
+
+        b.set_board("........O.,,,,,,,,,X.X.X")
+        self.shuffle(b, 31)
+        self.assertNotEqual(checkers.ENDGAME_LIMIT, b.draw_reason())
+        self.shuffle(b, 1)
+        self.assertEqual(checkers.ENDGAME_LIMIT, b.draw_reason())
+
+
 class LegalMovesTests(unittest.TestCase):
 
     def __init__(self, methodName: str = ...) -> None:
@@ -222,6 +384,96 @@ class LegalMovesTests(unittest.TestCase):
                          "[Move<X,f(2, 8),t(7, 3)>, Move<X,f(7, 3),t(4, 0)>]]", str(b.legal_moves()))
 
 
+class CaptureChainTests(unittest.TestCase):
+    CAPTURES = [
+        (",,....o,...x", WHITE),
+        (",,,,......x,.....o", BLACK),
+        (",...o,,...o,..x", WHITE),
+        (",...o.o,,...o,..x", WHITE),
+        (",...,.o.o,.....,.o...o,.......,...o...o,....x....,.o.o,...", WHITE),
+        (",.o.o.o....,,.o.o......,..x", WHITE),
+        (",,,,o.........,.o.....o..,,,....X.....,", WHITE),
+        (",,......o...,,....o.....,,....o.....,,..X.......,", WHITE),
+    ]
+
+    def test_same_as_recursive(self):
+        for (notation, color) in self.CAPTURES:
+            b = Board()
+            b.set_board(notation)
+            b.color = color
+            before = b.get_board()
+            longest = [[]]
+            for y in range(10):
+                for x in range(10):
+                    c = b.checker_at(x, y)
+                    if c is not None and c.color == color:
+                        chains = checkers.get_longest_jump_chains(b, x, y, [], [[]])
+                        if len(chains[0]) > len(longest[0]):
+                            longest = chains
+                        elif len(chains[0]) == len(longest[0]):
+                            longest += chains
+            self.assertEqual(str(longest), str(b.legal_captures()))
+            self.assertEqual(before, b.get_board())
+
+    def test_blocked_king(self):
+        # white king's diagonal towards black man is blocked by a white man, so it has nothing to jump
+        b = Board()
+        b.set_board(",,,,,,...o,,.x,X")
+        b.color = WHITE
+        self.assertEqual([], b.legal_captures())
+
+
+class StagedMovesTests(unittest.TestCase):
+    def test_iter_moves(self):
+        b = Board()
+        b.set_board(",,.....O....,,...o......,........o.")
+        b.color = checkers.BLACK
+        self.assertEqual(str(b.legal_moves()), str(list(b.iter_moves())))
+        b.set_board(",...o,,...o,..x")
+        b.color = checkers.WHITE
+        self.assertEqual(str(b.legal_moves()), str(list(b.iter_moves())))
+        self.assertEqual(str(b.legal_moves()), str(b.legal_captures()))
+
+    def test_has_legal_moves(self):
+        b = Board()
+        self.assertTrue(b.has_legal_moves())
+        b.set_board(".x")
+        self.assertFalse(b.has_legal_moves())
+        b.set_board(",,,,,,,,o,x")
+        self.assertTrue(b.has_legal_moves())  # jump only
+        b.set_board(",,,,,,,o.o,.o,X.")
+        self.assertFalse(b.has_legal_moves())  # king blocked in the corner
+        b.color = checkers.BLACK
+        self.assertTrue(b.has_legal_moves())
+
+    def test_quiet_move(self):
+        b = Board()
+        b.set_board(",,.....O....,,...o......,........o.")
+        b.color = checkers.BLACK
+        self.assertEqual("[Move<O,f(5, 2),t(7, 4)>]", str(b.quiet_move(checkers.square(5, 2), checkers.square(7, 4))))
+        self.assertIsNone(b.quiet_move(checkers.square(5, 2), checkers.square(8, 5)))  # blocked
+        self.assertEqual("[Move<o,f(3, 4),t(4, 5)>]", str(b.quiet_move(checkers.square(3, 4), checkers.square(4, 5))))
+        self.assertIsNone(b.quiet_move(checkers.square(3, 4), checkers.square(4, 3)))  # men don't go back
+
+    def test_packed_stages(self):
+        b = Board()
+        # the last position has a king that can't jump, its own man is in the way
+        for notation in ("", ",,.....O....,,...o......,........o.", ".X,,...x,,.....o,,...O,,,....X",
+                         ",,,,o.........,.o.....o..,,,....X.....,", ",,,,,,...o,,.x,X"):
+            b.set_board(notation)
+            for color in (checkers.WHITE, checkers.BLACK):
+                b.color = color
+                self.assertEqual([checkers.pack_move(m) for m in b.legal_captures()], list(b.packed_legal_captures()))
+                quiet = list(b.iter_quiet_moves())
+                self.assertEqual([checkers.pack_move(m) for m in quiet], list(b.packed_quiet_moves()))
+                for move in quiet:
+                    f = checkers.square(*move[0].move_from)
+                    t = checkers.square(*move[0].move_to)
+                    self.assertEqual(checkers.pack_move(move), b.packed_quiet_move(f, t))
+        b.color = checkers.WHITE
+        self.assertIsNone(b.packed_quiet_move(checkers.square(0, 9), checkers.square(1, 8)))
+
+
 class PushPopMovesTests(unittest.TestCase):
     def test_push_simple(self):
         b = Board()
@@ -270,6 +522,25 @@ class PushPopMovesTests(unittest.TestCase):
         self.assertEqual(",,.o.o......,,.o...o....,,...o...o..,....x.....,.o.o......,", b.get_board())
         pass
 
+    def test_push_packed(self):
+        b = Board()
+        b.set_board(",...,.o.o,.....,.o...o,.......,...o...o,....x....,.o.o,...")
+        packed = b.packed_legal_moves()
+        self.assertEqual([checkers.pack_move(m) for m in b.legal_moves()], list(packed))
+        b.push(packed[0])
+        self.assertEqual(",,,,,,,........x.,.o.o......,", b.get_board())
+        b.pop()
+        self.assertEqual(",,.o.o......,,.o...o....,,...o...o..,....x.....,.o.o......,", b.get_board())
+
+    def test_pack_move(self):
+        b = Board()
+        b.set_board(",...o,,...o,..x")
+        move = b.legal_moves()[0]
+        f, t, removed, promotion = checkers.unpack_move(checkers.pack_move(move))
+        self.assertEqual((checkers.square(2, 4), checkers.square(2, 0), True), (f, t, promotion))
+        self.assertEqual((1 << checkers.square(3, 3)) | (1 << checkers.square(3, 1)), removed)
+        self.assertLess(checkers.pack_move(move), 1 << 64)
+
     def test_push_crowning(self):
         b = Board()
         b.set_board(",.x")
@@ -0,0 +1,310 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from alphabeta import alpha_beta_search, search
+from checkers import Board, Move, WHITE, BLACK
+from transposition import TranspositionTable
+
+WIN, DRAW, LOSS = "1-0", "1/2-1/2", "0-1"
+# game results from white's perspective
+
+
+class Agent:
+    """
+    A player in a tournament. Agents are created from specs (see make_agent) in worker processes, so they don't need
+    to be picklable.
+    """
+
+    def new_game(self, color: bool, seed: int):
+        """
+        Called before each game.
+        :param color: color this agent plays
+        :param seed: seed for any randomness of the agent in this game
+        """
+        pass
+
+    def select_move(self, board: Board) -> List[Move]:
+        """
+        :param board: copy of the game board, can be changed freely
+        :return: one of board.legal_moves()
+        """
+        raise NotImplementedError
+
+
+class RandomAgent(Agent):
+    """
+    Plays random legal moves.
+    """
+
+    def __init__(self):
+        self.random = random.Random()
+
+    def new_game(self, color: bool, seed: int):
+        self.random.seed(seed)
+
+    def select_move(self, board: Board) -> List[Move]:
+        return self.random.choice(board.legal_moves())
+
+
+class AlphaBetaAgent(Agent):
+    """
+    Plays moves found by alpha_beta_search to a fixed depth, keeping a transposition table for the whole game.
+    """
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.table = TranspositionTable()
+
+    def new_game(self, color: bool, seed: int):
+        self.table.clear()
+
+    def select_move(self, board: Board) -> List[Move]:
+        return alpha_beta_search(board, self.depth, self.table)
+
+
+class SearchAgent(Agent):
+    """
+    Plays moves found by iterative deepening search with a time budget per move.
+    """
+
+    def __init__(self, time_ms: int):
+        self.time_ms = time_ms
+        self.table = TranspositionTable()
+
+    def new_game(self, color: bool, seed: int):
+        self.table.clear()
+
+    def select_move(self, board: Board) -> List[Move]:
+        return search(board, time_ms=self.time_ms, table=self.table)
+
+
+def make_agent(spec: str) -> Agent:
+    """
+    Creates an agent from its spec:
+     - "random",
+     - "alphabeta:N" for alpha-beta search to depth N,
+     - "search:MS" for iterative deepening with MS milliseconds per move,
+     - "qlearn:PATH" for rein_learn.QLearningAgent with a Q-table saved by QTable.save into file PATH (requires
+       numpy).
+    """
+    name, _, arg = spec.partition(":")
+    if name == "random":
+        return RandomAgent()
+    if name == "alphabeta":
+        return AlphaBetaAgent(int(arg or 4))
+    if name == "search":
+        return SearchAgent(int(arg or 1000))
+    if name == "qlearn":
+        # rein_learn needs numpy, it is only imported when a Q-learning agent is used
+        import rein_learn
+        return rein_learn.QLearningAgent(rein_learn.QTable.load(arg))
+    raise ValueError("Unknown agent: " + spec)
+
+
+_agents: Dict[str, Agent] = {}
+# agents created in this process, by spec; reused for all games the process plays
+
+
+def play_game(white: str, black: str, seed: int = 0, opening_plies: int = 0, max_moves: int = 200,
+              max_seconds: float = None) -> Dict:
+    """
+    Plays one game between two agents.
+    :param white: spec of the agent playing white, see make_agent
+    :param black: spec of the agent playing black
+    :param seed: seed of the opening and of the agents
+    :param opening_plies: number of random moves played at the start of the game, before agents take over
+    :param max_moves: game is a draw after this many moves (plies) of both players
+    :param max_seconds: thinking time of each agent in the game, an agent that spends more loses, or None
+    :return: dict with white, black, seed, result (WIN, DRAW or LOSS for white), reason (reason of Board.outcome(),
+    move_limit or time_forfeit), moves, seconds (thinking time of both agents) and white_seconds and black_seconds
+    """
+    agents = {}
+    for color, spec in ((WHITE, white), (BLACK, black)):
+        if spec not in _agents:
+            _agents[spec] = make_agent(spec)
+        agents[color] = _agents[spec]
+    if white == black:
+        # the same agent object can't play both sides
+        agents[BLACK] = make_agent(black)
+    agents[WHITE].new_game(WHITE, seed)
+    agents[BLACK].new_game(BLACK, seed + 1)
+
+    board = Board()
+    rng = random.Random(seed)
+    result, reason = DRAW, "move_limit"
+    thinking = {WHITE: 0.0, BLACK: 0.0}
+    # seconds each agent spent selecting its moves
+    while len(board.move_stack) < max_moves:
+        outcome = board.outcome()
+        if outcome is not None:
+            result, reason = outcome.result(), outcome.reason
+            break
+
+        moves = board.legal_moves()
+        if len(board.move_stack) < opening_plies:
+            move = rng.choice(moves)
+        else:
+            start = time.perf_counter()
+            move = agents[board.color].select_move(board.copy())
+            thinking[board.color] += time.perf_counter() - start
+            if max_seconds is not None and thinking[board.color] > max_seconds:
+                # the move came too late, the agent lost on time
+                result, reason = LOSS if board.color == WHITE else WIN, "time_forfeit"
+                break
+            # moves of the agent are found among moves of the game board by their notation
+            move = next(m for m in moves if str(m) == str(move))
+        board.push(move)
+
+    return {"white": white, "black": black, "seed": seed, "result": result, "reason": reason,
+            "moves": len(board.move_stack), "seconds": round(thinking[WHITE] + thinking[BLACK], 3),
+            "white_seconds": round(thinking[WHITE], 3), "black_seconds": round(thinking[BLACK], 3)}
+
+
+def schedule(agent_a: str, agent_b: str, games: int, seed: int = 0) -> Iterator[Dict]:
+    """
+    Yields arguments of play_game for a match of given number of games. Games are played in pairs with the same
+    opening, with agents swapping colors.
+    """
+    for i in range(games):
+        pair_seed = seed + i // 2 * 2
+        if i % 2 == 0:
+            yield {"white": agent_a, "black": agent_b, "seed": pair_seed}
+        else:
+            yield {"white": agent_b, "black": agent_a, "seed": pair_seed}
+
+
+def run_tournament(agent_a: str, agent_b: str, games: int, workers: int = None, log_path: str = None,
+                   opening_plies: int = 4, max_moves: int = 200, max_seconds: float = None, seed: int = 0) -> Dict:
+    """
+    Plays a match between two agents in a pool of processes.
+    :param agent_a: spec of the first agent, see make_agent; statistics are from its perspective
+    :param agent_b: spec of the second agent
+    :param games: number of games
+    :param workers: number of worker processes, number of CPUs if None
+    :param log_path: file to which results of games are appended as JSON lines as soon as they finish, or None
+    :param opening_plies: number of random moves at the start of each game, see play_game
+    :param max_moves: move limit of each game, see play_game
+    :param max_seconds: thinking time of each agent in each game, see play_game
+    :param seed: seed of the first game, other games use the following seeds
+    :return: statistics of the match, see match_stats
+    """
+    results = []
+    log = open(log_path, "a") if log_path is not None else None
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {executor.submit(play_game, opening_plies=opening_plies, max_moves=max_moves,
+                                       max_seconds=max_seconds, **game): i
+                       for i, game in enumerate(schedule(agent_a, agent_b, games, seed))}
+            for future in as_completed(futures):
+                result = dict(future.result(), game=futures[future])
+                results.append(result)
+                if log is not None:
+                    log.write(json.dumps(result) + "\n")
+                    log.flush()
+    finally:
+        if log is not None:
+            log.close()
+
+    results.sort(key=lambda r: r["game"])
+    return match_stats(results, agent_a)
+
+
+def match_stats(results: List[Dict], agent: str) -> Dict:
+    """
+    Sums up results of games from the perspective of one agent.
+    :param results: results of play_game
+    :param agent: spec of the agent
+    :return: dict with games, wins, draws, losses, score (share of points), elo (Elo difference to the opponent,
+    None if score is 0 or 1) and elo_95 (95% confidence interval of elo, with None for unbounded ends)
+    """
+    wins = draws = losses = 0
+    for r in results:
+        if r["result"] == DRAW:
+            draws += 1
+        elif (r["result"] == WIN) == (r["white"] == agent):
+            wins += 1
+        else:
+            losses += 1
+
+    n = wins + draws + losses
+    score = (wins + draws / 2) / n if n else 0.5
+    # standard error of the score, from the variance of the points of single games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n if n else 0
+    margin = 1.96 * math.sqrt(variance / n) if n else 0
+    return {"games": n, "wins": wins, "draws": draws, "losses": losses, "score": score, "elo": elo(score),
+            "elo_95": (elo(score - margin), elo(score + margin))}
+
+
+def elo(score: float) -> Optional[float]:
+    """
+    :return: Elo rating difference that corresponds to expected score, None if score is 0 or 1 (or outside of them)
+    """
+    if score <= 0 or score >= 1:
+        return None
+    return -400 * math.log10(1 / score - 1)
+
+
+class TournamentTests(unittest.TestCase):
+
+    def test_play_game(self):
+        r = play_game("alphabeta:1", "random", seed=3, opening_plies=2, max_moves=30)
+        again = play_game("alphabeta:1", "random", seed=3, opening_plies=2, max_moves=30)
+        # games with the same seed are the same, only thinking time differs
+        for key in ("seconds", "white_seconds", "black_seconds"):
+            del r[key], again[key]
+        self.assertEqual(r, again)
+        self.assertLessEqual(r["moves"], 30)
+        self.assertIn(r["result"], (WIN, DRAW, LOSS))
+
+    def test_time_forfeit(self):
+        # white runs out of time with its first move, black after a random opening move
+        r = play_game("alphabeta:1", "random", max_seconds=0.0)
+        self.assertEqual((LOSS, "time_forfeit", 0), (r["result"], r["reason"], r["moves"]))
+        self.assertEqual(0.0, r["black_seconds"])
+        r = play_game("random", "alphabeta:1", opening_plies=1, max_seconds=0.0)
+        self.assertEqual((WIN, "time_forfeit", 1), (r["result"], r["reason"], r["moves"]))
+
+    def test_schedule(self):
+        games = list(schedule("a", "b", 4, seed=10))
+        self.assertEqual([("a", "b", 10), ("b", "a", 10), ("a", "b", 12), ("b", "a", 12)],
+                         [(g["white"], g["black"], g["seed"]) for g in games])
+
+    def test_stats(self):
+        results = [{"white": "a", "black": "b", "result": WIN}, {"white": "b", "black": "a", "result": WIN},
+                   {"white": "a", "black": "b", "result": DRAW}, {"white": "b", "black": "a", "result": LOSS}]
+        stats = match_stats(results, "a")
+        self.assertEqual((2, 1, 1, 0.625), (stats["wins"], stats["draws"], stats["losses"], stats["score"]))
+        self.assertAlmostEqual(88.7, stats["elo"], 1)
+        self.assertLess(stats["elo_95"][0], stats["elo"])
+        self.assertIsNone(elo(1.0))
+
+    def test_tournament(self):
+        stats = run_tournament("alphabeta:1", "random", 4, workers=2, opening_plies=0, max_moves=20)
+        self.assertEqual(4, stats["games"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays a match between two agents and prints its statistics.")
+    parser.add_argument("agent_a", help="random, alphabeta:DEPTH, search:MS or qlearn:PATH")
+    parser.add_argument("agent_b")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--log", default=None, help="JSONL file to append game results to")
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--max-moves", type=int, default=200)
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="thinking time of each agent per game, an agent that exceeds it loses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = run_tournament(args.agent_a, args.agent_b, args.games, args.workers, args.log, args.opening_plies,
+                           args.max_moves, args.max_seconds, args.seed)
+    json.dump(stats, sys.stdout, indent=2)
+    print()
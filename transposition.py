@@ -0,0 +1,336 @@
+import pickle
+import unittest
+from array import array
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple, Union
+
+from checkers import Board, Move, PACKED_SQUARES, square
+
+EXACT = 0  # stored value is the exact value of the position
+LOWER = 1  # stored value is a lower bound (search failed high)
+UPPER = 2  # stored value is an upper bound (search failed low)
+EMPTY = 3  # flag of slots that hold no entry, so that their zero key doesn't match key 0
+
+NO_MOVE = 0
+
+# bytes used by one slot: key (8), value (4), best move (2), depth (1), bound flag (1) and age (1)
+SLOT_SIZE = 17
+
+# bytes used by one slot of SharedTranspositionTable: key xor data (8) and data (8), see SharedTranspositionTable.store
+SHARED_SLOT_SIZE = 16
+VALUE_OFFSET = 1 << 31
+# values are stored increased by VALUE_OFFSET, to be unsigned
+
+PACKED_MOVE_IDS = [PACKED_SQUARES[low >> 12][low & 63] * 100 + PACKED_SQUARES[low >> 12][(low >> 6) & 63] + 1
+                   if low & 63 < 50 and (low >> 6) & 63 < 50 else NO_MOVE for low in range(1 << 13)]
+# PACKED_MOVE_IDS[packed & 0x1FFF] is move_id of a move packed with pack_move, its low 13 bits hold both squares
+
+
+def move_id(move: Union[List[Move], int]) -> int:
+    """
+    Returns a small integer that identifies a move (or move chain) by its starting and ending square, used to store
+    best moves in a TranspositionTable without keeping Move objects alive. Move can also be packed with pack_move,
+    it gets the same id.
+    """
+    if isinstance(move, int):
+        return PACKED_MOVE_IDS[move & 0x1FFF]
+    fx, fy = move[0].move_from
+    tx, ty = move[-1].move_to
+    return square(fx, fy) * 100 + square(tx, ty) + 1
+
+
+def find_move(moves: Sequence[Union[List[Move], int]], mid: int) -> Optional[Union[List[Move], int]]:
+    """
+    Returns the first move from moves with given move_id, or None if there's no such move.
+    """
+    if mid == NO_MOVE:
+        return None
+    for move in moves:
+        if move_id(move) == mid:
+            return move
+    return None
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table, indexed by Zobrist hashes of boards.
+
+    Table is an array of buckets with two slots each: the first slot keeps the entry that was searched to the greatest
+    depth (unless it is from an older search), the second slot is always replaced. All slots are preallocated in flat
+    arrays, so memory used by the table doesn't grow during the search.
+
+    Values are stored from the perspective of the player on the turn in the stored position, so the table can be kept
+    and reused across searches (e.g. for all moves of one game).
+    """
+
+    def __init__(self, size_mb: float = 16):
+        """
+        :param size_mb: memory budget of the table in megabytes
+        """
+        buckets = 1
+        while buckets * 4 * SLOT_SIZE <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        # number of buckets is a power of two, so bucket of a key is (key & mask)
+
+        self._allocate(2 * buckets)
+
+        self.probes = 0
+        self.hits = 0
+        # statistics of probe calls, see hit_rate()
+
+    def _allocate(self, slots: int):
+        """
+        Creates arrays of given number of empty slots.
+        """
+        self.keys = array("Q", bytes(8 * slots))
+        self.values = array("i", bytes(4 * slots))
+        self.moves = array("H", bytes(2 * slots))
+        self.depths = array("b", bytes(slots))
+        self.flags = array("b", [EMPTY]) * slots
+        self.ages = array("B", bytes(slots))
+        self.age = 0
+
+    def __len__(self):
+        """
+        :return: number of slots in the table
+        """
+        return len(self.keys)
+
+    def new_search(self):
+        """
+        Marks start of a new search, entries from older searches are replaced first.
+        """
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        """
+        Removes all entries from the table and resets its statistics.
+        """
+        self._allocate(len(self.keys))
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Looks up position with given Zobrist hash.
+        :param key: board.zobrist_hash()
+        :return: tuple (depth, flag, value, move_id) or None if position is not in the table
+        """
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        if self.keys[slot] != key or self.flags[slot] == EMPTY:
+            slot += 1
+            if self.keys[slot] != key or self.flags[slot] == EMPTY:
+                return None
+
+        self.hits += 1
+        return self.depths[slot], self.flags[slot], self.values[slot], self.moves[slot]
+
+    def store(self, key: int, depth: int, flag: int, value: int, move: int = NO_MOVE):
+        """
+        Stores search result for position with given Zobrist hash.
+        :param key: board.zobrist_hash()
+        :param depth: depth to which position was searched
+        :param flag: EXACT, LOWER or UPPER
+        :param value: value of the position for the player on the turn
+        :param move: move_id of the best move found, or NO_MOVE
+        """
+        slot = (key & self.mask) << 1
+        if self.keys[slot] != key and depth < self.depths[slot] and self.ages[slot] == self.age:
+            # depth-preferred slot holds a deeper entry from this search, use always-replace slot
+            slot += 1
+
+        if move == NO_MOVE and self.keys[slot] == key:
+            # keep best move of a previous search of the same position
+            move = self.moves[slot]
+
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.ages[slot] = self.age
+
+    def hit_rate(self) -> float:
+        """
+        :return: share of probes that found the position in the table
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable held in shared memory (multiprocessing.shared_memory), which can be used by several processes
+    at once. Passing the table to another process (it is pickled by the name of its shared memory block) attaches the
+    same memory there.
+
+    Each slot is two 64-bit words: data (value, best move, depth, flag and age packed together) and key xor data.
+    Slots are written and read without locks: if two processes write the same slot at once, or one reads it while
+    another one is writing it, the key check fails and the slot is just not found.
+
+    The process that created the table must call unlink() when no process needs it any more.
+    """
+
+    def __init__(self, size_mb: float = 16, name: str = None):
+        """
+        :param size_mb: memory budget of the table in megabytes, ignored if name is given
+        :param name: name of the shared memory block of an existing table to attach to, or None to create a new table
+        """
+        if name is None:
+            buckets = 1
+            while buckets * 4 * SHARED_SLOT_SIZE <= size_mb * 1024 * 1024:
+                buckets *= 2
+            self.shm = shared_memory.SharedMemory(create=True, size=buckets * 2 * SHARED_SLOT_SIZE)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            buckets = self.shm.size // (2 * SHARED_SLOT_SIZE)
+        self.mask = buckets - 1
+        self.entries = self.shm.buf.cast("Q")
+        # entries[2 * slot] is key xor data of the slot and entries[2 * slot + 1] its data
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+
+    def __reduce__(self):
+        return SharedTranspositionTable, (0, self.shm.name)
+
+    def __len__(self):
+        return len(self.entries) // 2
+
+    def clear(self):
+        self.entries[:] = array("Q", bytes(len(self.entries) * 8))
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        data = self.entries[2 * slot + 1]
+        # data of a stored entry is never 0 (its value is increased by VALUE_OFFSET), empty slots have zero data
+        if self.entries[2 * slot] ^ data != key or not data:
+            slot += 1
+            data = self.entries[2 * slot + 1]
+            if self.entries[2 * slot] ^ data != key or not data:
+                return None
+
+        self.hits += 1
+        return (data >> 48) & 0xFF, (data >> 56) & 0x3, (data & 0xFFFFFFFF) - VALUE_OFFSET, (data >> 32) & 0xFFFF
+
+    def store(self, key: int, depth: int, flag: int, value: int, move: int = NO_MOVE):
+        slot = (key & self.mask) << 1
+        data = self.entries[2 * slot + 1]
+        if self.entries[2 * slot] ^ data != key and depth < (data >> 48) & 0xFF and data >> 58 == self.age & 0x3F:
+            # depth-preferred slot holds a deeper entry from this search, use always-replace slot
+            slot += 1
+            data = self.entries[2 * slot + 1]
+
+        if move == NO_MOVE and self.entries[2 * slot] ^ data == key:
+            # keep best move of a previous search of the same position
+            move = (data >> 32) & 0xFFFF
+
+        data = (value + VALUE_OFFSET) | move << 32 | depth << 48 | flag << 56 | (self.age & 0x3F) << 58
+        self.entries[2 * slot + 1] = data
+        self.entries[2 * slot] = key ^ data
+
+    def close(self):
+        """
+        Detaches the table from this process.
+        """
+        self.entries.release()
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Frees the shared memory, call from the process that created the table after all processes closed it.
+        """
+        self.shm.unlink()
+
+
+class TranspositionTableTests(unittest.TestCase):
+
+    def test_store_probe(self):
+        t = TranspositionTable(1)
+        t.new_search()
+        self.assertIsNone(t.probe(12345))
+        t.store(12345, 3, LOWER, -7, 42)
+        self.assertEqual((3, LOWER, -7, 42), t.probe(12345))
+        self.assertEqual(0.5, t.hit_rate())
+
+    def test_depth_preferred(self):
+        t = TranspositionTable(1)
+        t.new_search()
+        deep, shallow, other = 1, 1 + (t.mask + 1), 1 + 2 * (t.mask + 1)  # all three keys map to the same bucket
+        t.store(deep, 5, EXACT, 1)
+        t.store(shallow, 2, EXACT, 2)
+        t.store(other, 1, EXACT, 3)
+        self.assertEqual(5, t.probe(deep)[0])
+        self.assertIsNone(t.probe(shallow))  # always-replace slot was overwritten
+        self.assertEqual(1, t.probe(other)[0])
+
+        # entries from older searches are replaced
+        t.new_search()
+        t.store(shallow, 2, EXACT, 2)
+        self.assertIsNone(t.probe(deep))
+
+    def test_clear(self):
+        t = TranspositionTable(1)
+        t.new_search()
+        self.assertIsNone(t.probe(0))
+        t.store(0, 2, EXACT, 4)
+        self.assertEqual((2, EXACT, 4, NO_MOVE), t.probe(0))
+        deep, shallow, other = 1, 1 + (t.mask + 1), 1 + 2 * (t.mask + 1)
+        t.store(deep, 5, EXACT, 1, 42)
+        t.clear()
+        self.assertIsNone(t.probe(0))
+        self.assertIsNone(t.probe(deep))
+        self.assertEqual(0.0, t.hit_rate())
+
+        # depth of a removed entry doesn't keep the depth-preferred slot
+        t.store(shallow, 2, EXACT, 2)
+        t.store(other, 1, EXACT, 3)
+        self.assertEqual((2, EXACT, 2, NO_MOVE), t.probe(shallow))
+        self.assertEqual((1, EXACT, 3, NO_MOVE), t.probe(other))
+
+    def test_move_id(self):
+        b = Board()
+        for notation in (b.get_board(), ",...o,,...o,..x", ".X,,...x,,.....o,,...O,,,....X"):
+            b.set_board(notation)
+            moves = b.legal_moves()
+            self.assertEqual([move_id(m) for m in moves], [move_id(m) for m in b.packed_legal_moves()])
+            self.assertIs(moves[-1], find_move(moves, move_id(b.packed_legal_moves()[-1])))
+
+    def test_size(self):
+        self.assertLessEqual(len(TranspositionTable(1)) * SLOT_SIZE, 1024 * 1024)
+        self.assertGreater(len(TranspositionTable(1)) * SLOT_SIZE * 2, 1024 * 1024)
+
+
+class SharedTranspositionTableTests(unittest.TestCase):
+
+    def test_store_probe(self):
+        t = SharedTranspositionTable(1)
+        try:
+            t.new_search()
+            self.assertIsNone(t.probe(12345))
+            t.store(12345, 3, LOWER, -7, 42)
+            self.assertEqual((3, LOWER, -7, 42), t.probe(12345))
+            t.store(12345, 4, EXACT, 5)
+            self.assertEqual((4, EXACT, 5, 42), t.probe(12345))
+            self.assertLessEqual(len(t) * SHARED_SLOT_SIZE, 1024 * 1024)
+
+            # a copy attached to the same memory (as in another process) sees the same entries
+            attached = pickle.loads(pickle.dumps(t))
+            self.assertEqual((4, EXACT, 5, 42), attached.probe(12345))
+            attached.store(1 << 63, 1, UPPER, 999999)
+            self.assertEqual((1, UPPER, 999999, NO_MOVE), t.probe(1 << 63))
+            attached.close()
+
+            t.clear()
+            self.assertIsNone(t.probe(0))
+            self.assertIsNone(t.probe(12345))
+            t.store(0, 1, EXACT, 0)
+            self.assertEqual((1, EXACT, 0, NO_MOVE), t.probe(0))
+        finally:
+            t.close()
+            t.unlink()